@@ -82,6 +82,8 @@ password was wrong, this will lead us to use the L{papyon.event} interfaces:
 
 import papyon.profile as profile
 import papyon.msnp as msnp
+from papyon.gnet import reactor as gnet_reactor
+from papyon.gnet.protocol import HTTPConnectionPool
 
 import papyon.service.SingleSignOn as SSO
 import papyon.service.AddressBook as AB
@@ -118,7 +120,7 @@ class Client(EventsDispatcher):
                 msn_object_store, oim_box, spaces"""
 
     def __init__(self, server, proxies={}, transport_class=DirectConnection,
-            version=15, client_type=msnp.ClientTypes.COMPUTER):
+            version=15, client_type=msnp.ClientTypes.COMPUTER, reactor=None):
         """Initializer
 
             @param server: the Notification server to connect to.
@@ -136,13 +138,22 @@ class Client(EventsDispatcher):
             @type version: int
             
             @param client_type: type of client (computer, mobile, web...)
-            @type client_type: L{ClientTypes<papyon.msnp.constants.ClientTypes>}"""
+            @type client_type: L{ClientTypes<papyon.msnp.constants.ClientTypes>}
+
+            @param reactor: the event loop to run on, the GLib main loop is
+                    used if None. The reactor is shared by the whole process
+                    and needs to be given to the first client created.
+            @type reactor: L{papyon.gnet.reactor.AbstractReactor}"""
+
+        if reactor is not None:
+            gnet_reactor.install(reactor)
 
         EventsDispatcher.__init__(self)
 
         self.__state = ClientState.CLOSED
 
         self._proxies = proxies
+        self._http_pool = HTTPConnectionPool(self._proxies)
         self._transport_class = transport_class
         self._client_type = client_type
 
@@ -178,6 +189,9 @@ class Client(EventsDispatcher):
         self._turn_client = None
 
         self.__keepalive_conversations = False
+        self.__contact_property_events = False
+        self.__contact_changes = {} # contact => set(property, ...)
+        self.__contact_changes_source = None
 
         self.__die = False
         self.__connect_transport_signals()
@@ -275,6 +289,19 @@ class Client(EventsDispatcher):
             self.__keepalive_conversations = k_
         return locals()
 
+    @rw_property
+    def contact_property_events():
+        """Whether the on_contact_*_changed events are dispatched as each
+        property changes, in addition to on_contacts_changed which is
+        dispatched once for all the changes of a main loop iteration.
+        False by default
+            @type: bool"""
+        def fget(self):
+            return self.__contact_property_events
+        def fset(self, enabled):
+            self.__contact_property_events = enabled
+        return locals()
+
     def login(self, account, password):
         """Login to the server.
 
@@ -303,6 +330,7 @@ class Client(EventsDispatcher):
         self._p2p_session_manager.close()
         self._switchboard_manager.close()
         self._protocol.signoff()
+        self.__teardown()
         self.__state = ClientState.CLOSED
 
     def disconnect_other_endpoints(self):
@@ -440,8 +468,11 @@ class Client(EventsDispatcher):
             self._dispatch(method_name, contact, *event_args)
 
         def property_changed(contact, pspec):
-            method_name = "on_contact_%s_changed" % pspec.name.replace("-", "_")
-            self._dispatch(method_name, contact)
+            if self.__contact_property_events:
+                method_name = "on_contact_%s_changed" % \
+                        pspec.name.replace("-", "_")
+                self._dispatch(method_name, contact)
+            self.__contact_changed(contact, pspec.name)
 
         contact.connect("notify::memberships", property_changed)
         contact.connect("notify::presence", property_changed)
@@ -456,12 +487,35 @@ class Client(EventsDispatcher):
             contact.connect(name, event, name)
         connect_signal("infos-changed")
 
+    def __contact_changed(self, contact, name):
+        """Records a property change, the changes made during a main loop
+        iteration are dispatched at once in the next one"""
+        changes = self.__contact_changes.get(contact, None)
+        if changes is None:
+            changes = self.__contact_changes[contact] = set()
+        changes.add(name)
+        if self.__contact_changes_source is None:
+            self.__contact_changes_source = gnet_reactor.call_soon(
+                    self.__dispatch_contact_changes)
+
+    def __dispatch_contact_changes(self):
+        self.__contact_changes_source = None
+        changes, self.__contact_changes = self.__contact_changes, {}
+        self._dispatch("on_contacts_changed", changes)
+
+    def __teardown(self):
+        """Fails the requests still waiting to be sent and closes the
+        HTTP connections, nothing goes out once logged out"""
+        if self._address_book is not None:
+            self._address_book.close()
+        self._http_pool.close()
+
     def __connect_transport_signals(self):
         """Connect transport signals"""
         def connect_success(transp):
             self._sso = SSO.SingleSignOn(self.profile.account,
                                          self.profile.password,
-                                         self._proxies)
+                                         self._proxies, self._http_pool)
             self._address_book = AB.AddressBook(self._sso, self, self._proxies)
             self._mailbox = msnp.Mailbox(self._protocol)
             self._oim_box = OIM.OfflineMessagesBox(self._sso, self, self._proxies)
@@ -478,12 +532,14 @@ class Client(EventsDispatcher):
 
         def connect_failure(transp, reason):
             self._dispatch("on_client_error", ClientErrorType.NETWORK, reason)
+            self.__teardown()
             self._state = ClientState.CLOSED
 
         def disconnected(transp, reason):
             if not self.__die:
                 self._dispatch("on_client_error", ClientErrorType.NETWORK, reason)
             self.__die = False
+            self.__teardown()
             self._state = ClientState.CLOSED
 
         self._transport.connect("connection-success", connect_success)
@@ -28,10 +28,10 @@ import msnp
 import p2p
 from switchboard_manager import SwitchboardHandler
 from papyon.event import EventsDispatcher
+from papyon.gnet import reactor
 from papyon.profile import NetworkID
 
 import logging
-import gobject
 from urllib import quote, unquote
 
 __all__ = ['Conversation', 'ConversationInterface', 'ConversationMessage', 'TextFormat']
@@ -430,7 +430,7 @@ class ExternalNetworkConversation(AbstractConversation):
         self.participants = set(contacts)
         self.total_participants = self.participants
         client._register_external_conversation(self)
-        gobject.idle_add(self._open)
+        reactor.idle_add(self._open)
 
     def _open(self):
         for contact in self.participants:
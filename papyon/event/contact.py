@@ -29,7 +29,12 @@ __all__ = ["ContactEventInterface"]
 
 class ContactEventInterface(BaseEventInterface):
     """Interface allowing the user to get notified about the
-    L{Contact<papyon.profile.Contact>}s events"""
+    L{Contact<papyon.profile.Contact>}s events
+
+    The property changes are dispatched together to L{on_contacts_changed},
+    the on_contact_*_changed events are only dispatched as well if the
+    L{contact_property_events<papyon.Client.contact_property_events>}
+    of the client is set."""
 
     def __init__(self, client):
         """Initializer
@@ -37,6 +42,14 @@ class ContactEventInterface(BaseEventInterface):
             @type client: L{Client<papyon.Client>}"""
         BaseEventInterface.__init__(self, client)
 
+    def on_contacts_changed(self, changes):
+        """Called once for all the property changes of the contacts which
+        happened during a main loop iteration.
+            @param changes: the names of the properties which changed, by
+                contact (e.g. "presence", "display-name"...)
+            @type changes: {L{Contact<papyon.profile.Contact>}: set(string)}"""
+        pass
+
     def on_contact_memberships_changed(self, contact):
         """Called when the memberships of a contact changes.
             @param contact: the contact whose presence changed
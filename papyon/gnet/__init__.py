@@ -26,3 +26,4 @@ and asynchat modules that easily integrate with the glib main loop.
 from constants import IoStatus
 from errors import IoError
 import io
+import stats
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+
+"""Receive buffers used by the parsers."""
+
+__all__ = ['ReceiveBuffer']
+
+class ReceiveBuffer(object):
+    """Growable byte buffer with a read offset.
+
+    Incoming data is appended at the tail and chunks are consumed from the
+    head without moving the remaining bytes around, the consumed space is
+    only reclaimed once it makes up more than half of the storage. Each
+    consumed chunk is copied exactly once out of the buffer.
+
+    Delimiter scanning is incremental: when no delimiter is found, the
+    position reached is remembered so that the next call only looks at the
+    newly appended data.
+
+        @since: 0.5"""
+
+    def __init__(self, data=""):
+        self._buffer = bytearray(data)
+        self._offset = 0
+        self._scan_offset = 0
+        self._scan_delimiter = None
+
+    def __len__(self):
+        return len(self._buffer) - self._offset
+
+    def __str__(self):
+        return self.peek()
+
+    def append(self, data):
+        """Appends data at the end of the buffer
+
+            @param data: the data to append
+            @type data: string"""
+        self._buffer += data
+
+    def clear(self):
+        """Discards the whole content of the buffer"""
+        self._buffer = bytearray()
+        self._offset = 0
+        self._scan_offset = 0
+        self._scan_delimiter = None
+
+    def peek(self, size=None):
+        """Returns up to size bytes without consuming them
+
+            @param size: number of bytes to return, everything if None
+            @type size: integer"""
+        end = len(self._buffer)
+        if size is not None:
+            end = min(end, self._offset + size)
+        return self._slice(self._offset, end)
+
+    def read(self, size=None):
+        """Consumes and returns up to size bytes
+
+            @param size: number of bytes to consume, everything if None
+            @type size: integer"""
+        end = len(self._buffer)
+        if size is not None:
+            end = min(end, self._offset + size)
+        data = self._slice(self._offset, end)
+        self._consume(end)
+        return data
+
+    def read_until(self, delimiter):
+        """Consumes and returns the data preceding the next occurence of
+        delimiter, the delimiter itself is consumed but not returned.
+
+            @param delimiter: the delimiter to look for
+            @type delimiter: string
+
+            @return: the chunk or None if no delimiter is buffered yet"""
+        offset = self._offset
+        if self._scan_delimiter == delimiter and self._scan_offset > offset:
+            index = self._buffer.find(delimiter, self._scan_offset)
+        else:
+            index = self._buffer.find(delimiter, offset)
+        if index == -1:
+            self._scan_delimiter = delimiter
+            self._scan_offset = max(offset,
+                    len(self._buffer) - len(delimiter) + 1)
+            return None
+        data = buffer(self._buffer, offset, index - offset)[:]
+        self._offset = index + len(delimiter)
+        if self._offset > len(self._buffer) >> 1:
+            self._compact()
+        return data
+
+    def skip(self, size):
+        """Consumes up to size bytes without returning them"""
+        self._consume(min(len(self._buffer), self._offset + size))
+
+    def _slice(self, start, end):
+        if start == end:
+            return ""
+        return buffer(self._buffer, start, end - start)[:]
+
+    def _consume(self, end):
+        self._offset = end
+        if self._offset > len(self._buffer) >> 1:
+            self._compact()
+
+    def _compact(self):
+        if self._offset == len(self._buffer):
+            self.clear()
+            return
+        del self._buffer[:self._offset]
+        self._scan_offset = max(0, self._scan_offset - self._offset)
+        self._offset = 0
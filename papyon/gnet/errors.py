@@ -111,6 +111,24 @@ class HTTPError(IoError):
         return "HTTP Error (%s): %s" % (self.response.status,
                 self.response.reason)
 
+class HTTPTimeout(IoError):
+    def __init__(self, request):
+        IoError.__init__(self, IoError.CONNECTION_TIMED_OUT)
+        self.request = request
+
+    def __str__(self):
+        return "HTTP request %s %s timed out" % (self.request.method,
+                self.request.resource)
+
+class HTTPCancelled(IoError):
+    def __init__(self, request):
+        IoError.__init__(self, IoError.CONNECTION_CLOSED)
+        self.request = request
+
+    def __str__(self):
+        return "HTTP request %s %s was cancelled" % (self.request.method,
+                self.request.resource)
+
 class HTTPParseError(ParseError):
     def __init__(self, message):
         ParseError.__init__(self, "HTTP", message)
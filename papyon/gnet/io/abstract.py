@@ -53,8 +53,15 @@ class AbstractClient(gobject.GObject):
             "sent": (gobject.SIGNAL_RUN_FIRST,
                 gobject.TYPE_NONE,
                 (object, gobject.TYPE_ULONG)),
+
+            "drained": (gobject.SIGNAL_RUN_FIRST,
+                gobject.TYPE_NONE,
+                ()),
             }
 
+    HIGH_WATERMARK = 1048576
+    LOW_WATERMARK = 65536
+
     def __init__(self, host, port, domain=AF_INET, type=SOCK_STREAM):
         """Initializer
 
@@ -79,6 +86,10 @@ class AbstractClient(gobject.GObject):
         self._type = type
         self._transport = None
         self.__status = IoStatus.CLOSED
+        self._buffered_bytes = 0
+        self._high_watermark = self.HIGH_WATERMARK
+        self._low_watermark = self.LOW_WATERMARK
+        self._congested = False
 
     def __del__(self):
         self.close()
@@ -124,7 +135,56 @@ class AbstractClient(gobject.GObject):
         """
         raise NotImplementedError
 
+    # flow control
+    def _check_watermarks(self):
+        """Needs to be called whenever the amount of buffered data changes,
+        emits the drained signal once the buffer gets back under the low
+        watermark after having reached the high watermark."""
+        buffered = self.buffered_bytes
+        if not self._congested and buffered >= self._high_watermark:
+            self._congested = True
+        elif self._congested and buffered <= self._low_watermark:
+            self._congested = False
+            self.emit("drained")
+
     # properties
+    @property
+    def buffered_bytes(self):
+        "The number of bytes queued but not yet sent."
+        return self._buffered_bytes
+
+    @property
+    def stats(self):
+        "The L{IoStats<papyon.gnet.stats.IoStats>} of the connection."
+        raise NotImplementedError
+
+    @property
+    def writable(self):
+        """Whether producers should keep sending data, False from the
+        moment the high watermark is reached until the buffer drains
+        under the low watermark."""
+        return not self._congested
+
+    def __get_high_watermark(self):
+        "The number of buffered bytes above which the client is congested."
+        return self._high_watermark
+    def __set_high_watermark(self, size):
+        if size <= self._low_watermark:
+            raise ValueError("Wrong high watermark %d" % size)
+        self._high_watermark = size
+        self._check_watermarks()
+    high_watermark = property(__get_high_watermark, __set_high_watermark)
+
+    def __get_low_watermark(self):
+        "The number of buffered bytes under which the drained signal fires."
+        return self._low_watermark
+    def __set_low_watermark(self, size):
+        if size < 0 or size >= self._high_watermark:
+            raise ValueError("Wrong low watermark %d" % size)
+        self._low_watermark = size
+        self._check_watermarks()
+    low_watermark = property(__get_low_watermark, __set_low_watermark)
+
     def __get_host(self):
         "The remote host to connect to."
         return self._host
@@ -21,6 +21,8 @@
 from papyon.gnet.constants import *
 from papyon.gnet.errors import *
 from papyon.gnet.resolver import *
+from papyon.gnet import reactor
+from papyon.gnet import stats
 from papyon.util.async import run
 from abstract import AbstractClient
 
@@ -39,15 +41,24 @@ class OutgoingPacket(object):
         self._callback = callback
         self._errback = errback
 
-    def read(self, size=2048):
+    def read(self, size=None):
+        """return the data remaining to be sent, without copying it"""
+        remaining = self.size - self._sent
         if size is not None:
-            return self.buffer[self._sent:][0:size]
-        return self.buffer[self._sent:]
+            remaining = min(size, remaining)
+        if self._sent == 0 and remaining == self.size:
+            return self.buffer
+        return buffer(self.buffer, self._sent, remaining)
 
     def sent(self, size):
         """update how many bytes have been sent"""
         self._sent += size
 
+    @property
+    def remaining(self):
+        """number of bytes still to be sent"""
+        return self.size - self._sent
+
     def is_complete(self):
         """return whether this packet was completely transmitted or not"""
         return self.size == self._sent
@@ -69,51 +80,164 @@ class GIOChannelClient(AbstractClient):
 
         @since: 0.1"""
 
+    CONNECT_DELAY = 0.25
+    RECEIVE_SIZE = 65536
+    RECEIVE_BUDGET = 1048576
+    SEND_SIZE = 65536
+
     def __init__(self, host, port, domain=AF_INET, type=SOCK_STREAM):
         AbstractClient.__init__(self, host, port, domain, type)
+        self._nodelay = False
+        self._receive_size = self.RECEIVE_SIZE
+        self._receive_budget = self.RECEIVE_BUDGET
+        self._stats = stats.IoStats()
+        self._adopting = False
+        stats.register(self)
 
     def _pre_open(self, io_object):
         io_object.setblocking(False)
-        channel = gobject.IOChannel(io_object.fileno())
-        channel.set_flags(channel.get_flags() | gobject.IO_FLAG_NONBLOCK)
-        channel.set_encoding(None)
-        channel.set_buffered(False)
-
         self._transport = io_object
-        self._channel = channel
+        self._apply_nodelay()
 
         self._source_id = None
         self._source_condition = 0
         self._outgoing_queue = []
+        self._buffered_bytes = 0
+        self._congested = False
+        if not self._adopting:
+            self._stats.opening()
+        self._stats.queued(0)
         AbstractClient._pre_open(self)
 
     def _post_open(self):
         AbstractClient._post_open(self)
         self._watch_remove()
 
+    def _create_socket(self):
+        sock = socket.socket(self._domain, self._type)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        except AttributeError:
+            pass
+        return sock
+
+    def _apply_nodelay(self):
+        if self._transport is None or self._type != SOCK_STREAM:
+            return
+        try:
+            self._transport.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY,
+                    int(self._nodelay))
+        except (AttributeError, socket.error):
+            pass
+
     def _open(self, host, port):
+        self._addresses = []
+        self._connect_attempts = [] # [(socket, watch source), ...]
+        self._connect_source = None
         resolver = HostnameResolver()
         resolver.query(host, (self.__open, host, port), (self.__open_failed,))
 
     def __open(self, resolve_response, host, port):
-        host = resolve_response.answer[0][1]
-
-        # Even though connect_ex *shouldn't* raise an exception,
-        # sometimes it does, which is just great.
-        try:
-            err = self._transport.connect_ex((host, port))
-        except socket.error, e:
-            err = e.errno
-
-        self._watch_set_cond(gobject.IO_PRI | gobject.IO_IN | gobject.IO_OUT |
-                gobject.IO_HUP | gobject.IO_ERR | gobject.IO_NVAL,
-                lambda chan, cond: self._post_open())
-        if err in (0, EINPROGRESS, EALREADY, EWOULDBLOCK, EISCONN):
+        if self._status != IoStatus.OPENING:
             return
-        elif err in (EHOSTUNREACH, EHOSTDOWN, ECONNREFUSED, ECONNABORTED,
-                ENETUNREACH, ENETDOWN, EBADFD):
-            self.emit("error", IoConnectionFailed(self, str(err)))
+        self._addresses = [answer[1] for answer in resolve_response.answer]
+        self.__connect_next(port, True)
+
+    def __connect_next(self, port, first=False):
+        """Starts a connection attempt to the next resolved address. The
+        attempts are staggered by CONNECT_DELAY and run in parallel, the
+        first one to succeed wins and the others are dropped."""
+        self._connect_source = None
+        while len(self._addresses) > 0:
+            host = self._addresses.pop(0)
+            if first:
+                sock = self._transport
+                first = False
+            else:
+                sock = self._create_socket()
+                sock.setblocking(False)
+
+            # Even though connect_ex *shouldn't* raise an exception,
+            # sometimes it does, which is just great.
+            try:
+                err = sock.connect_ex((host, port))
+            except socket.error, e:
+                err = e.errno
+
+            if err in (EHOSTUNREACH, EHOSTDOWN, ECONNREFUSED, ECONNABORTED,
+                    ENETUNREACH, ENETDOWN, EBADFD):
+                if sock is not self._transport:
+                    sock.close()
+                if len(self._addresses) > 0 or \
+                        len(self._connect_attempts) > 0:
+                    continue
+                self.emit("error", IoConnectionFailed(self, str(err)))
+                self._transport.close()
+                break
+
+            cond = gobject.IO_PRI | gobject.IO_IN | gobject.IO_OUT | \
+                    gobject.IO_HUP | gobject.IO_ERR | gobject.IO_NVAL
+            handler = lambda chan, cond, sock=sock: \
+                    self.__on_connect_done(sock, port)
+            if sock is self._transport:
+                self._watch_set_cond(cond, handler)
+                source = None
+            else:
+                source = reactor.io_add_watch(sock, cond, handler)
+            self._connect_attempts.append((sock, source))
+
+            if len(self._addresses) > 0:
+                self._connect_source = reactor.timeout_add(
+                        int(self.CONNECT_DELAY * 1000),
+                        self.__connect_next, port)
+            break
+        return False
+
+    def __on_connect_done(self, sock, port):
+        try:
+            error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        except socket.error:
+            error = 1
+
+        if error != 0 and (len(self._addresses) > 0 or
+                len(self._connect_attempts) > 1):
+            self.__cancel_connect_attempts(sock)
+            if len(self._connect_attempts) == 0:
+                if self._connect_source is not None:
+                    reactor.source_remove(self._connect_source)
+                self.__connect_next(port)
+            return False
+
+        # Either the winner or the last attempt left, in which case the
+        # failure gets reported by _post_open
+        self.__cancel_connect_attempts(keep=sock)
+        if sock is not self._transport:
+            self._watch_remove()
             self._transport.close()
+            # the connection is still timed from the first attempt
+            self._adopting = True
+            self._pre_open(sock)
+            self._adopting = False
+        self._post_open()
+        return False
+
+    def __cancel_connect_attempts(self, only=None, keep=None):
+        """Drops the pending connection attempts, or only the given one"""
+        for attempt, source in self._connect_attempts[:]:
+            if only is not None and attempt is not only:
+                continue
+            self._connect_attempts.remove((attempt, source))
+            if source is None:
+                self._watch_remove()
+            else:
+                reactor.source_remove(source)
+            if attempt is not keep and attempt is not self._transport:
+                attempt.close()
+        if only is None:
+            self._addresses = []
+            if self._connect_source is not None:
+                reactor.source_remove(self._connect_source)
+                self._connect_source = None
 
     def __open_failed(self, error):
         self.emit("error", error)
@@ -122,7 +246,7 @@ class GIOChannelClient(AbstractClient):
     # convenience methods
     def _watch_remove(self):
         if self._source_id is not None:
-            gobject.source_remove(self._source_id)
+            reactor.source_remove(self._source_id)
             self._source_id = None
             self._source_condition = 0
 
@@ -131,7 +255,7 @@ class GIOChannelClient(AbstractClient):
         self._source_condition = cond
         if handler is None:
             handler = self._io_channel_handler
-        self._source_id = self._channel.add_watch(cond, handler)
+        self._source_id = reactor.io_add_watch(self._transport, cond, handler)
 
     def _watch_add_cond(self, cond):
         if self._source_condition & cond == cond:
@@ -145,6 +269,80 @@ class GIOChannelClient(AbstractClient):
         self._source_condition ^= cond
         self._watch_set_cond(self._source_condition)
 
+    def _gather_outgoing(self):
+        """Gathers the pending data of the queued packets so that it can be
+        written at once. Whole packets are coalesced as long as they fit
+        in SEND_SIZE, a larger packet is handed out alone, SEND_SIZE bytes
+        at a time, without being copied."""
+        pieces = []
+        size = 0
+        for packet in self._outgoing_queue:
+            data = packet.read(self.SEND_SIZE)
+            if pieces and size + len(data) > self.SEND_SIZE:
+                break
+            pieces.append(data)
+            size += len(data)
+            if size >= self.SEND_SIZE:
+                break
+        if len(pieces) == 1:
+            return pieces[0]
+        # the head packet may have been partly sent, then it's a buffer
+        return "".join(map(str, pieces))
+
+    def _outgoing_sent(self, size):
+        """Accounts for size bytes written from the head of the outgoing
+        queue, completed packets are removed and their callbacks are run
+        in order."""
+        while len(self._outgoing_queue) > 0:
+            packet = self._outgoing_queue[0]
+            written = min(size, packet.remaining)
+            packet.sent(written)
+            self._buffered_bytes -= written
+            size -= written
+            if not packet.is_complete():
+                break
+            del self._outgoing_queue[0]
+            self._stats.queued(len(self._outgoing_queue))
+            self.emit("sent", packet.buffer, packet.size)
+            packet.callback()
+            if self._status != IoStatus.OPEN:
+                return
+        self._check_watermarks()
+
+    # properties
+    @property
+    def stats(self):
+        "The L{IoStats<papyon.gnet.stats.IoStats>} of the connection."
+        return self._stats
+
+    def __get_nodelay(self):
+        """Whether Nagle's algorithm is disabled, the outgoing packets
+        being coalesced by the client itself."""
+        return self._nodelay
+    def __set_nodelay(self, nodelay):
+        self._nodelay = bool(nodelay)
+        self._apply_nodelay()
+    nodelay = property(__get_nodelay, __set_nodelay)
+
+    def __get_receive_size(self):
+        "The maximum number of bytes requested by a single read."
+        return self._receive_size
+    def __set_receive_size(self, size):
+        if size <= 0:
+            raise ValueError("Wrong receive size %d" % size)
+        self._receive_size = size
+    receive_size = property(__get_receive_size, __set_receive_size)
+
+    def __get_receive_budget(self):
+        """The maximum number of bytes read from the socket in a single
+        main loop wakeup before giving back control to the main loop."""
+        return self._receive_budget
+    def __set_receive_budget(self, budget):
+        if budget <= 0:
+            raise ValueError("Wrong receive budget %d" % budget)
+        self._receive_budget = budget
+    receive_budget = property(__get_receive_budget, __set_receive_budget)
+
     # public API
     def open(self):
         if not self._configure():
@@ -157,13 +355,17 @@ class GIOChannelClient(AbstractClient):
             return
         self._status = IoStatus.CLOSING
 
+        if hasattr(self, "_connect_attempts"):
+            self.__cancel_connect_attempts(keep=self._transport)
         for packet in self._outgoing_queue:
             packet.errback(IoConnectionClosed(self, self._status))
         self._outgoing_queue = []
+        self._buffered_bytes = 0
+        self._congested = False
+        self._stats.queued(0)
 
         self._watch_remove()
         try:
-            self._channel.close()
             self._transport.shutdown(socket.SHUT_RDWR)
         except:
             pass
@@ -183,5 +385,8 @@ class GIOChannelClient(AbstractClient):
             return
         self._outgoing_queue.append(OutgoingPacket(buffer, len(buffer),
             callback, errback))
+        self._buffered_bytes += len(buffer)
+        self._stats.queued(len(self._outgoing_queue))
+        self._check_watermarks()
         self._watch_add_cond(gobject.IO_OUT)
 gobject.type_register(GIOChannelClient)
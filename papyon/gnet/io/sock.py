@@ -25,6 +25,7 @@ from iochannel import GIOChannelClient
 import gobject
 import socket
 import sys
+from errno import *
 
 
 __all__ = ['SocketClient']
@@ -43,11 +44,7 @@ class SocketClient(GIOChannelClient):
 
     def _pre_open(self, sock=None):
         if sock is None:
-            sock = socket.socket(self._domain, self._type)
-            try:
-                sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
-            except AttributeError:
-                pass
+            sock = self._create_socket()
         GIOChannelClient._pre_open(self, sock)
 
     def _post_open(self):
@@ -60,6 +57,7 @@ class SocketClient(GIOChannelClient):
         if opts == 0:
             self._watch_set_cond(gobject.IO_IN | gobject.IO_PRI |
                                gobject.IO_ERR | gobject.IO_HUP)
+            self._stats.opened()
             self._status = IoStatus.OPEN
         else:
             self.emit("error", IoConnectionFailed(self, str(opts)))
@@ -69,17 +67,14 @@ class SocketClient(GIOChannelClient):
     def _io_channel_handler(self, chan, cond):
         if self._status == IoStatus.CLOSED:
             return False
+        self._stats.wakeup(cond)
 
         if cond & (gobject.IO_IN | gobject.IO_PRI):
-            buf = ""
-            try:
-                buf = self._channel.read(2048)
-            except gobject.GError:
-                self.close()
-                return False
-            if buf != "":
+            chunks, eof = self._drain()
+            if chunks:
+                buf = "".join(chunks)
                 self.emit("received", buf, len(buf))
-            elif sys.platform != "win32":
+            if eof:
                 self.close()
                 return False
 
@@ -89,25 +84,49 @@ class SocketClient(GIOChannelClient):
             return False
 
         if cond & gobject.IO_OUT:
-            if len(self._outgoing_queue) > 0: # send next item
-                item = self._outgoing_queue[0]
-
+            if len(self._outgoing_queue) > 0: # send pending items
                 # Deal with broken pipe from the socket.
                 try:
-                    item.sent(self._channel.write(item.read()))
-                except gobject.GError, err:
+                    sent = self._transport.send(self._gather_outgoing())
+                except socket.error, err:
+                    self._stats.sent(0)
+                    if err.args[0] in (EAGAIN, EWOULDBLOCK, EINTR):
+                        return True
                     self.emit("error", IoConnectionFailed(self, str(err)))
                     return True
 
-                if item.is_complete(): # sent item
-                    self.emit("sent", item.buffer, item.size)
-                    item.callback()
-                    del self._outgoing_queue[0]
-                    del item
+                self._stats.sent(sent)
+                self._outgoing_sent(sent)
                 if len(self._outgoing_queue) == 0:
                     self._watch_remove_cond(gobject.IO_OUT)
             else:
                 self._watch_remove_cond(gobject.IO_OUT)
 
         return True
+
+    def _drain(self):
+        """Reads from the socket until it would block or until the receive
+        budget is exhausted.
+
+            @return: the chunks read and whether the connection was closed
+            @rtype: tuple(list, bool)"""
+        chunks = []
+        received = 0
+        reads = 0
+        eof = False
+        while received < self._receive_budget:
+            reads += 1
+            try:
+                buf = self._transport.recv(self._receive_size)
+            except socket.error, err:
+                if err.args[0] not in (EAGAIN, EWOULDBLOCK, EINTR):
+                    eof = True
+                break
+            if buf == "":
+                eof = (sys.platform != "win32")
+                break
+            chunks.append(buf)
+            received += len(buf)
+        self._stats.received(reads, received)
+        return chunks, eof
 gobject.type_register(SocketClient)
@@ -27,7 +27,81 @@ import socket
 import sys
 import OpenSSL.SSL as OpenSSL
 
-__all__ = ['SSLSocketClient']
+__all__ = ['SSLSocketClient', 'SSLContextCache']
+
+class SSLContextCache(object):
+    """Process wide cache of SSL contexts and client sessions.
+
+    Contexts are shared between all the connections using the same
+    options, and the last session negotiated with each server is kept so
+    that the next connection to that server can resume it instead of
+    going through a full handshake.
+
+        @since: 0.5"""
+
+    METHOD = getattr(OpenSSL, "TLS_METHOD", OpenSSL.SSLv23_METHOD)
+    OPTIONS = OpenSSL.OP_NO_SSLv2 | OpenSSL.OP_NO_SSLv3
+
+    def __init__(self):
+        self._contexts = {} # (method, options) => Context
+        self._sessions = {} # (host, port) => Session
+        self.full_handshakes = 0
+        self.resumed_handshakes = 0
+
+    def get_context(self, method=None, options=None):
+        if method is None:
+            method = self.METHOD
+        if options is None:
+            options = self.OPTIONS
+        key = (method, options)
+        context = self._contexts.get(key, None)
+        if context is None:
+            context = OpenSSL.Context(method)
+            context.set_options(options)
+            self._contexts[key] = context
+        return context
+
+    def get_session(self, host, port):
+        return self._sessions.get((host, port), None)
+
+    def add_session(self, host, port, session):
+        self._sessions[(host, port)] = session
+
+    def remove_session(self, host, port):
+        self._sessions.pop((host, port), None)
+
+    def handshake_done(self, connection, host, port, offered):
+        """Accounts for a completed handshake and keeps its session"""
+        if offered and session_reused(connection, offered):
+            self.resumed_handshakes += 1
+        else:
+            self.full_handshakes += 1
+        if hasattr(connection, "get_session"):
+            session = connection.get_session()
+            if session is not None:
+                self.add_session(host, port, session)
+
+    def clear(self):
+        self._contexts.clear()
+        self._sessions.clear()
+        self.full_handshakes = 0
+        self.resumed_handshakes = 0
+
+def session_reused(connection, offered):
+    """Whether the handshake of connection resumed the offered session"""
+    if hasattr(connection, "session_reused"):
+        return bool(connection.session_reused())
+    try:
+        return connection.get_session()._session == offered._session
+    except AttributeError:
+        return False
+
+_default_cache = SSLContextCache()
+
+def default_context_cache():
+    """Returns the SSL context cache shared by the whole process"""
+    return _default_cache
+
 
 class SSLSocketClient(GIOChannelClient):
     """Asynchronous Socket client class.
@@ -37,23 +111,34 @@ class SSLSocketClient(GIOChannelClient):
 
         @since: 0.1"""
 
-    def __init__(self, host, port, domain=AF_INET, type=SOCK_STREAM):
+    def __init__(self, host, port, domain=AF_INET, type=SOCK_STREAM,
+            context_cache=None):
         GIOChannelClient.__init__(self, host, port, domain, type)
+        if context_cache is None:
+            context_cache = default_context_cache()
+        self._context_cache = context_cache
+        self._offered_session = None
+        self._write_retry = None
 
     def _pre_open(self, sock=None):
         if sock is None:
-            sock = socket.socket(self._domain, self._type)
-            try:
-                sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
-            except AttributeError:
-                pass
-        context = OpenSSL.Context(OpenSSL.SSLv3_METHOD)
+            sock = self._create_socket()
+        context = self._context_cache.get_context()
         ssl_sock = OpenSSL.Connection(context, sock)
+        if hasattr(ssl_sock, "set_tlsext_host_name"):
+            ssl_sock.set_tlsext_host_name(self._host)
+        self._offered_session = None
+        self._write_retry = None
+        session = self._context_cache.get_session(self._host, self._port)
+        if session is not None and hasattr(ssl_sock, "set_session"):
+            ssl_sock.set_session(session)
+            self._offered_session = session
         GIOChannelClient._pre_open(self, ssl_sock)
 
     def _post_open(self):
         GIOChannelClient._post_open(self)
         if self._transport.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0:
+            self._transport.set_connect_state()
             self._watch_set_cond(gobject.IO_IN | gobject.IO_PRI | gobject.IO_OUT |
                                gobject.IO_ERR | gobject.IO_HUP)
         else:
@@ -64,33 +149,30 @@ class SSLSocketClient(GIOChannelClient):
     def _io_channel_handler(self, chan, cond):
         if self._status == IoStatus.CLOSED:
             return False
+        self._stats.wakeup(cond)
         if self._status == IoStatus.OPENING:
             try:
-                self._transport.set_connect_state()
+                self._transport.do_handshake()
             except (OpenSSL.WantX509LookupError,
                     OpenSSL.WantReadError, OpenSSL.WantWriteError):
                 return True
             except OpenSSL.Error, err:
+                self._context_cache.remove_session(self._host, self._port)
                 self.emit("error", SSLError(str(err)))
                 self.close()
                 return False
             else:
+                self._context_cache.handshake_done(self._transport,
+                        self._host, self._port, self._offered_session)
+                self._stats.opened()
                 self._status = IoStatus.OPEN
         elif self._status == IoStatus.OPEN:
             if cond & (gobject.IO_IN | gobject.IO_PRI):
-                try:
-                    buf = ""
-                    while True:
-                        buf = self._transport.recv(2048)
-                        if buf != "":
-                            self.emit("received", buf, len(buf))
-                        elif sys.platform != "win32":
-                            self.close()
-                            return False
-                except (OpenSSL.WantX509LookupError,
-                        OpenSSL.WantReadError, OpenSSL.WantWriteError):
-                    pass
-                except OpenSSL.Error:
+                chunks, eof = self._drain()
+                if chunks:
+                    buf = "".join(chunks)
+                    self.emit("received", buf, len(buf))
+                if eof:
                     self.close()
                     return False
 
@@ -99,22 +181,23 @@ class SSLSocketClient(GIOChannelClient):
                 return False
 
             if cond & gobject.IO_OUT:
-                if len(self._outgoing_queue) > 0: # send next item
-                    item = self._outgoing_queue[0]
+                if len(self._outgoing_queue) > 0: # send pending items
+                    # OpenSSL wants a write which would block retried with
+                    # the same buffer, more may have been queued meanwhile
+                    if self._write_retry is None:
+                        self._write_retry = self._gather_outgoing()
                     try:
-                        ret = self._transport.send(item.read())
+                        sent = self._transport.send(self._write_retry)
                     except (OpenSSL.WantX509LookupError,
                             OpenSSL.WantReadError, OpenSSL.WantWriteError):
+                        self._stats.sent(0)
                         return True
                     except OpenSSL.Error:
                         self.close()
                         return False
-                    item.sent(ret)
-                    if item.is_complete(): # sent item
-                        self.emit("sent", item.buffer, item.size)
-                        item.callback()
-                        del self._outgoing_queue[0]
-                        del item
+                    self._write_retry = None
+                    self._stats.sent(sent)
+                    self._outgoing_sent(sent)
                     if len(self._outgoing_queue) == 0:
                         self._watch_remove_cond(gobject.IO_OUT)
                 else:
@@ -122,4 +205,32 @@ class SSLSocketClient(GIOChannelClient):
 
         return True
 
+    def _drain(self):
+        """Reads from the SSL connection until it would block or until the
+        receive budget is exhausted, data already decrypted by OpenSSL is
+        always consumed since the socket won't signal it again.
+
+            @return: the chunks read and whether the connection was closed
+            @rtype: tuple(list, bool)"""
+        chunks = []
+        received = 0
+        reads = 0
+        eof = False
+        try:
+            while received < self._receive_budget or self._transport.pending():
+                reads += 1
+                buf = self._transport.recv(self._receive_size)
+                if buf == "":
+                    eof = (sys.platform != "win32")
+                    break
+                chunks.append(buf)
+                received += len(buf)
+        except (OpenSSL.WantX509LookupError,
+                OpenSSL.WantReadError, OpenSSL.WantWriteError):
+            pass
+        except OpenSSL.Error:
+            eof = True
+        self._stats.received(reads, received)
+        return chunks, eof
+
 gobject.type_register(SSLSocketClient)
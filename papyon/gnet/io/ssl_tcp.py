@@ -34,15 +34,20 @@ class SSLTCPClient(SSLSocketClient, ProxyfiableClient):
 
         @since: 0.1"""
 
-    def __init__(self, host, port):
+    def __init__(self, host, port, context_cache=None):
         """initializer
 
             @param host: the hostname to connect to.
             @type host: string
 
             @param port: the port number to connect to.
-            @type port: integer > 0 and < 65536"""
-        SSLSocketClient.__init__(self, host, port, AF_INET, SOCK_STREAM)
+            @type port: integer > 0 and < 65536
+
+            @param context_cache: the SSL contexts and sessions to use,
+                the process wide cache if None
+            @type context_cache: L{SSLContextCache}"""
+        SSLSocketClient.__init__(self, host, port, AF_INET, SOCK_STREAM,
+                context_cache)
         ProxyfiableClient.__init__(self)
 
     @property
@@ -39,6 +39,10 @@ class HTTPMessage(object):
 
         @ivar body: HTTP Message Body
         @type body: string
+
+        @ivar content_decoded: whether the body was already decoded
+            according to the "Content-Encoding" header
+        @type content_decoded: bool
     """
     def __init__(self):
         self.clear()
@@ -60,6 +64,7 @@ class HTTPMessage(object):
         """Empties the HTTP message"""
         self.headers = odict()
         self.body = ""
+        self.content_decoded = False
         
     def parse(self, chunk):
         """Parses a given chunk of data and fill in the current object
@@ -88,7 +93,7 @@ class HTTPMessage(object):
            @raises HTTPParseError: if encoding is unknown"""
 
         encoding = self.headers.get("Content-Encoding", "")
-        if encoding == "":
+        if encoding == "" or self.content_decoded:
             body = self.body
         elif encoding == "gzip":
             body_stream = StringIO.StringIO(self.body)
@@ -154,14 +159,20 @@ class HTTPResponse(HTTPMessage):
 
     def parse(self, chunk):
         start_line, message = chunk.split("\r\n", 1)
-        
-        version, status, reason  = start_line.split(" ", 2)
+        HTTPMessage.parse(self, message)
+        self.parse_start_line(start_line)
+
+    def parse_start_line(self, start_line):
+        """Parses the status line of the response"""
+        try:
+            version, status, reason  = start_line.split(" ", 2)
+        except ValueError:
+            version, status = start_line.split(" ", 1)
+            reason = ""
         self.status = int(status)
         self.reason = reason
         self.version = version.split("/",1)[1]
 
-        HTTPMessage.parse(self, message)
-
     def __str__(self):
         message = HTTPMessage.__str__(self)
         start_line = "HTTP/%s %d %s" % (self.version, self.status, self.reason)
@@ -21,9 +21,12 @@
 """Incomming data parsers."""
 
 from constants import *
+from buffer import ReceiveBuffer
+from errors import HTTPParseError
 from message.HTTP import HTTPResponse
 
 import gobject
+import zlib
 
 __all__ = ['AbstractParser', 'DelimiterParser']
 
@@ -94,38 +97,30 @@ class DelimiterParser(AbstractParser):
         self._chunk_delimiter = "\n"
 
     def _reset_state(self):
-        self._recv_cache = ""
+        self._recv_buffer = ReceiveBuffer()
 
     def _on_received(self, transport, buf, length):
-        self._recv_cache += buf
-        self._process_recv_cache()
-
-    def _process_recv_cache(self):
-        if len(self._recv_cache) == 0:
-            return
-        if self._chunk_delimiter is None or self._chunk_delimiter == "":
-            self.emit("received", self._recv_cache)
-            self._recv_cache = ""
-            return
-
-        previous_length = len(self._recv_cache)
-        while len(self._recv_cache) != 0:
-            if isinstance(self._chunk_delimiter, int):
-                available = len(self._recv_cache)
-                required = self._chunk_delimiter
-                if required <= available:
-                    self.emit ("received", self._recv_cache[:required])
-                    self._recv_cache = self._recv_cache[required:]
+        self._recv_buffer.append(buf)
+        self._process_recv_buffer()
+
+    def _process_recv_buffer(self):
+        while len(self._recv_buffer) != 0:
+            delimiter = self._chunk_delimiter
+            if not delimiter:
+                chunk = self._recv_buffer.read()
+            elif isinstance(delimiter, int):
+                if delimiter > len(self._recv_buffer):
+                    return
+                chunk = self._recv_buffer.read(delimiter)
             else:
-                s = self._recv_cache.split(self._chunk_delimiter, 1)
-                if len(s) > 1:
-                    self.emit("received", s[0])
-                    self._recv_cache = s[1]
-                else:
-                    self._recv_cache = s[0]
-            if len(self._recv_cache) == previous_length: # noting got consumed, exit
-                return
-            previous_length = len(self._recv_cache)
+                chunk = self._recv_buffer.read_until(delimiter)
+                if chunk is None:
+                    return
+            self.emit("received", chunk)
+
+    def flush(self):
+        """Consumes and returns whatever is left in the receive buffer."""
+        return self._recv_buffer.read()
 
     def _set_chunk_delimiter(self, delimiter):
         self._chunk_delimiter = delimiter
@@ -142,73 +137,166 @@ class HTTPParser(AbstractParser):
     """Receiver class that emit received signal when an HTTP response is
     received.
 
+    The body is framed by its Content-Length, by the chunked transfer
+    encoding or by the end of the connection, and gzip or deflate encoded
+    content is inflated, all as the data arrives. When body_consumer is
+    set, it is called with each response once its headers are parsed and
+    may return a callable, which then gets the decoded body chunks instead
+    of the response. When request_method is set, it is called with each
+    response to get the method of the request it answers, the responses
+    to a HEAD request have no body whatever their headers say.
+
     @since: 0.1"""
 
-    CHUNK_START_LINE = 0
-    CHUNK_HEADERS = 1
-    CHUNK_BODY = 2
+    STATE_START_LINE = 0
+    STATE_HEADERS = 1
+    STATE_BODY = 2
+    STATE_BODY_UNTIL_CLOSE = 3
+    STATE_CHUNK_SIZE = 4
+    STATE_CHUNK_DATA = 5
+    STATE_CHUNK_END = 6
+    STATE_TRAILER = 7
 
-    def __init__(self, transport):
-        self._parser = DelimiterParser(transport)
-        self._parser.connect("received", self._on_chunk_received)
-        transport.connect("notify::status", self._on_status_change)
-        AbstractParser.__init__(self, transport, connect_signals=False)
+    LINE_STATES = (STATE_START_LINE, STATE_HEADERS, STATE_CHUNK_SIZE,
+            STATE_CHUNK_END, STATE_TRAILER)
 
-    def enable(self):
-        AbstractParser.enable(self)
-        self._parser.enable()
+    # the responses which never have a body
+    NO_BODY_STATUS = (204, 304)
 
-    def disable(self):
-        AbstractParser.disable(self)
-        self._parser.disable()
+    def __init__(self, transport):
+        self.body_consumer = None
+        self.request_method = None
+        AbstractParser.__init__(self, transport)
 
     def _reset_state(self):
-        self._next_chunk = self.CHUNK_START_LINE
-        self._receive_buffer = ""
-        self._content_length = 0
-        self._parser.delimiter = "\r\n"
+        self._recv_buffer = ReceiveBuffer()
+        self._reset_message()
 
-    def _on_received(self, transport, buf, length):
-        pass
+    def _reset_message(self):
+        self._state = self.STATE_START_LINE
+        self._response = None
+        self._remaining = 0
+        self._decompressor = None
+        self._consumer = None
+        self._body = []
 
     def _on_status_change(self, transport, param):
         status = transport.get_property("status")
         if status == IoStatus.OPEN:
             self._reset_state()
         elif status == IoStatus.CLOSING:
-            self._receive_buffer += self._parser._recv_cache
-            self.__emit_result()
-
-    def _on_chunk_received(self, parser, chunk):
-        complete = False
-        if self._next_chunk == self.CHUNK_START_LINE:
-            self._receive_buffer += chunk + "\r\n"
-            self._next_chunk = self.CHUNK_HEADERS
-        elif self._next_chunk == self.CHUNK_HEADERS:
-            self._receive_buffer += chunk + "\r\n"
-            if chunk == "":
-                if self._content_length == 0:
-                    complete = True
+            if self._state == self.STATE_BODY_UNTIL_CLOSE:
+                self._feed_body(self._recv_buffer.read())
+                self._complete()
+
+    def _on_received(self, transport, buf, length):
+        self._recv_buffer.append(buf)
+        # the buffer gets replaced if the parser is disabled meanwhile
+        while len(self._recv_buffer) > 0:
+            state = self._state
+            if state in self.LINE_STATES:
+                line = self._recv_buffer.read_until("\r\n")
+                if line is None:
+                    return
+                self._on_line(line)
+            elif state == self.STATE_BODY_UNTIL_CLOSE:
+                self._feed_body(self._recv_buffer.read())
+            else:
+                data = self._recv_buffer.read(self._remaining)
+                self._remaining -= len(data)
+                self._feed_body(data)
+                if self._remaining > 0:
+                    continue
+                if state == self.STATE_BODY:
+                    self._complete()
                 else:
-                    self._parser.delimiter = self._content_length or 0
-                    self._next_chunk = self.CHUNK_BODY
+                    self._state = self.STATE_CHUNK_END
+
+    def _on_line(self, line):
+        state = self._state
+        if state == self.STATE_START_LINE:
+            if line == "":
+                return
+            self._response = HTTPResponse()
+            self._response.parse_start_line(line)
+            self._state = self.STATE_HEADERS
+        elif state == self.STATE_HEADERS:
+            if line == "":
+                self._start_body()
+                return
+            try:
+                name, value = line.split(":", 1)
+            except ValueError:
+                raise HTTPParseError("Invalid header line: %s" % line)
+            self._response.add_header(name.strip(), value.strip())
+        elif state == self.STATE_CHUNK_SIZE:
+            size = int(line.split(";", 1)[0].strip(), 16)
+            if size == 0:
+                self._state = self.STATE_TRAILER
+            else:
+                self._remaining = size
+                self._state = self.STATE_CHUNK_DATA
+        elif state == self.STATE_CHUNK_END:
+            self._state = self.STATE_CHUNK_SIZE
+        elif state == self.STATE_TRAILER:
+            if line == "":
+                self._complete()
+
+    def _start_body(self):
+        response = self._response
+        if response.status < 200 or response.status in self.NO_BODY_STATUS \
+                or (self.request_method is not None and
+                        self.request_method(response) == "HEAD"):
+            self._complete()
+            return
+
+        headers = {}
+        for name, value in response.headers.iteritems():
+            headers[name.lower()] = value
+
+        encoding = headers.get("content-encoding", "").lower()
+        if encoding == "gzip":
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            self._decompressor = zlib.decompressobj()
+        if self.body_consumer is not None:
+            self._consumer = self.body_consumer(response)
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            self._state = self.STATE_CHUNK_SIZE
+        elif "content-length" in headers:
+            self._remaining = int(headers["content-length"])
+            if self._remaining == 0:
+                self._complete()
             else:
-                header, value = chunk.split(":", 1)
-                header, value = header.strip(), value.strip()
-                if header == "Content-Length":
-                    self._content_length = int(value)
-        elif self._next_chunk == self.CHUNK_BODY:
-            self._receive_buffer += chunk
-            if self._content_length is not None:
-                complete = True
-
-        if complete:
-            self.__emit_result()
-
-    def __emit_result(self):
-        if self._receive_buffer == "":
+                self._state = self.STATE_BODY
+        elif response.version == "1.0" or \
+                headers.get("connection", "").lower() == "close":
+            self._state = self.STATE_BODY_UNTIL_CLOSE
+        else:
+            self._complete()
+
+    def _feed_body(self, data):
+        if self._decompressor is not None:
+            try:
+                data = self._decompressor.decompress(data)
+            except zlib.error, err:
+                raise HTTPParseError("Invalid encoded body: %s" % err)
+        if not data:
             return
-        response = HTTPResponse()
-        response.parse(self._receive_buffer)
+        if self._consumer is not None:
+            self._consumer(data)
+        else:
+            self._body.append(data)
+
+    def _complete(self):
+        response = self._response
+        if self._decompressor is not None:
+            tail = self._decompressor.flush()
+            self._decompressor = None
+            self._feed_body(tail)
+            response.content_decoded = True
+        response.body = "".join(self._body)
+        self._reset_message()
         self.emit("received", response)
-        self._reset_state()
+gobject.type_register(HTTPParser)
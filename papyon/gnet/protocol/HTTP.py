@@ -24,6 +24,8 @@ from papyon.gnet.message.HTTP import HTTPRequest
 from papyon.gnet.io import TCPClient
 from papyon.gnet.parser import HTTPParser
 from papyon.gnet.proxy.factory import ProxyFactory
+from papyon.gnet import reactor
+from papyon.gnet import stats
 
 from urlparse import urlsplit
 
@@ -31,14 +33,35 @@ import gobject
 import base64
 import logging
 import platform
+import time
 
 __all__ = ['HTTP']
 
 logger = logging.getLogger('papyon.gnet.HTTP')
 
 
+class HTTPTransaction(object):
+    """A request queued on an HTTP connection"""
+
+    def __init__(self, request, idempotent, consumer=None):
+        self.request = request
+        self.idempotent = idempotent
+        self.consumer = consumer
+        self.queued_time = time.time()
+        self.sent_time = None
+        self.timeout_source = None
+
+    def __str__(self):
+        return str(self.request)
+
+
 class HTTP(gobject.GObject):
-    """HTTP protocol client class."""
+    """HTTP protocol client class.
+
+    Requests are sent as HTTP/1.1 and the connection is kept open between
+    them until the server closes it. When pipelining is enabled, idempotent
+    requests are written without waiting for the response to the previous
+    ones."""
     
     __gsignals__ = {
             "error" : (gobject.SIGNAL_RUN_FIRST,
@@ -54,6 +77,9 @@ class HTTP(gobject.GObject):
                 (object,)), # HTTPRequest
             }
 
+    IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+    MAX_PIPELINED = 4
+
     def __init__(self, host, port=80, proxies={}):
         """Connection initialization
         
@@ -72,9 +98,10 @@ class HTTP(gobject.GObject):
         self._http_proxy = None
         self._transport = None
         self._http_parser = None
-        self._outgoing_queue = []
+        self._outgoing_queue = [] # [HTTPTransaction, ...]
+        self._in_flight = 0 # requests of the queue head written
+        self._pipelining = False
         self._redirected = False
-        self._waiting_response = False
         self._parser_handles = []
         self._transport_handles = []
 
@@ -85,8 +112,10 @@ class HTTP(gobject.GObject):
         self._errored = False
         self.connect("error", self._on_self_error)
 
-    def _on_self_error(self, *args):
-        self._errored = True
+    def _on_self_error(self, http, error):
+        # an error status or a timeout doesn't prevent reusing the connection
+        if not isinstance(error, (HTTPError, HTTPTimeout)):
+            self._errored = True
 
     def _setup_transport(self):
         if self._transport is None:
@@ -98,6 +127,7 @@ class HTTP(gobject.GObject):
                 if self._proxies:
                     self._transport = ProxyFactory(self._transport,
                             self._proxies, 'http')
+            self._transport.stats.label = "HTTP"
             self._setup_parser()
         
         if self._transport.get_property("status") != IoStatus.OPEN:
@@ -105,6 +135,8 @@ class HTTP(gobject.GObject):
 
     def _setup_parser(self):
         self._http_parser = HTTPParser(self._transport)
+        self._http_parser.body_consumer = self._select_consumer
+        self._http_parser.request_method = self._answered_method
         self._parser_handles.append(self._http_parser.connect("received",
             self._on_response_received))
 
@@ -112,8 +144,6 @@ class HTTP(gobject.GObject):
             self._on_status_change))
         self._transport_handles.append(self._transport.connect("error",
             self._on_error))
-        self._transport_handles.append(self._transport.connect("sent",
-            self._on_request_sent))
 
     def _clean_transport(self):
         if self._http_parser:
@@ -129,26 +159,33 @@ class HTTP(gobject.GObject):
         if transport.get_property("status") == IoStatus.OPEN:
             self._process_queue()
         elif transport.get_property("status") == IoStatus.CLOSED and\
-                (self._waiting_response or len(self._outgoing_queue) > 0) and\
+                len(self._outgoing_queue) > 0 and\
                 not (self._errored or self._redirected):
-            self._waiting_response = False
+            # the requests written are sent again on a new connection
+            self._in_flight = 0
             self._setup_transport()
 
-    def _on_request_sent(self, transport, request, length):
-        self._waiting_response = True
-        assert(str(self._outgoing_queue[0]) == request)
-        self.emit("request-sent", self._outgoing_queue[0])
+    def _on_request_sent(self, transaction):
+        self.emit("request-sent", transaction.request)
+
+    def _select_consumer(self, response):
+        if self._in_flight == 0 or response.status in (301, 302):
+            return None
+        return self._outgoing_queue[0].consumer
+
+    def _answered_method(self, response):
+        if self._in_flight == 0:
+            return None
+        return self._outgoing_queue[0].request.method
 
     def _on_response_received(self, parser, response):
         if response.status >= 100 and response.status < 200:
             return
-        if not self._waiting_response:
+        if self._in_flight == 0:
             logger.warning("Received response but wasn't waiting for one")
             logger.warning("<<< " + str(response))
             return
 
-        self._waiting_response = False
-
         if response.status in (301, 302):
             self.close()
             location = response.headers['Location']
@@ -157,7 +194,8 @@ class HTTP(gobject.GObject):
 
             protocol, host, path, query, fragment = urlsplit(location)
             self._redirected = True
-            self._outgoing_queue[0].headers['Host'] = host
+            for transaction in self._outgoing_queue:
+                transaction.request.headers['Host'] = host
 
             try:
                 host, port = host.rsplit(":", 1)
@@ -166,11 +204,13 @@ class HTTP(gobject.GObject):
                 port = None
             self._host = host
             self._redirected = False
+            self._in_flight = 0
             self._setup_transport()
             return
 
-        if len(self._outgoing_queue) > 0:
-            self._outgoing_queue.pop(0) # pop the request from the queue
+        transaction = self._outgoing_queue.pop(0)
+        self._in_flight -= 1
+        self._complete(transaction)
         if response.status >= 400:
             logger.error("Received error code %i (%s) from %s:%i" %
                 (response.status, response.reason, self._host, self._port))
@@ -182,17 +222,83 @@ class HTTP(gobject.GObject):
     def _on_error(self, transport, error):
         self.emit("error", error)
 
+    def _on_request_timeout(self, transaction):
+        transaction.timeout_source = None
+        index = self._outgoing_queue.index(transaction)
+        del self._outgoing_queue[index]
+        error = HTTPTimeout(transaction.request)
+        logger.warning("Request %s %s to %s timed out" % (
+            transaction.request.method, transaction.request.resource,
+            self._host))
+        if index < self._in_flight:
+            # its response would be taken for the one of the next request,
+            # start over with a new connection
+            self._in_flight = 0
+            self.close()
+        self._complete(transaction, error)
+        self.emit("error", error)
+        self._process_queue()
+        return False
+
+    def _complete(self, transaction, error=None):
+        if transaction.timeout_source is not None:
+            reactor.source_remove(transaction.timeout_source)
+            transaction.timeout_source = None
+        queue_time = server_time = None
+        now = time.time()
+        if transaction.sent_time is not None:
+            queue_time = transaction.sent_time - transaction.queued_time
+            server_time = now - transaction.sent_time
+        else:
+            queue_time = now - transaction.queued_time
+        stats.request_completed(self._host, transaction.request,
+                queue_time, server_time, error)
+
+    def _can_send(self, transaction):
+        if self._in_flight == 0:
+            return True
+        if not self._pipelining or self._in_flight >= self.MAX_PIPELINED:
+            return False
+        if not transaction.idempotent:
+            return False
+        for pending in self._outgoing_queue[:self._in_flight]:
+            if not pending.idempotent:
+                return False
+        return True
+
     def _process_queue(self):
-        if len(self._outgoing_queue) == 0 or \
-                self._waiting_response: # no pipelining
+        if len(self._outgoing_queue) <= self._in_flight:
             return
         if self._transport is None or \
                 self._transport.get_property("status") != IoStatus.OPEN:
             self._setup_transport()
             return
-        self._transport.send(str(self._outgoing_queue[0]))
-
-    def request(self, resource='/', headers=None, data='', method='GET'):
+        while len(self._outgoing_queue) > self._in_flight:
+            transaction = self._outgoing_queue[self._in_flight]
+            if not self._can_send(transaction):
+                break
+            self._in_flight += 1
+            transaction.sent_time = time.time()
+            self._transport.send(str(transaction),
+                    (self._on_request_sent, transaction))
+
+    def request(self, resource='/', headers=None, data='', method='GET',
+            timeout=None, idempotent=None, consumer=None):
+        """Queues a request
+
+            @param timeout: seconds after which the request fails with
+                L{HTTPTimeout}, only this request is failed and the
+                connection is opened again if needed.
+            @type timeout: integer
+
+            @param idempotent: whether the request may be pipelined, by
+                default only the requests using an idempotent method are
+            @type idempotent: boolean
+
+            @param consumer: called with each chunk of the decoded response
+                body as it arrives, the body of the response emitted is
+                then left empty
+            @type consumer: callable"""
         if headers is None:
             headers = {}
         headers['Host'] = self._host + ':' + str(self._port)
@@ -209,12 +315,62 @@ class HTTP(gobject.GObject):
                 headers['Proxy-Authorization'] = 'Basic ' + credentials
         else:
             url = resource
-        request  = HTTPRequest(headers, data, method, url)
-        self._outgoing_queue.append(request)
+        if idempotent is None:
+            idempotent = method in self.IDEMPOTENT_METHODS
+        request  = HTTPRequest(headers, data, method, url, "1.1")
+        transaction = HTTPTransaction(request, idempotent, consumer)
+        if timeout is not None:
+            transaction.timeout_source = reactor.timeout_add(
+                    int(timeout * 1000), self._on_request_timeout, transaction)
+        self._outgoing_queue.append(transaction)
         self._process_queue()
 
+    @property
+    def host(self):
+        return self._host
+
+    @property
+    def port(self):
+        return self._port
+
+    @property
+    def pending(self):
+        "The number of requests queued or waiting for a response."
+        return len(self._outgoing_queue)
+
+    @property
+    def reusable(self):
+        """Whether new requests can be sent on this connection: it didn't
+        fail and is either still unopened or open."""
+        if self._errored or self._redirected:
+            return False
+        if self._transport is None:
+            return True
+        return self._transport.get_property("status") in \
+                (IoStatus.OPENING, IoStatus.OPEN)
+
+    def __get_pipelining(self):
+        """Whether idempotent requests are written without waiting for the
+        response to the previous ones, at most MAX_PIPELINED at once."""
+        return self._pipelining
+    def __set_pipelining(self, pipelining):
+        self._pipelining = pipelining
+        self._process_queue()
+    pipelining = property(__get_pipelining, __set_pipelining)
+
     def close(self):
         self._clean_transport()
         if self._transport:
             self._transport.close()
         self._transport = None
+
+    def cancel(self):
+        """Closes the connection and fails each request still queued with
+        L{HTTPCancelled}, none of them is sent again."""
+        transactions, self._outgoing_queue = self._outgoing_queue, []
+        self._in_flight = 0
+        self.close()
+        for transaction in transactions:
+            error = HTTPCancelled(transaction.request)
+            self._complete(transaction, error)
+            self.emit("error", error)
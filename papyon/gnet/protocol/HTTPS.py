@@ -47,6 +47,7 @@ class HTTPS(HTTP):
             if self._proxies:
                 self._transport = ProxyFactory(self._transport, self._proxies,
                         preferred='https')
+            self._transport.stats.label = "HTTPS"
             self._setup_parser()
         
         if self._transport.get_property("status") != IoStatus.OPEN:
@@ -21,6 +21,7 @@
 
 from HTTP import *
 from HTTPS import *
+from pool import *
 
 def ProtocolFactory(protocol, host, port=None, proxies={}):
     if protocol == "http":
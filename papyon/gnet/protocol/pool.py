@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+
+"""Pool of persistent HTTP connections."""
+
+from papyon.gnet import reactor
+from papyon.gnet.errors import IoError
+from papyon.util.async import run
+
+import logging
+
+__all__ = ['HTTPConnectionPool']
+
+logger = logging.getLogger('papyon.gnet.pool')
+
+class HTTPConnectionPool(object):
+    """Keeps HTTP connections open between requests and hands them out to
+    one user at a time.
+
+    Connections are grouped by proxy and (scheme, host, port), at most
+    max_connections are opened per group; once they are all in use the
+    next users wait for one to be released. A released connection stays
+    open for idle_timeout seconds, and is only handed out again if it
+    is still healthy, a connection tunnelled through a proxy is thus
+    reused without going through the proxy handshake again.
+
+        @since: 0.5"""
+
+    MAX_CONNECTIONS = 4
+    IDLE_TIMEOUT = 60
+
+    def __init__(self, proxies=None, max_connections=None, idle_timeout=None):
+        """Initializer
+
+            @param proxies: proxies to use for the connections
+            @type proxies: {type: string => L{gnet.proxy.ProxyInfos}}
+
+            @param max_connections: number of connections per host
+            @type max_connections: integer
+
+            @param idle_timeout: seconds before an unused connection gets
+                closed
+            @type idle_timeout: integer"""
+        self._proxies = proxies or {}
+        self._max_connections = max_connections or self.MAX_CONNECTIONS
+        self._idle_timeout = idle_timeout or self.IDLE_TIMEOUT
+        self._connections = {} # key => [connection, ...]
+        self._busy = set()
+        self._idle_sources = {} # connection => timeout source
+        self._waiters = {} # key => [(callback, errback), ...]
+        self.opened = 0
+        self.reused = 0
+
+    def acquire(self, scheme, host, port, callback, errback=None):
+        """Calls callback with a connection to the given host as soon as
+        one is available. The connection must be given back with
+        L{release} once the request is completed.
+
+            @param callback: called with the connection as first argument
+            @type callback: tuple(callable, args)
+
+            @param errback: called with an L{IoError} if the pool is closed
+                while waiting for a connection
+            @type errback: tuple(callable, args)"""
+        key = (self._proxy_key(scheme), scheme, host, port)
+        connection = self._get_idle(key)
+        if connection is None:
+            connection = self._create(key)
+        else:
+            self.reused += 1
+        if connection is None:
+            self._waiters.setdefault(key, []).append((callback, errback))
+            return
+        self._busy.add(connection)
+        run(callback, connection)
+
+    def release(self, connection):
+        """Gives back a connection obtained with L{acquire}"""
+        if connection not in self._busy:
+            return
+        self._busy.discard(connection)
+        key = self._key(connection)
+        if key is None:
+            return
+        reused = True
+        if not self._is_healthy(key, connection):
+            self._discard(key, connection)
+            connection = self._create(key)
+            if connection is None:
+                return
+            reused = False
+        waiters = self._waiters.get(key, [])
+        if len(waiters) > 0:
+            callback, errback = waiters.pop(0)
+            self._busy.add(connection)
+            if reused:
+                self.reused += 1
+            run(callback, connection)
+            return
+        self._idle_sources[connection] = reactor.timeout_add_seconds(
+                self._idle_timeout, self._on_idle_timeout, key, connection)
+
+    def close(self):
+        """Closes all the connections and fails the users still waiting
+        for one"""
+        for key, connections in self._connections.items():
+            for connection in connections[:]:
+                self._discard(key, connection)
+        waiters = self._waiters.values()
+        self._waiters.clear()
+        for callbacks in waiters:
+            for callback, errback in callbacks:
+                run(errback, IoError(IoError.CONNECTION_CLOSED))
+
+    def _proxy_key(self, scheme):
+        # HTTP and HTTPS connections go through the proxy of their scheme
+        proxy = self._proxies.get(scheme, None)
+        if proxy is None:
+            return None
+        return proxy.key
+
+    def _key(self, connection):
+        for key, connections in self._connections.iteritems():
+            if connection in connections:
+                return key
+        return None
+
+    def _is_healthy(self, key, connection):
+        # a redirected connection now points to another host
+        return connection.reusable and connection.host == key[2]
+
+    def _get_idle(self, key):
+        for connection in reversed(self._connections.get(key, [])[:]):
+            if connection in self._busy:
+                continue
+            if not self._is_healthy(key, connection):
+                self._discard(key, connection)
+                continue
+            source = self._idle_sources.pop(connection, None)
+            if source is not None:
+                reactor.source_remove(source)
+            return connection
+        return None
+
+    def _create(self, key):
+        import papyon.gnet.protocol
+        connections = self._connections.setdefault(key, [])
+        if len(connections) >= self._max_connections:
+            return None
+        proxy, scheme, host, port = key
+        connection = papyon.gnet.protocol.ProtocolFactory(scheme, host, port,
+                proxies=self._proxies)
+        connections.append(connection)
+        self.opened += 1
+        logger.debug("Opening HTTP connection %d to %s" % (self.opened, host))
+        return connection
+
+    def _discard(self, key, connection):
+        source = self._idle_sources.pop(connection, None)
+        if source is not None:
+            reactor.source_remove(source)
+        self._busy.discard(connection)
+        connections = self._connections.get(key, [])
+        if connection in connections:
+            connections.remove(connection)
+        if len(connections) == 0:
+            self._connections.pop(key, None)
+        # its requests would otherwise time out long after
+        connection.cancel()
+
+    def _on_idle_timeout(self, key, connection):
+        self._idle_sources.pop(connection, None)
+        self._discard(key, connection)
+        return False
@@ -51,6 +51,7 @@ class HTTPConnectProxy(AbstractProxy):
 
     def _post_open(self):
         AbstractProxy._post_open(self)
+        self._handshake_started()
         proxy_protocol  = 'CONNECT %s:%s HTTP/1.1\r\n' % (self.host, self.port)
         proxy_protocol += 'Proxy-Connection: Keep-Alive\r\n'
         proxy_protocol += 'Pragma: no-cache\r\n'
@@ -106,7 +107,7 @@ class HTTPConnectProxy(AbstractProxy):
             if response.status == 200:
                 self._http_parser.disable()
                 self._transport.disable()
-                self._client._proxy_open()
+                self._handshake_completed()
             elif response.status == 100:
                 return True
             else:
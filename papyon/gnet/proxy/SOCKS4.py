@@ -63,6 +63,7 @@ class SOCKS4Proxy(AbstractProxy):
 
     def _post_open(self):
         AbstractProxy._post_open(self)
+        self._handshake_started()
         user = self._proxy.user
 
         proxy_protocol  = struct.pack('!BBH', SOCKS4Proxy.PROTOCOL_VERSION,
@@ -122,7 +123,7 @@ class SOCKS4Proxy(AbstractProxy):
             if response_code == 90:
                 self._delimiter_parser.disable()
                 self._transport.disable()
-                self._client._proxy_open()
+                self._handshake_completed()
             else:
                 logger.error("Connection failed (%s)" % response_code)
                 self.close()
@@ -55,6 +55,7 @@ class SOCKS5Proxy(AbstractProxy):
     STATE_RECV_IPV4_ADDR = 0x04
     STATE_RECV_ADDR_LEN = 0x05
     STATE_RECV_DOMAINNAME = 0x06
+    STATE_RECV_PORT = 0x07
 
     CODE_SUCCEEDED = 0x00
     CODE_SRV_FAILURE = 0x01
@@ -70,6 +71,13 @@ class SOCKS5Proxy(AbstractProxy):
     AUTH_REPLY_LEN = 2
     CONN_REPLY_LEN = 4
     IPV4_ADDR_LEN = 4
+    PORT_LEN = 2
+
+    # proxy key => authentication method the proxy chose, once known the
+    # whole handshake is sent at once instead of waiting for each reply
+    _negotiations = {}
+    # proxies which failed a pipelined handshake
+    _no_pipelining = set()
 
     """Proxy class used to communicate with SOCKS5 proxies."""
     def __init__(self, client, proxy):
@@ -92,6 +100,7 @@ class SOCKS5Proxy(AbstractProxy):
 
         self._state = None
         self._must_auth = False
+        self._pipelined = False
 
     # Opening state methods
     def _pre_open(self, io_object=None):
@@ -99,9 +108,15 @@ class SOCKS5Proxy(AbstractProxy):
 
     def _post_open(self):
         AbstractProxy._post_open(self)
+        self._handshake_started()
         self._delimiter_parser.enable()
-        self._send_nego_msg()
-        
+        self._pipelined = False
+        method = self._negotiations.get(self._proxy.key, None)
+        if method is not None and self._proxy.key not in self._no_pipelining:
+            self._send_pipelined_msgs(method)
+        else:
+            self._send_nego_msg()
+
     # Public API
     @property
     def protocol(self):
@@ -126,7 +141,20 @@ class SOCKS5Proxy(AbstractProxy):
     def send(self, buffer, callback=None, errback=None):
         self._client.send(buffer, callback, errback)
 
+    @classmethod
+    def clear_negotiations(cls):
+        """Forgets the negotiations cached for every proxy"""
+        cls._negotiations.clear()
+        cls._no_pipelining.clear()
+
     # Handshake
+    def _build_nego_msg(self, methods):
+        msg = struct.pack('!BB', SOCKS5Proxy.VERSION,
+                len(methods))
+        for method in methods:
+            msg += struct.pack('B', method)
+        return msg
+
     def _send_nego_msg(self):
         user = self._proxy.user
         password = self._proxy.password
@@ -135,17 +163,27 @@ class SOCKS5Proxy(AbstractProxy):
         if user or password:
             methods.append(self.AUTH_USR_PASS)
 
-        msg = struct.pack('!BB', SOCKS5Proxy.VERSION,
-                len(methods))
-        for method in methods:
-            msg += struct.pack('B', method)
-
         logger.info("Sending negotiation request (%i methods)" % len(methods))
         self._state = SOCKS5Proxy.STATE_NEGO
         self._delimiter_parser.delimiter = SOCKS5Proxy.NEGO_REPLY_LEN
-        self._transport.send(msg)
+        self._transport.send(self._build_nego_msg(methods))
         return True
 
+    def _send_pipelined_msgs(self, method):
+        # the proxy already chose this method, the replies are then
+        # parsed in turn as if each message had waited for the previous one
+        msg = self._build_nego_msg([method])
+        if method == SOCKS5Proxy.AUTH_USR_PASS:
+            msg += self._build_auth_msg()
+        msg += self._build_connect_msg()
+
+        logger.info("Sending pipelined handshake to %s:%u" % (self.host,
+            self.port))
+        self._pipelined = True
+        self._state = SOCKS5Proxy.STATE_NEGO
+        self._delimiter_parser.delimiter = SOCKS5Proxy.NEGO_REPLY_LEN
+        self._transport.send(msg)
+
     def _parse_nego_reply(self, response):
         version, method = struct.unpack('!BB', response[0:2])
         if version != SOCKS5Proxy.VERSION:
@@ -156,9 +194,10 @@ class SOCKS5Proxy(AbstractProxy):
 
         logger.info("Server chose authentication method %i" % method)
         self._must_auth = (method == SOCKS5Proxy.AUTH_USR_PASS)
+        self._negotiations[self._proxy.key] = method
         return True
 
-    def _send_auth_msg(self):
+    def _build_auth_msg(self):
         user = self._proxy.user
         password = self._proxy.password
 
@@ -173,38 +212,44 @@ class SOCKS5Proxy(AbstractProxy):
         msg += struct.pack('B', len(password))
         if password:
             msg += password
+        return msg
 
+    def _send_auth_msg(self):
         logger.info("Sending authentication request")
         self._state = SOCKS5Proxy.STATE_AUTH
         self._delimiter_parser.delimiter = SOCKS5Proxy.AUTH_REPLY_LEN
-        self._transport.send(msg)
+        self._transport.send(self._build_auth_msg())
 
     def _check_auth_status(self, response):
         version, code = struct.unpack('!BB', response[0:2])
-        if (version != SOCKS5Proxy.VERSION or
+        # RFC 1929 replies with the subnegotiation version, some proxies
+        # use the SOCKS version instead
+        if (version not in (SOCKS5Proxy.AUTH_VERSION, SOCKS5Proxy.VERSION) or
             code != SOCKS5Proxy.CODE_SUCCEEDED):
             raise Exception("Authentication didn't succeed (%s)" % code)
         logger.info("Authentication succeeded")
         return True
 
-    def _send_connect_msg(self):
+    def _build_connect_msg(self):
         msg = struct.pack('!BBB', SOCKS5Proxy.VERSION,
                 SOCKS5Proxy.CMD_CONNECT, SOCKS5Proxy.RESERVED)
         try:
             addr = socket.inet_aton(self.host)
-            msg += struct.pack('!BI', SOCKS5Proxy.ATYP_IPV4, addr)
-        except:
+            msg += struct.pack('!B', SOCKS5Proxy.ATYP_IPV4) + addr
+        except socket.error:
             if len(self.host) > SOCKS5Proxy.MAX_LEN:
                 raise Exception("Hostname is longer than max allowed length")
             msg += struct.pack('!BB', SOCKS5Proxy.ATYP_DOMAINNAME, len(self.host))
             msg += self.host
 
         msg += struct.pack('!H', self.port)
+        return msg
 
+    def _send_connect_msg(self):
         logger.info("Connection request to %s:%u" % (self.host, self.port))
         self._state = SOCKS5Proxy.STATE_CONN
         self._delimiter_parser.delimiter = SOCKS5Proxy.CONN_REPLY_LEN
-        self._transport.send(msg)
+        self._transport.send(self._build_connect_msg())
 
     def _parse_connect_reply(self, response):
         version, code, reserved, atyp = struct.unpack('!BBBB', response[0:4])
@@ -240,32 +285,62 @@ class SOCKS5Proxy(AbstractProxy):
             self._status = transport.status
 
     def _on_transport_error(self, transport, error):
+        self._pipelining_failed()
         self.close()
         self.emit("error", error)
 
+    def _pipelining_failed(self):
+        # the proxy may not cope with the messages sent at once, the next
+        # handshakes wait for each reply
+        if self._pipelined and self._state in (SOCKS5Proxy.STATE_NEGO,
+                SOCKS5Proxy.STATE_AUTH):
+            logger.warning("Pipelined handshake failed, disabling it")
+            self._no_pipelining.add(self._proxy.key)
+            self._negotiations.pop(self._proxy.key, None)
+
     def _on_proxy_response(self, parser, response):
         try:
             if self._state == SOCKS5Proxy.STATE_NEGO:
                 self._parse_nego_reply(response)
-                if self._must_auth:
+                if self._pipelined:
+                    if self._must_auth:
+                        self._state = SOCKS5Proxy.STATE_AUTH
+                        self._delimiter_parser.delimiter = \
+                                SOCKS5Proxy.AUTH_REPLY_LEN
+                    else:
+                        self._state = SOCKS5Proxy.STATE_CONN
+                        self._delimiter_parser.delimiter = \
+                                SOCKS5Proxy.CONN_REPLY_LEN
+                elif self._must_auth:
                     self._send_auth_msg()
                 else:
                     self._send_connect_msg()
             elif self._state == SOCKS5Proxy.STATE_AUTH:
                 self._check_auth_status(response)
-                self._send_connect_msg()
+                if self._pipelined:
+                    self._state = SOCKS5Proxy.STATE_CONN
+                    self._delimiter_parser.delimiter = \
+                            SOCKS5Proxy.CONN_REPLY_LEN
+                else:
+                    self._send_connect_msg()
             elif self._state == SOCKS5Proxy.STATE_CONN:
                 self._parse_connect_reply(response)
             elif self._state == SOCKS5Proxy.STATE_RECV_ADDR_LEN:
                 self._parse_domain_name_length(response)
             elif (self._state == SOCKS5Proxy.STATE_RECV_IPV4_ADDR or
                   self._state == SOCKS5Proxy.STATE_RECV_DOMAINNAME):
+                # the bound port ends the reply
+                self._state = SOCKS5Proxy.STATE_RECV_PORT
+                self._delimiter_parser.delimiter = SOCKS5Proxy.PORT_LEN
+            elif self._state == SOCKS5Proxy.STATE_RECV_PORT:
+                self._state = None
                 self._delimiter_parser.disable()
                 self._transport.disable()
-                self._client._proxy_open()
+                self._handshake_completed()
         except Exception, err:
             logger.error("Handshake failed")
             logger.exception(err)
+            self._pipelining_failed()
             self.close()
             self.emit("error", SOCKS5Error(self, str(err)))
         return False
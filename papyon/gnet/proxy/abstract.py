@@ -21,6 +21,7 @@ from papyon.gnet.io import AbstractClient
 from papyon.gnet.constants import IoStatus
 
 import gobject
+import time
 
 __all__ = ['AbstractProxy']
 
@@ -31,8 +32,44 @@ class AbstractProxy(AbstractClient):
         self._client.connect("sent", self._on_client_sent)
         self._client.connect("received", self._on_client_received)
         self._client.connect("notify::status", self._on_client_status)
+        self._client.connect("drained", self._on_client_drained)
+        self._handshake_start = None
         AbstractClient.__init__(self, client.host, client.port)
 
+    @property
+    def buffered_bytes(self):
+        return self._client.buffered_bytes
+
+    @property
+    def writable(self):
+        return self._client.writable
+
+    @property
+    def stats(self):
+        return self._client.stats
+
+    def __get_high_watermark(self):
+        return self._client.high_watermark
+    def __set_high_watermark(self, size):
+        self._client.high_watermark = size
+    high_watermark = property(__get_high_watermark, __set_high_watermark)
+
+    def __get_low_watermark(self):
+        return self._client.low_watermark
+    def __set_low_watermark(self, size):
+        self._client.low_watermark = size
+    low_watermark = property(__get_low_watermark, __set_low_watermark)
+
+    def _handshake_started(self):
+        self._handshake_start = time.time()
+
+    def _handshake_completed(self):
+        """Records the handshake time and hands the tunnel to the client"""
+        if self._handshake_start is not None:
+            self._client.stats.proxied(time.time() - self._handshake_start)
+            self._handshake_start = None
+        self._client._proxy_open()
+
     def _on_client_status(self, client, param):
         status = client.get_property("status")
         if status == IoStatus.OPEN:
@@ -45,4 +82,7 @@ class AbstractProxy(AbstractClient):
 
     def _on_client_received(self, client, data, length):
         self.emit("received", data, length)
+
+    def _on_client_drained(self, client):
+        self.emit("drained")
 gobject.type_register(AbstractProxy)
@@ -102,6 +102,12 @@ class ProxyInfos(object):
         self._type = type
     type = property(__get_type, __set_type, doc="Proxy type.")
 
+    @property
+    def key(self):
+        """Identifies the proxy, the connections going through proxies
+        with the same key are interchangeable"""
+        return (self.type, self.host, self.port, self.user)
+
     def __str__(self):
         host = '%s:%u' % (self.host, self.port)
         if self.user:
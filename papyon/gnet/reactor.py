@@ -0,0 +1,373 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+
+"""GNet event loop abstraction.
+
+All the IO watches, timeouts and idle callbacks of papyon go through the
+functions of this module, which forward them to the installed reactor.
+The GLib main loop is used by default, an epoll based reactor can be
+installed instead (before any connection is made) to run papyon without
+a GLib main loop:
+
+    import papyon.gnet.reactor as reactor
+    reactor.install(reactor.EpollReactor())
+    ...
+    reactor.run()
+
+The callbacks follow the GLib conventions: they keep being called as long
+as they return True."""
+
+import errno
+import fcntl
+import heapq
+import os
+import select
+import thread
+import threading
+import time
+
+import gobject
+
+__all__ = ['AbstractReactor', 'GLibReactor', 'EpollReactor',
+        'IO_IN', 'IO_OUT', 'IO_PRI', 'IO_ERR', 'IO_HUP', 'IO_NVAL']
+
+IO_IN = gobject.IO_IN
+IO_OUT = gobject.IO_OUT
+IO_PRI = gobject.IO_PRI
+IO_ERR = gobject.IO_ERR
+IO_HUP = gobject.IO_HUP
+IO_NVAL = gobject.IO_NVAL
+
+class AbstractReactor(object):
+    """Event loop interface used by papyon"""
+
+    def io_add_watch(self, fd, condition, callback, *args):
+        """Calls callback(fd, condition, *args) when fd meets condition.
+
+            @param fd: a file descriptor or an object with a fileno method
+            @param condition: a combination of the IO_* constants
+            @return: the source id"""
+        raise NotImplementedError
+
+    def timeout_add(self, interval, callback, *args):
+        """Calls callback(*args) every interval milliseconds.
+
+            @return: the source id"""
+        raise NotImplementedError
+
+    def timeout_add_seconds(self, interval, callback, *args):
+        """Calls callback(*args) every interval seconds.
+
+            @return: the source id"""
+        return self.timeout_add(interval * 1000, callback, *args)
+
+    def idle_add(self, callback, *args):
+        """Calls callback(*args) when the loop has nothing else to do, can
+        be called from any thread.
+
+            @return: the source id"""
+        raise NotImplementedError
+
+    def source_remove(self, source_id):
+        """Removes a watch, timeout or idle callback"""
+        raise NotImplementedError
+
+    def call_later(self, delay, callback, *args):
+        """Calls callback(*args) once after delay seconds"""
+        def call():
+            callback(*args)
+            return False
+        return self.timeout_add(int(delay * 1000), call)
+
+    def call_soon(self, callback, *args):
+        """Calls callback(*args) once, at the next loop iteration"""
+        def call():
+            callback(*args)
+            return False
+        return self.idle_add(call)
+
+    def threads_init(self):
+        """Needs to be called before callbacks are posted from threads"""
+        pass
+
+    def run(self):
+        """Runs the loop until quit is called"""
+        raise NotImplementedError
+
+    def quit(self):
+        raise NotImplementedError
+
+
+class GLibReactor(AbstractReactor):
+    """Reactor running on the default GLib main context"""
+
+    def __init__(self):
+        self._mainloop = None
+
+    def io_add_watch(self, fd, condition, callback, *args):
+        return gobject.io_add_watch(fd, condition, callback, *args)
+
+    def timeout_add(self, interval, callback, *args):
+        return gobject.timeout_add(interval, callback, *args)
+
+    def timeout_add_seconds(self, interval, callback, *args):
+        return gobject.timeout_add_seconds(interval, callback, *args)
+
+    def idle_add(self, callback, *args):
+        return gobject.idle_add(callback, *args)
+
+    def source_remove(self, source_id):
+        return gobject.source_remove(source_id)
+
+    def threads_init(self):
+        gobject.threads_init()
+
+    def run(self):
+        self._mainloop = gobject.MainLoop()
+        self._mainloop.run()
+
+    def quit(self):
+        if self._mainloop is not None:
+            self._mainloop.quit()
+            self._mainloop = None
+
+
+class EpollReactor(AbstractReactor):
+    """Reactor built on epoll (Linux only), it doesn't need a GLib main
+    loop and keeps its cost per wakeup independent of the number of
+    watched sockets."""
+
+    EVENTS = ((IO_IN, select.EPOLLIN), (IO_OUT, select.EPOLLOUT),
+              (IO_PRI, select.EPOLLPRI), (IO_ERR, select.EPOLLERR),
+              (IO_HUP, select.EPOLLHUP))
+
+    def __init__(self):
+        self._epoll = select.epoll()
+        self._next_id = 1
+        self._watches = {} # source id => (fd, object, condition, callback, args)
+        self._fd_watches = {} # fd => [source id, ...]
+        self._timeouts = {} # source id => (interval, callback, args, deadline)
+        self._timeout_heap = [] # [(deadline, source id), ...]
+        self._idles = {} # source id => (callback, args)
+        # the idle callbacks may be added from other threads
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread_id = thread.get_ident()
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        for fd in (self._wakeup_read, self._wakeup_write):
+            flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+            fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        self._epoll.register(self._wakeup_read, select.EPOLLIN)
+
+    def _new_id(self):
+        self._lock.acquire()
+        source_id = self._next_id
+        self._next_id += 1
+        self._lock.release()
+        return source_id
+
+    def _update_fd(self, fd):
+        events = 0
+        for source_id in self._fd_watches.get(fd, ()):
+            condition = self._watches[source_id][2]
+            for io_flag, epoll_flag in self.EVENTS:
+                if condition & io_flag:
+                    events |= epoll_flag
+        try:
+            if fd not in self._fd_watches:
+                self._epoll.unregister(fd)
+            else:
+                try:
+                    self._epoll.modify(fd, events)
+                except IOError, err:
+                    if err.errno != errno.ENOENT:
+                        raise
+                    self._epoll.register(fd, events)
+        except (IOError, ValueError):
+            # the fd was closed before its watch got removed
+            pass
+
+    def io_add_watch(self, fd, condition, callback, *args):
+        obj = fd
+        if not isinstance(fd, (int, long)):
+            fd = fd.fileno()
+        source_id = self._new_id()
+        self._watches[source_id] = (fd, obj, condition, callback, args)
+        self._fd_watches.setdefault(fd, []).append(source_id)
+        self._update_fd(fd)
+        return source_id
+
+    def timeout_add(self, interval, callback, *args):
+        source_id = self._new_id()
+        self._push_timeout(source_id, interval, callback, args,
+                time.time() + interval / 1000.0)
+        self._wakeup()
+        return source_id
+
+    def idle_add(self, callback, *args):
+        source_id = self._new_id()
+        self._lock.acquire()
+        self._idles[source_id] = (callback, args)
+        self._lock.release()
+        self._wakeup()
+        return source_id
+
+    def _push_timeout(self, source_id, interval, callback, args, deadline):
+        self._timeouts[source_id] = (interval, callback, args, deadline)
+        heapq.heappush(self._timeout_heap, (deadline, source_id))
+
+    def source_remove(self, source_id):
+        if source_id in self._watches:
+            fd = self._watches.pop(source_id)[0]
+            watches = self._fd_watches[fd]
+            watches.remove(source_id)
+            if len(watches) == 0:
+                del self._fd_watches[fd]
+            self._update_fd(fd)
+            return True
+        if source_id in self._timeouts:
+            deadline = self._timeouts.pop(source_id)[3]
+            try:
+                self._timeout_heap.remove((deadline, source_id))
+            except ValueError:
+                # removed by its own callback, it's already off the heap
+                return True
+            heapq.heapify(self._timeout_heap)
+            return True
+        self._lock.acquire()
+        idle = self._idles.pop(source_id, None)
+        self._lock.release()
+        return idle is not None
+
+    def _wakeup(self):
+        if self._running and thread.get_ident() != self._thread_id:
+            try:
+                os.write(self._wakeup_write, "x")
+            except OSError:
+                pass
+
+    def iteration(self, block=True):
+        """Runs one iteration of the loop"""
+        timeout = -1
+        if len(self._idles) > 0 or not block:
+            timeout = 0
+        elif len(self._timeout_heap) > 0:
+            timeout = max(0, self._timeout_heap[0][0] - time.time())
+
+        try:
+            events = self._epoll.poll(timeout)
+        except IOError, err:
+            if err.errno != errno.EINTR:
+                raise
+            events = []
+
+        for fd, epoll_events in events:
+            if fd == self._wakeup_read:
+                try:
+                    os.read(self._wakeup_read, 4096)
+                except OSError:
+                    pass
+                continue
+            condition = 0
+            for io_flag, epoll_flag in self.EVENTS:
+                if epoll_events & epoll_flag:
+                    condition |= io_flag
+            for source_id in self._fd_watches.get(fd, [])[:]:
+                watch = self._watches.get(source_id, None)
+                if watch is None or not (watch[2] & condition):
+                    continue
+                fd, obj, watch_condition, callback, args = watch
+                if not callback(obj, condition & watch_condition, *args):
+                    self.source_remove(source_id)
+
+        now = time.time()
+        while len(self._timeout_heap) > 0 and self._timeout_heap[0][0] <= now:
+            deadline, source_id = heapq.heappop(self._timeout_heap)
+            interval, callback, args, deadline = self._timeouts[source_id]
+            if callback(*args) and source_id in self._timeouts:
+                self._push_timeout(source_id, interval, callback, args,
+                        now + interval / 1000.0)
+            else:
+                self._timeouts.pop(source_id, None)
+
+        self._lock.acquire()
+        source_ids = self._idles.keys()
+        self._lock.release()
+        for source_id in source_ids:
+            idle = self._idles.get(source_id, None)
+            if idle is None:
+                continue
+            callback, args = idle
+            if not callback(*args):
+                self._lock.acquire()
+                self._idles.pop(source_id, None)
+                self._lock.release()
+
+    def run(self):
+        self._thread_id = thread.get_ident()
+        self._running = True
+        while self._running:
+            self.iteration()
+
+    def quit(self):
+        self._running = False
+        self._wakeup()
+
+
+_reactor = GLibReactor()
+
+def install(reactor):
+    """Installs the reactor used by papyon, this needs to be done before
+    any source is registered"""
+    global _reactor
+    _reactor = reactor
+
+def get_reactor():
+    """Returns the installed reactor"""
+    return _reactor
+
+def io_add_watch(fd, condition, callback, *args):
+    return _reactor.io_add_watch(fd, condition, callback, *args)
+
+def timeout_add(interval, callback, *args):
+    return _reactor.timeout_add(interval, callback, *args)
+
+def timeout_add_seconds(interval, callback, *args):
+    return _reactor.timeout_add_seconds(interval, callback, *args)
+
+def idle_add(callback, *args):
+    return _reactor.idle_add(callback, *args)
+
+def source_remove(source_id):
+    return _reactor.source_remove(source_id)
+
+def call_later(delay, callback, *args):
+    return _reactor.call_later(delay, callback, *args)
+
+def call_soon(callback, *args):
+    return _reactor.call_soon(callback, *args)
+
+def threads_init():
+    _reactor.threads_init()
+
+def run():
+    _reactor.run()
+
+def quit():
+    _reactor.quit()
@@ -17,17 +17,28 @@
 # Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
 #
 
-"""GNet dns resolver"""
+"""GNet dns resolver
 
+Lookups are run by a small pool of worker threads so that they never
+block the main loop, the answers are posted back to the main loop and
+kept in a cache shared by all the resolvers of the process."""
+
+import Queue
 import socket
+import threading
+import time
 
 import gobject
 
+from papyon.gnet import reactor
 from papyon.gnet.errors import IoError
 from papyon.util.async import run
-from papyon.util.decorator import async
+try:
+    from collections import OrderedDict as odict
+except ImportError:
+    from papyon.util.odict import odict
 
-__all__ = ['HostnameResolver']
+__all__ = ['HostnameResolver', 'HostnameResolverPool', 'HostnameCache']
 
 class HostnameResponse(object):
     def __init__(self, response):
@@ -56,25 +67,143 @@ class HostnameError(IoError):
     def __str__(self):
         return "Couldn't resolve hostname for \"%s\"" % (self.host)
 
-class HostnameResolver(object):
-    def __init__(self):
-        self._queries = {}
 
-    @async
+class HostnameCache(object):
+    """LRU cache of resolved hostnames.
+
+    Successful answers are kept for ttl seconds and failures for
+    negative_ttl seconds, since getaddrinfo doesn't expose the TTL of the
+    DNS records."""
+
+    def __init__(self, size=256, ttl=300, negative_ttl=30):
+        self.size = size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = odict() # host => (expires, response, error)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, host):
+        """Returns the cached (response, error) for host or None"""
+        entry = self._entries.get(host, None)
+        if entry is None:
+            return None
+        del self._entries[host]
+        expires, response, error = entry
+        if expires < time.time():
+            return None
+        self._entries[host] = entry
+        return response, error
+
+    def add(self, host, response=None, error=None):
+        if host in self._entries:
+            del self._entries[host]
+        elif len(self._entries) >= self.size:
+            del self._entries[self._entries.keys()[0]]
+        if error is None:
+            expires = time.time() + self.ttl
+        else:
+            expires = time.time() + self.negative_ttl
+        self._entries[host] = (expires, response, error)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class HostnameResolverPool(object):
+    """Pool of worker threads running the lookups.
+
+    Concurrent queries for the same host are coalesced into a single
+    lookup, the callbacks are always run from the main loop."""
+
+    def __init__(self, workers=4, cache=None, lookup=socket.getaddrinfo):
+        if cache is None:
+            cache = HostnameCache()
+        self.cache = cache
+        self._max_workers = workers
+        self._lookup = lookup
+        self._workers = []
+        self._requests = Queue.Queue()
+        self._pending = {} # host => [(callback, errback), ...]
+
     def query(self, host, callback, errback):
-        try:
-            result = socket.getaddrinfo(host, None, socket.AF_INET, socket.SOCK_STREAM)
-        except socket.gaierror:
-            result = []
+        cached = self.cache.get(host)
+        if cached is not None:
+            reactor.idle_add(self._dispatch, [(callback, errback)], *cached)
+            return
 
-        if len(result) == 0:
-            run(errback, HostnameError(host))
+        if host in self._pending:
+            self._pending[host].append((callback, errback))
             return
+        self._pending[host] = [(callback, errback)]
+        self._start_worker()
+        self._requests.put(host)
+
+    def _start_worker(self):
+        if len(self._workers) >= min(self._max_workers, len(self._pending)):
+            return
+        if not self._workers:
+            reactor.threads_init()
+        worker = threading.Thread(target=self._worker_loop,
+                name="papyon-resolver-%d" % len(self._workers))
+        worker.setDaemon(True)
+        self._workers.append(worker)
+        worker.start()
+
+    def _worker_loop(self):
+        while True:
+            host = self._requests.get()
+            try:
+                result = self._lookup(host, None, socket.AF_INET,
+                        socket.SOCK_STREAM)
+            except Exception:
+                result = []
+            reactor.idle_add(self._on_lookup_done, host, result)
+
+    def _on_lookup_done(self, host, result):
+        if len(result) == 0:
+            response, error = None, HostnameError(host)
+        else:
+            cname = result[0][3]
+            expires = time.time() + self.cache.ttl
+            addresses = []
+            for family, type, proto, canonname, sockaddr in result:
+                if (family, sockaddr[0]) not in addresses:
+                    addresses.append((family, sockaddr[0]))
+            addresses = tuple(addresses)
+            response = HostnameResponse((cname, expires, addresses))
+            error = None
+        self.cache.add(host, response, error)
+        self._dispatch(self._pending.pop(host, []), response, error)
+        return False
 
-        cname = result[0][3]
-        expires = 0
-        addresses = ((socket.AF_INET, result[0][4][0]),)
-        run(callback, HostnameResponse((cname, expires, addresses)))
+    def _dispatch(self, handlers, response, error):
+        for callback, errback in handlers:
+            if error is None:
+                run(callback, response)
+            else:
+                run(errback, error)
+        return False
+
+_default_pool = None
+
+def default_pool():
+    """Returns the resolver pool shared by the whole process"""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = HostnameResolverPool()
+    return _default_pool
+
+
+class HostnameResolver(object):
+    def __init__(self, pool=None):
+        if pool is None:
+            pool = default_pool()
+        self._pool = pool
+
+    def query(self, host, callback, errback):
+        self._pool.query(host, callback, errback)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+
+"""GNet IO statistics.
+
+Every IO client keeps an L{IoStats} instance updated as it runs, the
+module level functions give access to the statistics of all the clients
+still alive:
+
+    for entry in papyon.gnet.stats.snapshot():
+        print entry['host'], entry['bytes_received']"""
+
+import time
+import weakref
+
+from papyon.gnet import reactor
+
+__all__ = ['IoStats', 'register', 'clients', 'snapshot', 'reset',
+        'add_request_hook', 'remove_request_hook']
+
+CONDITIONS = (('in', reactor.IO_IN), ('out', reactor.IO_OUT),
+              ('pri', reactor.IO_PRI), ('err', reactor.IO_ERR),
+              ('hup', reactor.IO_HUP))
+
+class IoStats(object):
+    """Counters of a single IO client.
+
+        @ivar label: free form description set by the owner of the client
+        @ivar bytes_received: number of bytes read from the socket
+        @ivar bytes_sent: number of bytes written to the socket
+        @ivar reads: number of read calls
+        @ivar writes: number of write calls
+        @ivar queue_depth: number of packets waiting to be sent
+        @ivar peak_queue_depth: highest queue_depth seen
+        @ivar connect_time: seconds spent connecting, None until open
+        @ivar first_byte_time: seconds from the connection start to the
+            first byte received, None until then
+        @ivar proxy_time: seconds spent in the proxy handshake once
+            connected to the proxy, None if not proxied
+
+        @since: 0.5"""
+
+    __slots__ = ('label', 'bytes_received', 'bytes_sent', 'reads', 'writes',
+            '_wakeups', 'queue_depth', 'peak_queue_depth', 'connect_time',
+            'first_byte_time', 'proxy_time', '_open_time')
+
+    def __init__(self, label=None):
+        self.label = label
+        self._open_time = None
+        self.connect_time = None
+        self.first_byte_time = None
+        self.proxy_time = None
+        self.reset()
+
+    def reset(self):
+        """Resets the counters, the connection timings are kept"""
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.reads = 0
+        self.writes = 0
+        self._wakeups = {} # condition => count
+        self.queue_depth = 0
+        self.peak_queue_depth = 0
+
+    @property
+    def wakeups(self):
+        """Number of wakeups per condition name ('in', 'out', 'pri', 'err'
+        and 'hup'), a wakeup for several conditions counts for each."""
+        result = dict((name, 0) for name, flag in CONDITIONS)
+        for cond, count in self._wakeups.iteritems():
+            for name, flag in CONDITIONS:
+                if cond & flag:
+                    result[name] += count
+        return result
+
+    def opening(self):
+        self._open_time = time.time()
+        self.connect_time = None
+        self.first_byte_time = None
+        self.proxy_time = None
+
+    def opened(self):
+        if self._open_time is not None and self.connect_time is None:
+            self.connect_time = time.time() - self._open_time
+
+    def proxied(self, handshake_time):
+        self.proxy_time = handshake_time
+
+    def wakeup(self, cond):
+        self._wakeups[cond] = self._wakeups.get(cond, 0) + 1
+
+    def received(self, reads, size):
+        self.reads += reads
+        if size > 0 and self.first_byte_time is None and \
+                self._open_time is not None:
+            self.first_byte_time = time.time() - self._open_time
+        self.bytes_received += size
+
+    def sent(self, size):
+        self.writes += 1
+        self.bytes_sent += size
+
+    def queued(self, depth):
+        self.queue_depth = depth
+        if depth > self.peak_queue_depth:
+            self.peak_queue_depth = depth
+
+    def as_dict(self):
+        return {'label': self.label,
+                'bytes_received': self.bytes_received,
+                'bytes_sent': self.bytes_sent,
+                'reads': self.reads,
+                'writes': self.writes,
+                'wakeups': self.wakeups,
+                'queue_depth': self.queue_depth,
+                'peak_queue_depth': self.peak_queue_depth,
+                'connect_time': self.connect_time,
+                'first_byte_time': self.first_byte_time,
+                'proxy_time': self.proxy_time}
+
+
+_clients = weakref.WeakKeyDictionary() # client => None
+
+def register(client):
+    """Adds a client to the registry, it is dropped once garbage
+    collected"""
+    _clients[client] = None
+
+def clients():
+    """Returns the registered clients still alive"""
+    return _clients.keys()
+
+def snapshot():
+    """Returns the statistics of all the registered clients
+
+        @rtype: list of dict"""
+    result = []
+    for client in _clients.keys():
+        entry = client.stats.as_dict()
+        entry['class'] = type(client).__name__
+        entry['host'] = client.host
+        entry['port'] = client.port
+        entry['status'] = client.status
+        result.append(entry)
+    return result
+
+def reset():
+    """Resets the counters of all the registered clients"""
+    for client in _clients.keys():
+        client.stats.reset()
+
+
+_request_hooks = []
+
+def add_request_hook(hook):
+    """Calls hook(host, request, queue_time, server_time, error) each time
+    an HTTP request completes. queue_time is the number of seconds the
+    request waited before being written, server_time the number of seconds
+    between the write and the response (None if it never got written),
+    error is None unless the request failed."""
+    _request_hooks.append(hook)
+
+def remove_request_hook(hook):
+    _request_hooks.remove(hook)
+
+def request_completed(host, request, queue_time, server_time, error=None):
+    for hook in _request_hooks:
+        hook(host, request, queue_time, server_time, error)
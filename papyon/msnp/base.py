@@ -83,6 +83,23 @@ class BaseProtocol(gobject.GObject):
         self._client = client
         self._transport = transport
         self._proxies = proxies
+        self._handlers = self._dispatch_table()
+
+    @classmethod
+    def _dispatch_table(cls):
+        """Returns the handlers of the class by command name, looked up
+        once for each class rather than for each command received
+
+            @rtype: {name: string => function}"""
+        table = cls.__dict__.get('_handlers_table', None)
+        if table is None:
+            table = {}
+            for attr in dir(cls):
+                name = attr[len('_handle_'):]
+                if attr.startswith('_handle_') and not name.isdigit():
+                    table[name] = getattr(cls, attr).im_func
+            cls._handlers_table = table
+        return table
 
     def _send_command(self, command, arguments=(), payload=None, 
             increment=True, callback=None, errback=None):
@@ -98,7 +115,7 @@ class BaseProtocol(gobject.GObject):
             @param command: the received command
             @type command: L{command.Command}
         """
-        logger.warning('Notification unhandled command : ' + unicode(command))
+        logger.warning(u'Notification unhandled command : %s', command)
 
     def _error_handler(self, error):
         """Handles errors
@@ -106,21 +123,21 @@ class BaseProtocol(gobject.GObject):
             @param error: an error command object
             @type error: L{command.Command}
         """
-        logger.error('Notification unhandled error : ' + unicode(error))
+        logger.error(u'Notification unhandled error : %s', error)
 
     # callbacks
     def _dispatch_command(self, connection, command):
-        if not command.is_error():
-            handler = getattr(self,
-                    '_handle_' + command.name,
-                    self._default_handler)
+        handler = self._handlers.get(command.name, None)
+        if handler is not None:
             try:
-                handler(command)
+                handler(self, command)
             except Exception, err:
                 logger.error(str(err))
-                logger.error('Ignoring invalid command : ' + unicode(command))
-        else:
+                logger.error(u'Ignoring invalid command : %s', command)
+        elif command.is_error():
             self._error_handler(command)
+        else:
+            self._default_handler(command)
    
     def _connect_cb(self, transport):
         pass
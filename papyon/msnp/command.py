@@ -121,7 +121,11 @@ class Command(object):
         @type payload: string or None
         
         @ivar payload_len: the lenght of the payload
-        @type payload_len: integer"""
+        @type payload_len: integer
+
+    The wire serialization is kept once built, it is dropped when the
+    command is built or parsed again, or when its arguments or payload are
+    replaced."""
 
     OUTGOING_NO_TRID = ('OUT', 'PNG')
     INCOMING_NO_TRID = (
@@ -141,6 +145,10 @@ class Command(object):
 
             '241', '509')
 
+    # looked up for each command received, NLN, ILN, UBX and the like
+    _NO_TRID = frozenset(INCOMING_NO_TRID + OUTGOING_NO_TRID)
+    _PAYLOAD = frozenset(INCOMING_PAYLOAD)
+
     def __init__(self):
         self._reset()
 
@@ -151,6 +159,21 @@ class Command(object):
         self.arguments = None
         self.payload = None
         self.payload_len = 0
+        self._wire = None
+
+    def __get_arguments(self):
+        return self._arguments
+    def __set_arguments(self, arguments):
+        self._arguments = arguments
+        self._wire = None
+    arguments = property(__get_arguments, __set_arguments)
+
+    def __get_payload(self):
+        return self._payload
+    def __set_payload(self, payload):
+        self._payload = payload
+        self._wire = None
+    payload = property(__get_payload, __set_payload)
 
     ### public methods
     def build(self, name, transaction_id, payload=None, *arguments):
@@ -168,6 +191,7 @@ class Command(object):
             @param payload: is the data to send with the command
             @type payload: string
         """
+        self._wire = None
         self.name = name
         self.transaction_id = transaction_id
         self.arguments = arguments
@@ -181,21 +205,16 @@ class Command(object):
             @param buf: the data to parse
             @type buf: string"""
         self._reset()
-        lines = buf.split('\r\n', 1)
-        self.__parse_command(lines[0])
-        if len(lines) > 1: # payload
-            self.payload = lines[1]
+        line, separator, payload = buf.partition('\r\n')
+        self.__parse_command(line)
+        if separator: # payload
+            self.payload = payload
 
     def is_error(self):
         """Tells if the current command is an error code
 
             @rtype: bool"""
-        try:
-            int(self.name)
-        except ValueError:
-            return False
-        else:
-            return True
+        return self.name.isdigit()
 
     def is_payload(self):
         """Tells if the current comment is a payload command
@@ -205,7 +224,15 @@ class Command(object):
 
     ### private and special methods
     def __str__(self):
-        result = self.name[:]
+        if self._wire is None:
+            self._wire = self.__serialize()
+        return self._wire
+
+    def __unicode__(self):
+        return unicode(CommandPrinter(self))
+
+    def __serialize(self):
+        result = self.name
         if self.transaction_id is not None and result != 'OUT':
             result += ' ' + str(self.transaction_id)
 
@@ -222,29 +249,27 @@ class Command(object):
 
         return result + '\r\n'
 
-    def __unicode__(self):
-        return unicode(CommandPrinter(self))
-
-    def __parse_command(self, buf):
-        words = buf.split()
-        self.name, pos = words[0], 1
-        if len(self.name) != 3:
+    def __parse_command(self, line):
+        words = line.split()
+        name = words[0]
+        if len(name) != 3:
             raise ValueError("Name must be 3 chars long")
-        if (words[0] not in self.INCOMING_NO_TRID) and\
-                (words[0] not in self.OUTGOING_NO_TRID) and\
-                len(words) > pos:
+        self.name = name
+        if name in self._NO_TRID or len(words) == 1:
+            arguments = words[1:]
+        else:
             try:
-                self.transaction_id = int(words[pos])
+                self.transaction_id = int(words[1])
             except ValueError:
                 raise ValueError("Transaction ID must be an int")
-            pos += 1
-        if len(words) > pos:
-            self.arguments = words[pos:]
-
-        if self.name in self.INCOMING_PAYLOAD or \
-                (self.is_error() and self.arguments):
+            arguments = words[2:]
+        if len(arguments) == 0:
+            return
+        self.arguments = arguments
+        if name in self._PAYLOAD or name.isdigit():
             try:
-                self.payload_len = int(self.arguments[-1])
-                self.arguments = self.arguments[:-1]
+                self.payload_len = int(arguments[-1])
             except ValueError:
-                self.payload_len = 0
+                pass
+            else:
+                del arguments[-1]
@@ -31,6 +31,7 @@ from challenge import _msn_challenge
 import papyon
 from papyon.gnet.message.HTTP import HTTPMessage
 from papyon.util.async import run
+from papyon.util.batch import Batcher
 from papyon.util.queue import PriorityQueue, LastElementQueue
 from papyon.util.decorator import throttled
 from papyon.util.encoding import decode_rfc2047_string
@@ -85,6 +86,11 @@ class NotificationProtocol(BaseProtocol, Timer):
                 (object, object)),
             }
 
+    # the contact list changes made within ML_BATCH_WINDOW seconds are sent
+    # together, in as few ADL, RML and FQY commands as possible
+    ML_BATCH_WINDOW = 0.1
+    MAX_ML_PAYLOAD_SIZE = 7500
+
     def __init__(self, client, transport, proxies={}, version=15):
         """Initializer
 
@@ -105,11 +111,18 @@ class NotificationProtocol(BaseProtocol, Timer):
         self._callbacks = {} # tr_id=>(callback, errback)
         self._time_id = 0
         self.tokens = None
+        self._ml_batcher = Batcher(self.__send_ml_changes,
+                self.ML_BATCH_WINDOW)
 
     # Properties ------------------------------------------------------------
     def __get_state(self):
         return self.__state
     def __set_state(self, state):
+        if state in (ProtocolState.CLOSED, ProtocolState.OPENING):
+            # the changes were meant for the connection which went away
+            self._ml_batcher.cancel()
+        else:
+            self._ml_batcher.flush()
         self.__state = state
         self.notify("state")
     state = property(__get_state)
@@ -228,16 +241,7 @@ class NotificationProtocol(BaseProtocol, Timer):
             @param membership: the list to be added to
             @type membership: integer
             @see L{papyon.profile.Membership}"""
-
-        if network_id == profile.NetworkID.MOBILE:
-            payload = '<ml><t><c n="tel:%s" l="%d" /></t></ml>' % \
-                    (account, membership)
-            self._send_command("ADL", payload=payload)
-        else:
-            user, domain = account.split("@", 1)
-            payload = '<ml><d n="%s"><c n="%s" l="%d" t="%d"/></d></ml>' % \
-                    (domain, user, membership, network_id)
-            self._send_command("ADL", payload=payload)
+        self._ml_batcher.add("ml", ("ADL", account, network_id, membership))
 
     def remove_contact_from_membership(self, account,
             network_id=profile.NetworkID.MSN,
@@ -254,16 +258,7 @@ class NotificationProtocol(BaseProtocol, Timer):
             @param membership: the list to be added to
             @type membership: integer
             @see L{papyon.profile.Membership}"""
-
-        if network_id == profile.NetworkID.MOBILE:
-            payload = '<ml><t><c n="tel:%s" l="%d" /></t></ml>' % \
-                    (account, membership)
-            self._send_command("RML", payload=payload)
-        else:
-            user, domain = account.split("@", 1)
-            payload = '<ml><d n="%s"><c n="%s" l="%d" t="%d"/></d></ml>' % \
-                    (domain, user, membership, network_id)
-            self._send_command("RML", payload=payload)
+        self._ml_batcher.add("ml", ("RML", account, network_id, membership))
 
     def send_user_notification(self, message, contact, contact_guid, type,
             callback=None, errback=None):
@@ -348,6 +343,7 @@ class NotificationProtocol(BaseProtocol, Timer):
                 host = command.arguments[1]
                 port = self._transport.server[1]
             logger.debug("<-> Redirecting to " + command.arguments[1])
+            self._ml_batcher.cancel()
             self._transport.reset_connection((host, port))
         else: # connect to a switchboard
             try:
@@ -805,6 +801,14 @@ class NotificationProtocol(BaseProtocol, Timer):
         self._command_error_cb(error.transaction_id, int(error.name))
 
 
+    def _send_command(self, command, arguments=(), payload=None,
+            increment=True, callback=None, errback=None):
+        # the pending membership changes go first to keep the commands order
+        if len(self._ml_batcher) > 0:
+            self._ml_batcher.flush()
+        return BaseProtocol._send_command(self, command, arguments, payload,
+                increment, callback, errback)
+
     # callbacks --------------------------------------------------------------
     def _connect_cb(self, transport):
         self.__switchboard_callbacks = PriorityQueue()
@@ -909,10 +913,74 @@ class NotificationProtocol(BaseProtocol, Timer):
         self._add_contact_to_membership(contact, profile.Membership.FORWARD)
 
         if contact.network_id != profile.NetworkID.MOBILE:
-            account, domain = contact.account.split('@', 1)
-            payload = '<ml l="2"><d n="%s"><c n="%s"/></d></ml>' % \
-                    (domain, account)
-            self._send_command("FQY", payload=payload)
+            self._ml_batcher.add("ml", ("FQY", contact.account,
+                contact.network_id, None))
+
+    def __send_ml_changes(self, key, changes):
+        # the successive changes of the same kind are merged, the order of
+        # the ADL and RML commands is kept
+        groups = []
+        for change in changes:
+            if len(groups) == 0 or groups[-1][0] != change[0]:
+                groups.append((change[0], []))
+            groups[-1][1].append(change[1:])
+        for command, entries in groups:
+            for payload in self.__build_ml_payloads(command, entries):
+                self._send_command(command, payload=payload)
+
+    def __build_ml_payloads(self, command, entries):
+        domains = [] # domains in the order they appear, None for phones
+        contacts = {} # domain => [(user, network_id), ...]
+        lists = {} # (domain, user, network_id) => memberships
+        for account, network_id, membership in entries:
+            if network_id == profile.NetworkID.MOBILE:
+                domain, user = None, "tel:" + account
+            else:
+                user, domain = account.split("@", 1)
+            key = (domain, user, network_id)
+            if key in lists:
+                if membership is not None:
+                    lists[key] |= membership
+                continue
+            lists[key] = membership
+            if domain not in contacts:
+                domains.append(domain)
+                contacts[domain] = []
+            contacts[domain].append((user, network_id))
+
+        if command == "FQY":
+            header = '<ml l="2">'
+        else:
+            header = '<ml>'
+        payloads = []
+        payload = ''
+        for domain in domains:
+            if domain is None:
+                start, end = '<t>', '</t>'
+            else:
+                start, end = '<d n="%s">' % domain, '</d>'
+            nodes = ''
+            for user, network_id in contacts[domain]:
+                membership = lists[(domain, user, network_id)]
+                if membership is None:
+                    node = '<c n="%s"/>' % user
+                elif domain is None:
+                    node = '<c n="%s" l="%d" />' % (user, membership)
+                else:
+                    node = '<c n="%s" l="%d" t="%d"/>' % \
+                            (user, membership, network_id)
+                size = len(header) + len(payload) + len(start) + \
+                        len(nodes) + len(node) + len(end) + len('</ml>')
+                if size >= self.MAX_ML_PAYLOAD_SIZE and (payload or nodes):
+                    if nodes:
+                        payload += start + nodes + end
+                    payloads.append(header + payload + '</ml>')
+                    payload = nodes = ''
+                nodes += node
+            payload += start + nodes + end
+        if payload:
+            payloads.append(header + payload + '</ml>')
+        return payloads
 
     def _address_book_contact_deleted_cb(self, address_book, contact):
         self._remove_contact_from_membership(contact, profile.Membership.FORWARD)
@@ -28,6 +28,7 @@ from constants import ProtocolError, ProtocolState
 from message import Message
 import papyon.profile
 
+from papyon.gnet import reactor
 from papyon.util.async import run
 from papyon.util.parsing import build_account, parse_account
 
@@ -118,7 +119,7 @@ class SwitchboardProtocol(BaseProtocol):
         logger.info("New switchboard session %s" % session_id)
         client.profile.connect("end-point-added", self._on_end_point_added)
         if client.keepalive_conversations:
-            self.keepalive_timer_id = gobject.timeout_add_seconds(8, self._keepalive_conversation)
+            self.keepalive_timer_id = reactor.timeout_add_seconds(8, self._keepalive_conversation)
 
     # Properties ------------------------------------------------------------
     @property
@@ -183,10 +184,10 @@ class SwitchboardProtocol(BaseProtocol):
         if self.state != ProtocolState.OPEN:
             return
         if self.inactivity_timer_id:
-            gobject.source_remove(self.inactivity_timer_id)
+            reactor.source_remove(self.inactivity_timer_id)
             self.inactivity_timer_id = 0
         if self.keepalive_timer_id:
-            gobject.source_remove(self.keepalive_timer_id)
+            reactor.source_remove(self.keepalive_timer_id)
             self.keepalive_timer_id = 0
         if inactivity:
             logger.info("Switchboard timed out. Going to leave it.")
@@ -315,10 +316,10 @@ class SwitchboardProtocol(BaseProtocol):
 
     def _update_switchboard_timeout(self):
         if self.inactivity_timer_id:
-            gobject.source_remove(self.inactivity_timer_id)
+            reactor.source_remove(self.inactivity_timer_id)
             self.inactivity_timer_id = 0
         if len(self.participants) == 1 and not self.keepalive_timer_id:
-            self.inactivity_timer_id = gobject.timeout_add_seconds(300, self.leave, True)
+            self.inactivity_timer_id = reactor.timeout_add_seconds(300, self.leave, True)
 
     # callbacks --------------------------------------------------------------
     def _connect_cb(self, transport):
@@ -18,6 +18,7 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 
+from papyon.gnet import reactor
 from papyon.msnp2p.transport.TLP import MessageBlob
 
 import gobject
@@ -185,12 +186,12 @@ class BaseP2PTransport(gobject.GObject):
 
     def _start_processing(self):
         if self._source is None:
-            self._source = gobject.timeout_add(200, self._process_send_queue)
+            self._source = reactor.timeout_add(200, self._process_send_queue)
         self._process_send_queue()
 
     def _stop_processing(self):
         if self._source is not None:
-            gobject.source_remove(self._source)
+            reactor.source_remove(self._source)
             self._source = None
 
     def _process_send_queue(self):
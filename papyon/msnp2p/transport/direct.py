@@ -18,8 +18,10 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 
+from papyon.gnet.buffer import ReceiveBuffer
 from papyon.gnet.constants import *
 from papyon.gnet.io import *
+from papyon.gnet import reactor
 from papyon.msnp2p.constants import *
 from papyon.msnp2p.transport.TLPv1 import MessageChunk as NonceChunk
 from papyon.msnp2p.transport.TLP import MessageChunk
@@ -71,7 +73,7 @@ class DirectP2PTransport(BaseP2PTransport):
         self._connect_timeout_src = None
 
         self.__pending_size = None
-        self.__pending_chunk = ""
+        self.__pending_chunk = ReceiveBuffer()
         self.__foo_sent = False
         self.__foo_received = False
         self.__nonce_sent = False
@@ -125,7 +127,7 @@ class DirectP2PTransport(BaseP2PTransport):
         return (self._peer == peer and self._peer_guid == peer_guid)
 
     def _ready_to_send(self):
-        return self._connected
+        return self._connected and self._transport.writable
 
     def open(self, nonce, ip, port):
         self._ip = ip
@@ -134,11 +136,13 @@ class DirectP2PTransport(BaseP2PTransport):
         self._server = False
         self._listening = False
         self._transport = TCPClient(self._ip, self._port)
+        self._transport.stats.label = "P2P"
         self._transport.connect("notify::status", self._on_status_changed)
         self._transport.connect("error", self._on_error)
         self._transport.connect("received", self._on_data_received)
+        self._transport.connect("drained", self._on_drained)
         logger.info("Try to connect to %s:%i" % (self._ip, self._port))
-        self._connect_timeout_src = gobject.timeout_add_seconds(5, self._on_connect_timeout)
+        self._connect_timeout_src = reactor.timeout_add_seconds(5, self._on_connect_timeout)
         self._transport.open()
 
     def listen(self):
@@ -146,9 +150,8 @@ class DirectP2PTransport(BaseP2PTransport):
         self._listening = False
         self._socket = self._open_listener()
         self._socket.setblocking(False)
-        self._channel = gobject.IOChannel(self._socket.fileno())
-        self._channel.set_flags(self._channel.get_flags() | gobject.IO_FLAG_NONBLOCK)
-        self._channel.add_watch(gobject.IO_IN, self._on_listener_connected)
+        reactor.io_add_watch(self._socket, reactor.IO_IN,
+                self._on_listener_connected)
 
     def close(self):
         if hasattr(self, '_transport'):
@@ -182,7 +185,7 @@ class DirectP2PTransport(BaseP2PTransport):
             self._set_listening(None, None)
             return
 
-        self._mapping_timeout_src = gobject.timeout_add_seconds(timeout,
+        self._mapping_timeout_src = reactor.timeout_add_seconds(timeout,
                 self._on_mapping_timeout)
 
         self.simple = Simple()
@@ -199,7 +202,7 @@ class DirectP2PTransport(BaseP2PTransport):
 
     def _remove_mapping_timeout(self):
         if self._mapping_timeout_src is not None:
-            gobject.source_remove(self._mapping_timeout_src)
+            reactor.source_remove(self._mapping_timeout_src)
             self._mapping_timeout_src = None
 
     def _on_error_mapping_port(self, simple, error, proto, extern_port,
@@ -234,7 +237,7 @@ class DirectP2PTransport(BaseP2PTransport):
         self._send_data(str(chunk), (self.__on_chunk_sent, peer, peer_guid, chunk))
 
     def __on_chunk_sent(self, peer, peer_guid, chunk):
-        logger.debug(">> Chunk of %i bytes" % chunk.header.chunk_size)
+        logger.debug(">> Chunk of %i bytes", chunk.header.chunk_size)
         self._on_chunk_sent(peer, peer_guid, chunk)
 
     def _send_data(self, data, callback=None):
@@ -243,7 +246,7 @@ class DirectP2PTransport(BaseP2PTransport):
 
     def _remove_connect_timeout(self):
         if self._connect_timeout_src is not None:
-            gobject.source_remove(self._connect_timeout_src)
+            reactor.source_remove(self._connect_timeout_src)
             self._connect_timeout_src = None
 
     def _on_status_changed(self, transport, param):
@@ -262,6 +265,9 @@ class DirectP2PTransport(BaseP2PTransport):
             self._listening = False
             self._connected = False
 
+    def _on_drained(self, transport):
+        self._start_processing()
+
     def _on_connect_timeout(self):
         logger.info("Socket connection timeout")
         self._on_failed()
@@ -281,8 +287,10 @@ class DirectP2PTransport(BaseP2PTransport):
         self._socket.close()
         self._socket = None
         self._transport = TCPClient(self._ip, self._port)
+        self._transport.stats.label = "P2P"
         self._transport.connect("notify::status", self._on_status_changed)
         self._transport.connect("received", self._on_data_received)
+        self._transport.connect("drained", self._on_drained)
         self._transport.set_socket(socket)
 
     def _handshake(self):
@@ -322,19 +330,18 @@ class DirectP2PTransport(BaseP2PTransport):
         self.emit("connected")
 
     def _on_data_received(self, transport, chunk, length):
-        self.__pending_chunk += chunk
+        self.__pending_chunk.append(chunk)
 
-        while self.__pending_chunk:
+        while len(self.__pending_chunk) > 0:
             if self.__pending_size is None:
                 if len(self.__pending_chunk) < 4:
                     return
-                self.__pending_size = struct.unpack('<L', self.__pending_chunk[:4])[0]
-                self.__pending_chunk = self.__pending_chunk[4:]
+                self.__pending_size = struct.unpack('<L',
+                        self.__pending_chunk.read(4))[0]
             if len(self.__pending_chunk) < self.__pending_size:
                 return
 
-            body = self.__pending_chunk[:self.__pending_size]
-            self.__pending_chunk = self.__pending_chunk[self.__pending_size:]
+            body = self.__pending_chunk.read(self.__pending_size)
             self.__pending_size = None
 
             if self._server and not self.__foo_received:
@@ -354,6 +361,6 @@ class DirectP2PTransport(BaseP2PTransport):
                 if chunk.body == "\x00" *4:
                     logger.debug("Received 0000 chunk, ignoring it")
                 else:
-                    logger.debug("<< Chunk of %i bytes" % chunk.header.chunk_size)
+                    logger.debug("<< Chunk of %i bytes", chunk.header.chunk_size)
                     self._on_chunk_received(self._peer, self._peer_guid, chunk)
 
@@ -95,7 +95,7 @@ class SwitchboardP2PTransport(BaseP2PTransport, SwitchboardHandler):
         return (self._oustanding_sends < self.MAX_OUTSTANDING_SENDS)
 
     def _send_chunk(self, peer, peer_guid, chunk):
-        logger.debug(">>> %s" % repr(chunk))
+        logger.debug(">>> %r", chunk)
 
         msg = Message(self._client.profile)
         if chunk.version is 1 or peer_guid is None:
@@ -138,7 +138,7 @@ class SwitchboardP2PTransport(BaseP2PTransport, SwitchboardHandler):
             logger.warning("Invalid TLP chunk in SB message: %s" % err)
             return
 
-        logger.debug("<<< %s" % repr(chunk))
+        logger.debug("<<< %r", chunk)
         self._on_chunk_received(peer, peer_guid, chunk)
 
     def _on_message_sent(self, peer, peer_guid, chunk):
@@ -117,7 +117,10 @@ class ClientCapabilities(gobject.GObject):
         @ivar p2p_bootstrap_via_uun: is the client able to use and understand UUN commands
         @type p2p_bootstrap_via_uun: bool
 
-        @undocumented: __getattr__, __setattr__, __str__
+    The capabilities advertised by the contacts are shared, see L{intern},
+    and can't be modified.
+
+        @undocumented: __setattr__, __str__, __eq__, __ne__
         """
 
     __gsignals__ = {
@@ -212,6 +215,10 @@ class ClientCapabilities(gobject.GObject):
             #'supports_multiparty_conversations' : 0x80000000,
             }
 
+    MAX_INTERNED = 256
+    _interned = {} # client_id => ClientCapabilities
+    _frozen = False
+
     def __init__(self, msnc=0, client_id="0:0"):
         """Initializer
 
@@ -228,19 +235,34 @@ class ClientCapabilities(gobject.GObject):
             extra = 0
         gobject.GObject.__setattr__(self, 'capabilities', self.MSNC[msnc] | capabilities)
         gobject.GObject.__setattr__(self, 'extra', extra)
-
-    def __getattr__(self, name):
-        if name in self._CAPABILITIES:
-            mask = self._CAPABILITIES[name]
-            id = self.capabilities
-        elif name in self._EXTRA:
-            mask = self._EXTRA[name]
-            id = self.extra
-        else:
-            raise AttributeError("object 'ClientCapabilities' has no attribute '%s'" % name)
-        return (id & mask != 0)
+        self._update_flags()
+
+    @classmethod
+    def intern(cls, client_id):
+        """Returns the capabilities for client_id, the same immutable
+        instance being returned for each client_id
+
+            @param client_id: the full client ID
+            @type client_id: string"""
+        capabilities = cls._interned.get(client_id, None)
+        if capabilities is None:
+            capabilities = cls(client_id=client_id)
+            gobject.GObject.__setattr__(capabilities, '_frozen', True)
+            if len(cls._interned) < cls.MAX_INTERNED:
+                cls._interned[client_id] = capabilities
+        return capabilities
+
+    def _update_flags(self):
+        # the flags are plain attributes so that reading them is cheap
+        for name, mask in self._CAPABILITIES.iteritems():
+            gobject.GObject.__setattr__(self, name,
+                    self.capabilities & mask != 0)
+        for name, mask in self._EXTRA.iteritems():
+            gobject.GObject.__setattr__(self, name, self.extra & mask != 0)
 
     def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError("object 'ClientCapabilities' is immutable")
         if name in self._CAPABILITIES:
             mask = self._CAPABILITIES[name]
             old_value = bool(self.capabilities & mask)
@@ -248,6 +270,7 @@ class ClientCapabilities(gobject.GObject):
                 gobject.GObject.__setattr__(self, 'capabilities', self.capabilities | mask)
             else:
                 gobject.GObject.__setattr__(self, 'capabilities', self.capabilities & ~mask)
+            self._update_flags()
             if value != old_value:
                 self.emit('capability-changed', name, value)
         elif name in self._EXTRA:
@@ -257,6 +280,7 @@ class ClientCapabilities(gobject.GObject):
                 gobject.GObject.__setattr__(self, 'extra', self.extra | mask)
             else:
                 gobject.GObject.__setattr__(self, 'extra', self.extra & ~mask)
+            self._update_flags()
             if value != old_value:
                 self.emit('capability-changed', name, value)
         else:
@@ -271,7 +295,10 @@ class ClientCapabilities(gobject.GObject):
         return client_id
 
     def __eq__(self, other):
-        return str(self) == str(other)
+        return self is other or str(self) == str(other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
 
 
 class NetworkID(object):
@@ -462,7 +489,7 @@ class BaseContact(gobject.GObject):
         gobject.GObject.__init__(self)
 
         self._cid = cid or self.BLANK_ID
-        self._client_capabilities = ClientCapabilities()
+        self._client_capabilities = ClientCapabilities.intern("0:0")
         self._current_media = None
         self._display_name = ""
         self._end_points = {}
@@ -581,7 +608,7 @@ class BaseContact(gobject.GObject):
 
     def _server_property_changed(self, name, value):
         if name == "client-capabilities":
-            value = ClientCapabilities(client_id=value)
+            value = ClientCapabilities.intern(value)
         attr_name = "_" + name.lower().replace("-", "_")
         old_value = getattr(self, attr_name)
         if value != old_value:
@@ -1018,7 +1045,7 @@ gobject.type_register(Group)
 class EndPoint(object):
     def __init__(self, id, caps):
         self.id = id
-        self.capabilities = ClientCapabilities(client_id=caps)
+        self.capabilities = ClientCapabilities.intern(caps)
         self.name = ""
         self.idle = False
         self.state = ""
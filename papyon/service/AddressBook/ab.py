@@ -18,8 +18,11 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 
+from papyon.service.SOAPScheduler import Priority
 from papyon.service.SOAPService import SOAPService
+from papyon.service.errors import SOAPServiceClosedError
 from papyon.util.async import *
+from papyon.util.batch import Batcher
 from papyon.util.element_tree import XMLTYPE
 from papyon.service.SingleSignOn import *
 from papyon.service.AddressBook.common import *
@@ -157,14 +160,35 @@ class Contact(object):
 
 
 class AB(SOAPService):
+    PRIORITY = Priority.HIGH
+    IDEMPOTENT_REQUESTS = ('ABFindAll',)
+
+    # build the contacts and groups while the response is received
+    STREAMED_ELEMENTS = {"ABFindAll": {"ab:Group": Group,
+                                       "ab:Contact": Contact}}
+
+    # the contacts deleted within BATCH_WINDOW seconds are deleted in a
+    # single request
+    BATCH_WINDOW = 0.1
+    BATCH_SIZE = 100
+
     def __init__(self, sso, client, proxies=None):
         self._sso = sso
         self._client = client
         self._tokens = {}
-        SOAPService.__init__(self, "AB", proxies)
+        SOAPService.__init__(self, "AB", proxies, sso.http_pool,
+                sso.scheduler, sso.account)
 
         self._creating_ab = False
         self._last_changes = XMLTYPE.datetime.DEFAULT_TIMESTAMP
+        self._delete_batcher = Batcher(self.__send_contact_deletes,
+                self.BATCH_WINDOW, self.BATCH_SIZE)
+
+    def close(self):
+        """Fails the contact deletions which were not sent yet"""
+        error = SOAPServiceClosedError("AB")
+        for contact_id, callback, errback in self._delete_batcher.cancel():
+            run(errback, error)
 
     def Add(self, callback, errback, scenario, account):
         """Creates the address book on the server.
@@ -221,10 +245,14 @@ class AB(SOAPService):
         groups = []
         contacts = []
         for group in response[1]:
-            groups.append(Group(group))
+            if not isinstance(group, Group):
+                group = Group(group)
+            groups.append(group)
 
         for contact in response[2]:
-            contacts.append(Contact(contact))
+            if not isinstance(contact, Contact):
+                contact = Contact(contact)
+            contacts.append(contact)
 
         #FIXME: add support for the ab param
         address_book = ABResult(None, contacts, groups)
@@ -312,9 +340,28 @@ class AB(SOAPService):
             @param callback: tuple(callable, *args)
             @param errback: tuple(callable, *args)
         """
-        self.__soap_request(callback, errback,
+        self._delete_batcher.add(scenario, (contact_id, callback, errback))
+
+    def __send_contact_deletes(self, scenario, items):
+        contact_ids = [contact_id for contact_id, callback, errback in items]
+        self.__soap_request((self.__on_contacts_deleted, items),
+                (self.__on_contacts_delete_failed, scenario, items),
                 self._service.ABContactDelete, scenario,
-                (contact_id,))
+                (contact_ids,), items)
+
+    def __on_contacts_deleted(self, items):
+        for contact_id, callback, errback in items:
+            run(callback)
+
+    def __on_contacts_delete_failed(self, error, scenario, items):
+        if len(items) > 1 and isinstance(error, AddressBookError):
+            # the fault may come from a single contact, delete them one by
+            # one to report it to the right caller
+            for item in items:
+                self.__send_contact_deletes(scenario, [item])
+            return
+        for contact_id, callback, errback in items:
+            run(errback, error)
 
     def ContactUpdate(self, callback, errback,
             scenario, contact_id, contact_info,
@@ -239,6 +239,12 @@ class AddressBook(gobject.GObject):
     def profile(self):
         return self._profile
 
+    def close(self):
+        """Fails the requests which are still waiting to be sent, called
+        when the client is torn down"""
+        self._ab.close()
+        self._sharing.close()
+
     def sync(self, delta_only=False, done_cb=None):
         # Avoid race conditions.
         if self._state in \
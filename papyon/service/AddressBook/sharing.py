@@ -18,8 +18,11 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 
+from papyon.service.SOAPScheduler import Priority
 from papyon.service.SOAPService import SOAPService
+from papyon.service.errors import SOAPServiceClosedError
 from papyon.util.async import *
+from papyon.util.batch import Batcher
 from papyon.util.element_tree import XMLTYPE
 from papyon.service.SingleSignOn import *
 from papyon.service.AddressBook.common import *
@@ -126,13 +129,45 @@ class ServiceMember(Member):
         Member.__init__(self, member)
 
 
+def _parse_membership(membership):
+    role = membership.find("./ab:MemberRole")
+    members = membership.findall("./ab:Members/ab:Member")
+    if role is None or len(members) == 0:
+        return None
+    return (role.text, [(Member.new(member),
+        member.findtext("./ab:Deleted", "bool")) for member in members])
+
+
 class Sharing(SOAPService):
+    PRIORITY = Priority.HIGH
+    IDEMPOTENT_REQUESTS = ('FindMembership',)
+
+    # build the members while the response is received, the elements of a
+    # membership are released as soon as it is complete
+    STREAMED_ELEMENTS = {"FindMembership": {
+        "ab:Membership": _parse_membership,
+        "ab:Service": lambda service: service}}
+
+    # the members added to or deleted from the same role within BATCH_WINDOW
+    # seconds are sent in a single request
+    BATCH_WINDOW = 0.1
+    BATCH_SIZE = 100
+
     def __init__(self, sso, proxies=None):
         self._sso = sso
         self._tokens = {}
-        SOAPService.__init__(self, "Sharing", proxies)
+        SOAPService.__init__(self, "Sharing", proxies, sso.http_pool,
+                sso.scheduler, sso.account)
 
         self._last_changes = XMLTYPE.datetime.DEFAULT_TIMESTAMP
+        self._member_batcher = Batcher(self.__send_members,
+                self.BATCH_WINDOW, self.BATCH_SIZE)
+
+    def close(self):
+        """Fails the membership changes which were not sent yet"""
+        error = SOAPServiceClosedError("Sharing")
+        for member, callback, errback in self._member_batcher.cancel():
+            run(errback, error)
 
     def FindMembership(self, callback, errback, scenario, services, deltas_only):
         """Requests the membership list.
@@ -169,8 +204,11 @@ class Sharing(SOAPService):
 
         for role, members in response[0].iteritems():
             for member in members:
-                deleted = member.findtext("./ab:Deleted", "bool")
-                member_obj = Member.new(member)
+                if isinstance(member, tuple):
+                    member_obj, deleted = member
+                else:
+                    deleted = member.findtext("./ab:Deleted", "bool")
+                    member_obj = Member.new(member)
                 member_id = hash(member_obj)
                 if member_id in memberships:
                     memberships[member_id].Roles[role] = deleted
@@ -196,13 +234,13 @@ class Sharing(SOAPService):
             @param callback: tuple(callable, *args)
             @param errback: tuple(callable, *args)
         """
-        self.__soap_request(callback, errback,
-                self._service.AddMember, scenario,
-                (member_role, type, state, account))
+        self._member_batcher.add(("AddMember", scenario, member_role),
+                ((type, state, account), callback, errback))
 
     def _HandleAddMemberFault(self, callback, errback, response, user_data):
         error = AddressBookError.from_fault(response.fault)
-        if error == AddressBookError.MEMBER_ALREADY_EXISTS:
+        if error == AddressBookError.MEMBER_ALREADY_EXISTS and \
+                len(user_data) == 1:
             run(callback)
             return True
         return False
@@ -216,17 +254,39 @@ class Sharing(SOAPService):
             @param callback: tuple(callable, *args)
             @param errback: tuple(callable, *args)
         """
-        self.__soap_request(callback, errback,
-                self._service.DeleteMember, scenario,
-                (member_role, type, state, account))
+        self._member_batcher.add(("DeleteMember", scenario, member_role),
+                ((type, state, account), callback, errback))
 
     def _HandleDeleteMemberFault(self, callback, errback, response, user_data):
         error = AddressBookError.from_fault(response.fault)
-        if error == AddressBookError.MEMBER_DOES_NOT_EXIST:
+        if error == AddressBookError.MEMBER_DOES_NOT_EXIST and \
+                len(user_data) == 1:
             run(callback)
             return True
         return False
 
+    def __send_members(self, key, items):
+        request_id, scenario, member_role = key
+        members = [member for member, callback, errback in items]
+        self.__soap_request((self.__on_members_updated, items),
+                (self.__on_members_update_failed, key, items),
+                getattr(self._service, request_id), scenario,
+                (member_role, members), items)
+
+    def __on_members_updated(self, items):
+        for member, callback, errback in items:
+            run(callback)
+
+    def __on_members_update_failed(self, error, key, items):
+        if len(items) > 1 and isinstance(error, AddressBookError):
+            # the fault may come from a single member, send them one by one
+            # to report it to the right caller
+            for item in items:
+                self.__send_members(key, [item])
+            return
+        for member, callback, errback in items:
+            run(errback, error)
+
     @RequireSecurityTokens(LiveService.CONTACTS)
     def __soap_request(self, callback, errback, method, scenario, args,
             user_data=None):
@@ -16,24 +16,27 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 
+from papyon.service.SOAPScheduler import Priority
 from papyon.service.SOAPService import SOAPService, url_split
 from papyon.util.async import *
 from papyon.util.element_tree import XMLTYPE
 from papyon.service.ContentRoaming.constants import *
 from papyon.service.SingleSignOn import *
 
-from papyon.gnet.protocol import ProtocolFactory
 
 import urllib
 
 __all__ = ['Storage']
 
 class Storage(SOAPService):
+    PRIORITY = Priority.LOW
+    IDEMPOTENT_REQUESTS = ('GetProfile', 'FindDocuments', 'UpdateProfile')
 
     def __init__(self, sso, proxies=None):
         self._sso = sso
         self._tokens = {}
-        SOAPService.__init__(self, "SchematizedStore", proxies)
+        SOAPService.__init__(self, "SchematizedStore", proxies, sso.http_pool,
+                sso.scheduler, sso.account)
 
     def GetProfile(self, callback, errback, scenario, cid, profile_rid,
                    p_date_modified, expression_rid, e_date_modified,
@@ -166,18 +169,28 @@ class Storage(SOAPService):
             data = http_response.body
             for handle in handles:
                 transport.disconnect(handle)
+            self._pool.release(transport)
             run(callback, type, data)
 
         def failed_cb(transport, error, handles):
             for handle in handles:
                 transport.disconnect(handle)
+            self._pool.release(transport)
             run(errback, error, None)
-        
-        transport = ProtocolFactory(scheme, host, proxies=self._proxies)
 
-        handles = []
-        handles.append(transport.connect("response-received", done_cb, handles))
-        handles.append(transport.connect("request-sent", self._request_handler))
-        handles.append(transport.connect("error", failed_cb, handles))
+        def transport_cb(transport):
+            handles = []
+            handles.append(transport.connect("response-received", done_cb,
+                handles))
+            handles.append(transport.connect("request-sent",
+                self._request_handler))
+            handles.append(transport.connect("error", failed_cb, handles))
+            transport.request(resource, http_headers, method='GET')
+
+        def unavailable_cb(error):
+            run(errback, error, None)
 
-        transport.request(resource, http_headers, method='GET')
+        # the tiles are fetched through the pooled connections, and so
+        # through the proxy tunnels already open
+        self._pool.acquire(scheme, host, None, (transport_cb,),
+                (unavailable_cb,))
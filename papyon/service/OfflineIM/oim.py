@@ -32,7 +32,8 @@ class OIM(SOAPService):
         self._sso = sso
         self._tokens = {}
         self.__lock_key = ""
-        SOAPService.__init__(self, "OIM", proxies)
+        SOAPService.__init__(self, "OIM", proxies, sso.http_pool,
+                sso.scheduler, sso.account)
 
     def set_lock_key(self, lock_key):
         self.__lock_key = lock_key
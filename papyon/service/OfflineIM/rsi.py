@@ -33,10 +33,13 @@ __all__ = ['RSI']
 logger = logging.getLogger('papyon.service')
 
 class RSI(SOAPService):
+    IDEMPOTENT_REQUESTS = ('GetMetadata', 'GetMessage', 'DeleteMessages')
+
     def __init__(self, sso, proxies=None):
         self._sso = sso
         self._tokens = {}
-        SOAPService.__init__(self, "RSI", proxies)
+        SOAPService.__init__(self, "RSI", proxies, sso.http_pool,
+                sso.scheduler, sso.account)
 
     def GetMetadata(self, callback, errback):
         self.__soap_request(callback, errback,
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""Retry of the SOAP requests which failed for a transient reason.
+
+A failed request is sent again after an exponential backoff with full
+jitter, so that the clients which failed at the same time don't all
+come back at once. The retries are paid from a budget refilled by the
+requests sent, and an endpoint failing repeatedly gets its circuit
+opened: its requests then fail right away until a trial request
+succeeds."""
+
+from papyon.gnet.errors import IoError
+from papyon.service.errors import SOAPCircuitOpenError
+
+import random
+import time
+
+__all__ = ['RetryPolicy', 'get_retry_policy']
+
+class _CircuitBreaker(object):
+    CLOSED = 0
+    OPEN = 1
+    HALF_OPEN = 2
+
+    def __init__(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_time = 0
+        self.trial_time = 0
+
+
+class RetryPolicy(object):
+    """Decides which failed SOAP requests are sent again and when.
+
+        @since: 0.5"""
+
+    MAX_ATTEMPTS = 3
+    BASE_DELAY = 1.0
+    MAX_DELAY = 30.0
+
+    BUDGET_RATIO = 0.2
+    BUDGET_RESERVE = 10
+
+    BREAKER_THRESHOLD = 5
+    BREAKER_COOLDOWN = 30
+
+    # the server says the request was not processed
+    RETRYABLE_FAULTS = ('ServiceUnavailable', 'ServerTooBusy', 'ServerBusy')
+    RETRYABLE_STATUS = (503,)
+    # the request may or may not have been processed
+    AMBIGUOUS_STATUS = (500, 502, 504)
+    # the request could not have been sent
+    UNSENT_ERRORS = (IoError.CONNECTION_FAILED, IoError.HOSTNAME_RESOLVE_FAILED,
+            IoError.SSL_CONNECTION_FAILED, IoError.PROXY_CONNECTION_FAILED)
+
+    def __init__(self, max_attempts=None, base_delay=None, max_delay=None,
+            circuit_breaker=True):
+        """Initializer
+
+            @param max_attempts: number of times a request is sent at most
+            @type max_attempts: integer
+
+            @param base_delay: seconds before the first retry at most, the
+                bound doubles with each retry
+            @type base_delay: float
+
+            @param max_delay: seconds before a retry at most
+            @type max_delay: float
+
+            @param circuit_breaker: whether the requests to an endpoint
+                failing repeatedly fail right away for a while
+            @type circuit_breaker: boolean"""
+        self.max_attempts = max_attempts or self.MAX_ATTEMPTS
+        self.base_delay = base_delay or self.BASE_DELAY
+        self.max_delay = max_delay or self.MAX_DELAY
+        self.circuit_breaker = circuit_breaker
+        self._budget = float(self.BUDGET_RESERVE)
+        self._breakers = {} # host => _CircuitBreaker
+        self.retries = 0
+        self.rejected = 0
+
+    @property
+    def budget(self):
+        "Number of retries left in the budget"
+        return int(self._budget)
+
+    def classify(self, error=None, status=None, fault=None):
+        """Tells how a request failed
+
+            @param error: the transport or parse error, if any
+            @param status: the HTTP status of the response, if any
+            @param fault: the SOAP fault of the response, if any
+            @type fault: L{SOAPFault}
+
+            @return: None if the endpoint answered, True if the request
+                failed without being processed, False if it may have been"""
+        if fault is not None and fault.is_fault():
+            if self._fault_codes(fault) & set(self.RETRYABLE_FAULTS):
+                return True
+            return None
+        if status in self.RETRYABLE_STATUS:
+            return True
+        if status in self.AMBIGUOUS_STATUS:
+            return False
+        if isinstance(error, IoError) and status is None:
+            return int(error) in self.UNSENT_ERRORS
+        return None
+
+    def check(self, host):
+        """Returns the error to fail a request to host with if its circuit
+        is open, None if the request may be sent"""
+        breaker = self._breakers.get(host, None)
+        if breaker is None or breaker.state == _CircuitBreaker.CLOSED:
+            return None
+        now = time.time()
+        if breaker.state == _CircuitBreaker.OPEN:
+            elapsed = now - breaker.opened_time
+        else:
+            # the trial request may never come back, another one is let
+            # through once it has been pending for a whole cooldown
+            elapsed = now - breaker.trial_time
+        if elapsed >= self.BREAKER_COOLDOWN:
+            # let a single trial request through
+            breaker.state = _CircuitBreaker.HALF_OPEN
+            breaker.trial_time = now
+            return None
+        return SOAPCircuitOpenError(host, self.BREAKER_COOLDOWN - elapsed)
+
+    def sent(self, host):
+        """Refills the budget, called for each new request"""
+        self._budget = min(self.BUDGET_RESERVE,
+                self._budget + self.BUDGET_RATIO)
+
+    def succeeded(self, host):
+        self._breakers.pop(host, None)
+
+    def failed(self, host):
+        if not self.circuit_breaker:
+            return
+        breaker = self._breakers.setdefault(host, _CircuitBreaker())
+        breaker.failures += 1
+        if breaker.state == _CircuitBreaker.HALF_OPEN or \
+                breaker.failures >= self.BREAKER_THRESHOLD:
+            breaker.state = _CircuitBreaker.OPEN
+            breaker.opened_time = time.time()
+
+    def next_delay(self, attempts):
+        """Returns the number of seconds to wait before sending a request
+        again after it failed attempts times, or None if it should not be
+        retried anymore"""
+        if attempts >= self.max_attempts:
+            return None
+        if self._budget < 1:
+            self.rejected += 1
+            return None
+        self._budget -= 1
+        self.retries += 1
+        bound = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return random.uniform(0, bound)
+
+    def _fault_codes(self, fault):
+        codes = set()
+        if fault.faultcode:
+            codes.add(fault.faultcode.rsplit(":", 1)[-1])
+        if fault.detail is not None:
+            for node in fault.detail.getiterator():
+                if node.tag.rsplit("}", 1)[-1] == "errorcode" and node.text:
+                    codes.add(node.text.strip())
+        return codes
+
+
+_retry_policy = RetryPolicy()
+
+def get_retry_policy():
+    """Returns the retry policy shared by the services which are not given
+    one, so that the budget and circuits cover the whole process"""
+    return _retry_policy
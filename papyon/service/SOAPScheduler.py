@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+"""Scheduling of the outgoing SOAP requests.
+
+Every L{SOAPService} asks the scheduler for a slot before sending a
+request and gives it back once the request is completed. The scheduler
+bounds the number of requests in flight, globally and per service, and
+when they are all taken hands the freed slots out by priority, then in
+turn to each account so that the clients sharing a process get an even
+share."""
+
+from papyon.util.async import run
+
+import time
+
+__all__ = ['Priority', 'SOAPScheduler', 'get_scheduler']
+
+class Priority(object):
+    "Priority classes of the SOAP requests, the lowest value goes first"
+    HIGH = 0
+    "Login and address book synchronization"
+    NORMAL = 1
+    "Offline messages"
+    LOW = 2
+    "Display pictures, profiles and spaces"
+
+
+class SOAPScheduler(object):
+    """Hands out the slots to send SOAP requests.
+
+        @since: 0.5"""
+
+    MAX_REQUESTS = 8
+    MAX_REQUESTS_PER_SERVICE = 4
+
+    def __init__(self, max_requests=None, max_requests_per_service=None):
+        """Initializer
+
+            @param max_requests: number of requests in flight at most
+            @type max_requests: integer
+
+            @param max_requests_per_service: number of requests in flight
+                at most for each service
+            @type max_requests_per_service: integer"""
+        self._max_requests = max_requests or self.MAX_REQUESTS
+        self._max_per_service = max_requests_per_service or \
+                self.MAX_REQUESTS_PER_SERVICE
+        self._queues = {} # priority => {account => [request, ...]}
+        self._accounts = {} # priority => [account, ...] in turn order
+        self._active = {} # service => number of requests in flight
+        self._running = 0
+        self._queued = 0
+        self.peak_queue_length = 0
+        self.wait_time = 0.0
+
+    @property
+    def queue_length(self):
+        "Number of requests waiting for a slot"
+        return self._queued
+
+    @property
+    def active(self):
+        "Number of requests in flight"
+        return self._running
+
+    def acquire(self, service, account, priority, callback):
+        """Calls callback as soon as a request to service may be sent,
+        L{release} must be called once it is completed.
+
+            @param service: name of the service
+            @type service: string
+
+            @param account: account the request is sent for
+            @type account: string
+
+            @param priority: priority class of the request
+            @type priority: L{Priority}
+
+            @param callback: tuple(callable, *args)"""
+        queues = self._queues.setdefault(priority, {})
+        if account not in queues:
+            queues[account] = []
+            self._accounts.setdefault(priority, []).append(account)
+        queues[account].append((service, callback, time.time()))
+        self._queued += 1
+        self.peak_queue_length = max(self.peak_queue_length, self._queued)
+        self._schedule()
+
+    def release(self, service):
+        """Gives back the slot of a request to service"""
+        count = self._active.get(service, 0)
+        if count == 0:
+            return
+        if count == 1:
+            del self._active[service]
+        else:
+            self._active[service] = count - 1
+        self._running -= 1
+        self._schedule()
+
+    def snapshot(self):
+        """Returns the queue metrics
+
+            @rtype: dict"""
+        by_priority = {}
+        by_account = {}
+        by_service = {}
+        for priority, queues in self._queues.iteritems():
+            for account, requests in queues.iteritems():
+                by_priority[priority] = by_priority.get(priority, 0) + \
+                        len(requests)
+                by_account[account] = by_account.get(account, 0) + \
+                        len(requests)
+                for request in requests:
+                    by_service[request[0]] = by_service.get(request[0], 0) + 1
+        return {'active': self._running,
+                'active_by_service': self._active.copy(),
+                'queued': self._queued,
+                'queued_by_priority': by_priority,
+                'queued_by_account': by_account,
+                'queued_by_service': by_service,
+                'peak_queue_length': self.peak_queue_length,
+                'wait_time': self.wait_time}
+
+    def _schedule(self):
+        while self._running < self._max_requests:
+            request = self._next()
+            if request is None:
+                return
+            service, callback, queued_time = request
+            self._queued -= 1
+            self._running += 1
+            self._active[service] = self._active.get(service, 0) + 1
+            self.wait_time += time.time() - queued_time
+            run(callback)
+
+    def _next(self):
+        for priority in sorted(self._queues.keys()):
+            queues = self._queues[priority]
+            accounts = self._accounts[priority]
+            for account in accounts[:]:
+                requests = queues[account]
+                for i, request in enumerate(requests):
+                    if self._active.get(request[0], 0) >= \
+                            self._max_per_service:
+                        continue
+                    del requests[i]
+                    # the account waits for its next turn
+                    accounts.remove(account)
+                    if len(requests) > 0:
+                        accounts.append(account)
+                    else:
+                        del queues[account]
+                    if len(queues) == 0:
+                        del self._queues[priority]
+                        del self._accounts[priority]
+                    return request
+        return None
+
+
+_scheduler = SOAPScheduler()
+
+def get_scheduler():
+    """Returns the scheduler shared by the services which are not given
+    one, and so by all the clients of the process"""
+    return _scheduler
@@ -21,18 +21,20 @@
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 
 import description
-from errors import SOAPParseError
+from errors import SOAPParseError, SOAPServiceClosedError
 from SOAPUtils import *
-from papyon.gnet.errors import HTTPError
+from SOAPScheduler import Priority, get_scheduler
+from SOAPRetry import get_retry_policy
+from papyon.gnet import reactor
+from papyon.gnet.errors import HTTPCancelled, HTTPError
 from papyon.util.async import *
 
-import papyon.gnet.protocol
+from papyon.gnet.protocol import HTTPConnectionPool
 import papyon.util.element_tree as ElementTree
-import papyon.util.string_io as StringIO
 import re
 import logging
 
-__all__ = ['SOAPService', 'SOAPResponse']
+__all__ = ['SOAPService', 'SOAPResponse', 'SOAPResponseParser']
 
 logger = logging.getLogger('papyon.service')
 
@@ -50,16 +52,7 @@ def url_split(url, default_scheme='http'):
     resource = urlunsplit(('', '', path, query, fragment))
     return protocol, host, port, resource
 
-def compress_xml(xml_string):
-    space_regex = [(re.compile('>\s+<'), '><'),
-        (re.compile('>\s+'), '>'),
-        (re.compile('\s+<'), '<')]
-
-    for regex, replacement in space_regex:
-        xml_string = regex.sub(replacement, xml_string)
-    return xml_string
-
-soap_template = """<?xml version='1.0' encoding='utf-8'?>
+soap_template = xml_template("""<?xml version='1.0' encoding='utf-8'?>
 <soap:Envelope xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
     <soap:Header>
         %s
@@ -67,7 +60,7 @@ soap_template = """<?xml version='1.0' encoding='utf-8'?>
     <soap:Body>
         %s
     </soap:Body>
-</soap:Envelope>"""
+</soap:Envelope>""")
 
 class SOAPFault(object):
     def __init__(self, tree):
@@ -97,25 +90,130 @@ class SOAPFault(object):
         return self.__repr__()
 
 
+NS_SHORTHANDS = {"soap" : XMLNS.SOAP.ENVELOPE,
+        "xmlenc" : XMLNS.ENCRYPTION.BASE,
+        "wsse" : XMLNS.WS.SECEXT,
+        "wst" : XMLNS.WS.TRUST,
+        "wsa" : XMLNS.WS.ADDRESSING,
+        "wsp" : XMLNS.WS.POLICY,
+        "wsi" : XMLNS.WS.ISSUE,
+        "wsu" : XMLNS.WS.UTILITY,
+        "ps" : XMLNS.MICROSOFT.PASSPORT,
+        "psf" : XMLNS.MICROSOFT.PASSPORT_FAULT,
+        "ab" : XMLNS.MICROSOFT.LIVE.ADDRESSBOOK,
+        "st" : XMLNS.MICROSOFT.LIVE.STORAGE,
+        "stv1" : XMLNS.MICROSOFT.LIVE.STORAGEV1,
+        "oim" : XMLNS.MICROSOFT.LIVE.OIM,
+        "rsi" : XMLNS.MICROSOFT.LIVE.RSI,
+        "spaces" : XMLNS.MICROSOFT.LIVE.SPACES }
+
+class _StreamingTarget(object):
+    """Parser target building the tree, the elements having a handler are
+    passed to it as soon as they are complete and then detached from the
+    tree."""
+
+    def __init__(self, handlers):
+        self._builder = ElementTree.FastTreeBuilder()
+        self._handlers = handlers # expanded tag => (tag, handler)
+        self._open = []
+        self.streamed = []
+
+    def start(self, tag, attrib):
+        element = self._builder.start(tag, attrib)
+        self._open.append(element)
+        return element
+
+    def end(self, tag):
+        element = self._builder.end(tag)
+        self._open.pop()
+        handler = self._handlers.get(tag, None)
+        if handler is not None and len(self._open) > 0:
+            name, convert = handler
+            value = convert(ElementTree._Element(element, NS_SHORTHANDS))
+            if value is not None:
+                self.streamed.append((name, value))
+            # the element is the last child of its parent
+            del self._open[-1][-1]
+        return element
+
+    def data(self, data):
+        self._builder.data(data)
+
+    def close(self):
+        return self._builder.close()
+
+
+class SOAPResponseParser(object):
+    """Incremental SOAP response parser, the response body is pushed into
+    it chunk by chunk as it is received.
+
+    stream_handlers maps element names (using the L{NS_SHORTHANDS}, e.g.
+    "ab:Contact") to callables called with each such element once it is
+    parsed, the values they return are kept in document order in the
+    streamed attribute of the L{SOAPResponse} as (name, value) tuples,
+    None values being dropped. The streamed elements don't appear in the
+    final tree.
+
+        @since: 0.5"""
+
+    def __init__(self, stream_handlers={}):
+        handlers = {}
+        for name, handler in stream_handlers.iteritems():
+            prefix, tag = name.split(":", 1)
+            handlers["{%s}%s" % (NS_SHORTHANDS[prefix], tag)] = (name, handler)
+        self._streaming = len(handlers) > 0
+        self._target = _StreamingTarget(handlers)
+        self._parser = ElementTree.FastXMLParser(target=self._target)
+        self._root = None
+        self._error = None
+        self.size = 0
+
+    def __str__(self):
+        return "<streamed SOAP response, %d bytes>" % self.size
+
+    @property
+    def streamed(self):
+        if not self._streaming:
+            return None
+        return self._target.streamed
+
+    def feed(self, data):
+        """Parses the next chunk of the document"""
+        if self._error is not None:
+            return
+        self.size += len(data)
+        try:
+            self._parser.feed(data)
+        except Exception, err:
+            self._error = err
+
+    def close(self):
+        """Completes the parsing
+
+            @rtype: L{SOAPResponse}"""
+        return SOAPResponse(self)
+
+    def root(self):
+        if self._root is None and self._error is None:
+            try:
+                self._root = self._parser.close()
+            except Exception, err:
+                self._error = err
+        if self._error is not None:
+            raise self._error
+        return self._root
+
+
 class SOAPResponse(ElementTree.XMLResponse):
-    NS_SHORTHANDS = {"soap" : XMLNS.SOAP.ENVELOPE,
-            "xmlenc" : XMLNS.ENCRYPTION.BASE,
-            "wsse" : XMLNS.WS.SECEXT,
-            "wst" : XMLNS.WS.TRUST,
-            "wsa" : XMLNS.WS.ADDRESSING,
-            "wsp" : XMLNS.WS.POLICY,
-            "wsi" : XMLNS.WS.ISSUE,
-            "wsu" : XMLNS.WS.UTILITY,
-            "ps" : XMLNS.MICROSOFT.PASSPORT,
-            "psf" : XMLNS.MICROSOFT.PASSPORT_FAULT,
-            "ab" : XMLNS.MICROSOFT.LIVE.ADDRESSBOOK,
-            "st" : XMLNS.MICROSOFT.LIVE.STORAGE,
-            "stv1" : XMLNS.MICROSOFT.LIVE.STORAGEV1,
-            "oim" : XMLNS.MICROSOFT.LIVE.OIM,
-            "rsi" : XMLNS.MICROSOFT.LIVE.RSI,
-            "spaces" : XMLNS.MICROSOFT.LIVE.SPACES }
+    NS_SHORTHANDS = NS_SHORTHANDS
 
     def __init__(self, soap_data):
+        """Initializer
+
+            @param soap_data: the SOAP document or the parser it was fed to
+            @type soap_data: string or L{SOAPResponseParser}"""
+        self.streamed = None
+        self.attempts = 1 # number of times the request was sent
         ElementTree.XMLResponse.__init__(self, soap_data, self.NS_SHORTHANDS)
         try:
             self.header = self.tree.find("./soap:Header")
@@ -125,10 +223,10 @@ class SOAPResponse(ElementTree.XMLResponse):
             except:
                 self.fault = SOAPFault(self.tree.find("./soap:Fault"))
         except:
-            raise SOAPParseError("invalid xml+soap data", soap_data)
+            raise SOAPParseError("invalid xml+soap data", str(soap_data))
 
         if not self.is_valid():
-            raise SOAPParseError("no header, fault or body", soap_data)
+            raise SOAPParseError("no header, fault or body", str(soap_data))
 
     def is_fault(self):
         return self.fault.is_fault()
@@ -140,35 +238,82 @@ class SOAPResponse(ElementTree.XMLResponse):
             and self.tree is not None
 
     def _parse(self, data):
-        events = ("start", "end", "start-ns", "end-ns")
-        ns = []
-        data = StringIO.StringIO(data)
-        context = ElementTree.iterparse(data, events=events)
-        for event, elem in context:
-            if event == "start-ns":
-                ns.append(elem)
-            elif event == "end-ns":
-                ns.pop()
-            elif event == "start":
-                elem.set("(xmlns)", tuple(ns))
-        data.close()
-        return context.root
+        if not isinstance(data, SOAPResponseParser):
+            parser = SOAPResponseParser()
+            parser.feed(data)
+            data = parser
+        self.streamed = data.streamed
+        return data.root()
+
+class _SOAPRequest(object):
+    """A SOAP request being sent, kept to be sent again if it fails"""
+
+    __slots__ = ('name', 'callback', 'errback', 'user_data', 'parser',
+            'scheme', 'host', 'port', 'http_request', 'attempts')
+
+    def __init__(self, name, callback, errback, user_data, url, http_request):
+        self.name = name
+        self.callback = callback
+        self.errback = errback
+        self.user_data = user_data
+        self.parser = None
+        self.scheme, self.host, self.port, resource = url_split(url)
+        self.http_request = (resource,) + http_request
+        self.attempts = 0
+
 
 class SOAPService(object):
 
-    def __init__(self, name, proxies=None):
+    REQUEST_TIMEOUT = 120
+
+    # request id => {element name => handler}, see L{SOAPResponseParser}
+    STREAMED_ELEMENTS = {}
+
+    # priority of the requests, see L{SOAPScheduler}
+    PRIORITY = Priority.NORMAL
+    # request id => priority, for the requests not using PRIORITY
+    REQUEST_PRIORITIES = {}
+
+    # the requests which may be sent again when it is unknown whether the
+    # server processed them, see L{RetryPolicy}
+    IDEMPOTENT_REQUESTS = ()
+
+    def __init__(self, name, proxies=None, pool=None, scheduler=None,
+            account=None):
         self._name = name
         self._service = getattr(description, self._name)
-        self._active_transports = {}
+        self._active_transports = {} # transport => (request, handler ids)
         self._proxies = proxies or {}
+        if pool is None:
+            pool = HTTPConnectionPool(self._proxies)
+        self._pool = pool
+        if scheduler is None:
+            scheduler = get_scheduler()
+        self._scheduler = scheduler
+        self._account = account
+        self.retry_policy = get_retry_policy()
 
         # Regex to find password
         self.password_regex = re.compile("<wsse:Password>.*?</wsse:Password>", re.S)
 
+    @property
+    def http_pool(self):
+        "The L{HTTPConnectionPool} used by the service."
+        return self._pool
+
+    @property
+    def scheduler(self):
+        "The L{SOAPScheduler} the requests of the service go through."
+        return self._scheduler
+
+    @property
+    def account(self):
+        "The account the requests of the service are sent for."
+        return self._account
+
     def _send_request(self, name, url, soap_header, soap_body, soap_action,
             callback, errback=None, transport_headers={}, user_data=None):
 
-        scheme, host, port, resource = url_split(url)
         http_headers = transport_headers.copy()
         if soap_action is not None:
             http_headers["SOAPAction"] = str(soap_action)
@@ -180,11 +325,67 @@ class SOAPService(object):
         http_headers["Connection"] = "Keep-Alive"
         http_headers["Accept-Encoding"] = "gzip"
 
-        request = compress_xml(soap_template % (soap_header, soap_body))
-
-        transport = self._get_transport(name, scheme, host, port,
-                callback, errback, user_data)
-        transport.request(resource, http_headers, request, 'POST')
+        # the templates are already compressed, see L{xml_template}
+        request = soap_template % (soap_header, soap_body)
+
+        self._send(_SOAPRequest(name, callback, errback, user_data, url,
+            (http_headers, request, 'POST')))
+
+    def _send(self, request):
+        if self.retry_policy is not None:
+            error = self.retry_policy.check(request.host)
+            if error is not None:
+                error.attempts = request.attempts
+                run(request.errback, error)
+                return
+            if request.attempts == 0:
+                self.retry_policy.sent(request.host)
+        request.attempts += 1
+        request.parser = SOAPResponseParser(
+                self.STREAMED_ELEMENTS.get(request.name, {}))
+        priority = self.REQUEST_PRIORITIES.get(request.name, self.PRIORITY)
+        self._scheduler.acquire(self._name, self._account, priority,
+            (self._pool.acquire, request.scheme, request.host, request.port,
+                (self._on_transport_acquired, request),
+                (self._on_transport_unavailable, request)))
+
+    def _on_transport_acquired(self, transport, request):
+        self._ref_transport(transport, request)
+        transport.request(*request.http_request,
+                **{'timeout': self.REQUEST_TIMEOUT,
+                   'consumer': request.parser.feed})
+
+    def _on_transport_unavailable(self, error, request):
+        # the pool was closed while the request waited for a connection
+        self._scheduler.release(self._name)
+        error = SOAPServiceClosedError(self._name)
+        error.attempts = request.attempts
+        run(request.errback, error)
+
+    def _retry(self, request, error=None, status=None, fault=None):
+        """Sends request again later if it failed in a way worth another
+        attempt, returns whether it will be"""
+        policy = self.retry_policy
+        if policy is None:
+            return False
+        unprocessed = policy.classify(error, status, fault)
+        if unprocessed is None:
+            policy.succeeded(request.host)
+            return False
+        policy.failed(request.host)
+        if not unprocessed and request.name not in self.IDEMPOTENT_REQUESTS:
+            return False
+        delay = policy.next_delay(request.attempts)
+        if delay is None:
+            return False
+        logger.info("Sending %s again in %.1f seconds (attempt %d)",
+                request.name, delay, request.attempts + 1)
+        reactor.timeout_add(int(delay * 1000), self.__resend, request)
+        return True
+
+    def __resend(self, request):
+        self._send(request)
+        return False
 
     def _soap_request(self, method, header_args, body_args, callback, errback,
             user_data=None):
@@ -204,25 +405,37 @@ class SOAPService(object):
         if request is None:
             logger.warning("No active request for HTTP response received")
             return
-        request_id, callback, errback, user_data = request
+        request_id = request.name
+        callback = request.callback
+        errback = request.errback
+        user_data = request.user_data
+        parser = request.parser
         method = getattr(self._service, request_id)
 
-        # decode, build and process SOAP response
+        # complete and process the SOAP response, its body was fed to the
+        # parser while it was received
         try:
-            logger.debug("<<< Received response for %s" % request_id)
-            decoded_body = http_response.decode_body()
-            logger.debug("<<<" + unicode(decoded_body, "utf-8"))
-            soap_response = SOAPResponse(decoded_body)
+            logger.debug("<<< Received response for %s (%d bytes)",
+                    request_id, parser.size)
+            soap_response = parser.close()
             if not soap_response.is_fault():
                 response = method.process_response(soap_response)
                 if not response:
-                    raise SOAPParseError("response wasn't found", decoded_body)
+                    raise SOAPParseError("response wasn't found", str(parser))
         except Exception, err:
+            if self._retry(request, err, http_response.status):
+                return
             logger.exception(err)
             logger.error("Couldn't build or process SOAP response")
+            err.attempts = request.attempts
             run(errback, err)
             return
 
+        if self._retry(request, None, http_response.status,
+                soap_response.fault):
+            return
+        soap_response.attempts = request.attempts
+
         # handle SOAP response or fault
         if not soap_response.is_fault():
             handler = getattr(self, "_Handle" + request_id + "Response", None)
@@ -240,6 +453,8 @@ class SOAPService(object):
                                   user_data)
 
     def _request_handler(self, transport, http_request):
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
         #hide password from logs
         cleaned = self.password_regex.sub("<wsse:Password>*****</wsse:Password>", unicode(http_request))
 
@@ -253,10 +468,20 @@ class SOAPService(object):
             self._response_handler(transport, error.response)
             return
 
+        if isinstance(error, HTTPCancelled):
+            # the pool was closed, the request isn't sent again
+            for request in self._dispose_transport(transport):
+                error = SOAPServiceClosedError(self._name)
+                error.attempts = request.attempts
+                run(request.errback, error)
+            return
+
         # transport probably died, dispose all requests on it
         for request in self._dispose_transport(transport):
-            request_id, callback, errback, user_data = request
-            run(errback, error)
+            if self._retry(request, error):
+                continue
+            error.attempts = request.attempts
+            run(request.errback, error)
 
     # Handlers
     def _HandleSOAPFault(self, request_id, callback, errback,
@@ -268,45 +493,28 @@ class SOAPService(object):
         logger.warning("Unhandled Response to %s" % request_id)
 
     # Transport management
-    def _get_transport(self, request_id, scheme, host, port,
-            callback, errback, user_data):
-        key = (scheme, host, port)
-        if key in self._active_transports:
-            trans = self._active_transports[key]
-            transport = trans[0]
-            trans[1].append((request_id, callback, errback, user_data))
-        else:
-            transport = papyon.gnet.protocol.ProtocolFactory(scheme,
-                    host, port, proxies=self._proxies)
-            handler_id = [
-                transport.connect("response-received", self._response_handler),
-                transport.connect("request-sent", self._request_handler),
-                transport.connect("error", self._error_handler)]
-
-            trans = [transport, [(request_id, callback, errback, user_data)], handler_id]
-            self._active_transports[key] = trans
-        return transport
+    def _ref_transport(self, transport, request):
+        handler_id = [
+            transport.connect("response-received", self._response_handler),
+            transport.connect("request-sent", self._request_handler),
+            transport.connect("error", self._error_handler)]
+        self._active_transports[transport] = (request, handler_id)
 
     def _unref_transport(self, transport):
-        for key, trans in self._active_transports.iteritems():
-            if trans[0] == transport:
-                response = trans[1].pop(0)
-
-                if len(trans[1]) != 0:
-                    return response
-
-                for handle in trans[2]:
-                    transport.disconnect(handle)
-                del self._active_transports[key]
-                return response
-        return None
+        """Gives the transport back to the pool once its request is
+        completed and returns the request"""
+        trans = self._active_transports.pop(transport, None)
+        if trans is None:
+            return None
+        request, handler_id = trans
+        for handle in handler_id:
+            transport.disconnect(handle)
+        self._pool.release(transport)
+        self._scheduler.release(self._name)
+        return request
 
     def _dispose_transport(self, transport):
-        for key, trans in self._active_transports.iteritems():
-            if trans[0] == transport:
-                response = trans[1]
-                for handle in trans[2]:
-                    transport.disconnect(handle)
-                del self._active_transports[key]
-                return response
-        return []
+        request = self._unref_transport(transport)
+        if request is None:
+            return []
+        return [request]
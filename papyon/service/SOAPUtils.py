@@ -19,8 +19,39 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 
+import re
 
-__all__ = ['XMLNS']
+__all__ = ['XMLNS', 'compress_xml', 'xml_template']
+
+_space_regex = re.compile(r'>\s+|\s+<')
+# in templates the line breaks and the indentation between two
+# placeholders go as well
+_template_space_regex = re.compile(r'>\s+|\s+<|\s*\n\s*')
+
+def _strip_space(match):
+    space = match.group(0)
+    if space[0] == '>':
+        return '>'
+    elif space[-1] == '<':
+        return '<'
+    return ''
+
+def compress_xml(xml_string):
+    """Removes the whitespace surrounding the tags"""
+    return _space_regex.sub(_strip_space, xml_string)
+
+_templates = {} # template => compressed template
+
+def xml_template(template):
+    """Returns the template with the whitespace surrounding its tags
+    removed. The result is cached: this is meant to be called on the
+    string literals used as request templates, before they are filled."""
+    try:
+        return _templates[template]
+    except KeyError:
+        compressed = _templates[template] = \
+                _template_space_regex.sub(_strip_space, template)
+        return compressed
 
 class XMLNS(object):
 
@@ -19,6 +19,7 @@
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 
 from SOAPService import *
+from SOAPScheduler import Priority
 from description.SingleSignOn.RequestMultipleSecurityTokens import LiveService
 
 from papyon.errors import ClientError, ClientErrorType
@@ -146,7 +147,11 @@ class RequireSecurityTokens(object):
 
 
 class SingleSignOn(SOAPService):
-    def __init__(self, username, password, proxies=None):
+    PRIORITY = Priority.HIGH
+    IDEMPOTENT_REQUESTS = ('RequestMultipleSecurityTokens',)
+
+    def __init__(self, username, password, proxies=None, pool=None,
+            scheduler=None):
         # Passwords can only be up to 16 characters in length
         if len(password) > 16:
             password = password[0:16]
@@ -156,7 +161,8 @@ class SingleSignOn(SOAPService):
 
         self.__pending_response = False
         self.__pending_requests = []
-        SOAPService.__init__(self, "SingleSignOn", proxies)
+        SOAPService.__init__(self, "SingleSignOn", proxies, pool, scheduler,
+                username)
 
     def RequestMultipleSecurityTokens(self, callback, errback, *services):
         """Requests multiple security tokens from the single sign on service.
@@ -18,6 +18,7 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 
+from papyon.service.SOAPScheduler import Priority
 from papyon.service.SOAPService import SOAPService
 from papyon.service.SingleSignOn import *
 from papyon.service.Spaces.constants import SpacesError
@@ -98,10 +99,14 @@ class ContactCard(object):
         return ret
 
 class ContactCardService(SOAPService):
+    PRIORITY = Priority.LOW
+    IDEMPOTENT_REQUESTS = ('GetXmlFeed',)
+
     def __init__(self, sso, proxies=None):
         self._sso = sso
         self._tokens = {}
-        SOAPService.__init__(self, "Spaces", proxies)
+        SOAPService.__init__(self, "Spaces", proxies, sso.http_pool,
+                sso.scheduler, sso.account)
 
     @RequireSecurityTokens(LiveService.SPACES)
     def GetXmlFeed(self, callback, errback, contact):
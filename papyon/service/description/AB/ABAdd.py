@@ -19,6 +19,7 @@
 
 from common import *
 from constants import *
+from papyon.service.SOAPUtils import xml_template
 
 def transport_headers():
     """Returns a dictionary, containing transport (http) headers
@@ -33,7 +34,7 @@ def soap_action():
     return "http://www.msn.com/webservices/AddressBook/ABAdd"
 
 def soap_body(account):
-    return """<ABAdd xmlns="http://www.msn.com/webservices/AddressBook">
+    return xml_template("""<ABAdd xmlns="http://www.msn.com/webservices/AddressBook">
                   <abInfo>
                       <name/>
                       <ownerPuid>0</ownerPuid>
@@ -42,7 +43,7 @@ def soap_body(account):
                       </ownerEmail>
                       <fDefault>true</fDefault>
                   </abInfo>
-              </ABAdd>""" % account
+              </ABAdd>""") % account
 
 def process_response(soap_response):
     return soap_response.body.find("./ab:ABAddResponse/ab:ABAddResult")
@@ -21,6 +21,7 @@ from common import *
 from constants import *
 
 import xml.sax.saxutils as xml
+from papyon.service.SOAPUtils import xml_template
 
 def transport_headers():
     """Returns a dictionary, containing transport (http) headers
@@ -81,29 +82,29 @@ def soap_body(passport_name, is_messenger_user, contact_type, first_name,
         for type, email in email.iteritems():
             yahoo_tags = changed = ""
             if type == ContactEmailType.EXTERNAL:
-                yahoo_tags = """<isMessengerEnabled>
+                yahoo_tags = xml_template("""<isMessengerEnabled>
                                    true
                                 </isMessengerEnabled>
                                 <Capability>
                                    %s
-                                </Capability>""" % capability
+                                </Capability>""") % capability
                 changed = " IsMessengerEnabled Capability"
-            emails += """<ContactEmail>
+            emails += xml_template("""<ContactEmail>
                             <contactEmailType>%s</contactEmailType>
                             <email>%s</email>
                             %s
                             <propertiesChanged>Email%s</propertiesChanged>
-                         </ContactEmail>""" % (type, email, yahoo_tags, changed)
+                         </ContactEmail>""") % (type, email, yahoo_tags, changed)
         contact_info += "<emails>%s</emails>" % emails
 
     if phone is not None:
         phones = ""
         for type, number in phone.iteritems():
-            phones += """<ContactPhone>
+            phones += xml_template("""<ContactPhone>
                             <contactPhoneType>%s</contactPhoneType>
                             <number>%s</number>
                             <propertiesChanged>Number</propertiesChanged>
-                         </ContactPhone>""" % (type, number)
+                         </ContactPhone>""") % (type, number)
         contact_info += "<phones>%s</phones>" % phones
 
     if location is not None:
@@ -113,29 +114,29 @@ def soap_body(passport_name, is_messenger_user, contact_type, first_name,
             for item, value in parts.iteritems():
                 items += "<%s>%s</%s>" % (item, value, item)
                 changes += " %s%s" % (item[0].upper(), item[1:len(item)])
-            locations += """<ContactLocation>
+            locations += xml_template("""<ContactLocation>
                                <contactLocationType>%s</contactLocationType>
                                %s
                                <Changes>%s</Changes>
-                            </ContactLocation>""" % (type, items, changes)
+                            </ContactLocation>""") % (type, items, changes.strip())
         contact_info += "<location>%s</locations>" % locations
 
     if web_site is not None:
         web_sites = ""
         for type, url in web_site.iteritems():
-            web_sites += """<ContactWebSite>
+            web_sites += xml_template("""<ContactWebSite>
                                <contactWebSiteType>%s</contactWebSiteType>
                                <webURL>%s</webURL>
-                            </ContactWebSite>""" % (type, xml.escape(url))
+                            </ContactWebSite>""") % (type, xml.escape(url))
         contact_info += "<webSites>%s</webSites>" % web_sites
 
     if annotation is not None:
         annotations = ""
         for name, value in annotation.iteritems():
-            annotations += """<Annotation>
+            annotations += xml_template("""<Annotation>
                                  <Name>%s</Name>
                                  <Value>%s</Value>
-                              </Annotation>""" % (name, xml.escape(value))
+                              </Annotation>""") % (name, xml.escape(value))
         contact_info += "<annotations>%s</annotations>" % annotations
 
     if comment is not None:
@@ -145,7 +146,7 @@ def soap_body(passport_name, is_messenger_user, contact_type, first_name,
         contact_info += "<Anniversary>%s</Anniversary>" % anniversary
 
     invite_info = ''
-    invite_info += """<MessengerMemberInfo>
+    invite_info += xml_template("""<MessengerMemberInfo>
                            <PendingAnnotations>
                                <Annotation>
                                    <Name>
@@ -159,10 +160,10 @@ def soap_body(passport_name, is_messenger_user, contact_type, first_name,
                            <DisplayName>
                                %(display_name)s
                            </DisplayName>
-                       </MessengerMemberInfo>""" % { 'invite_message' : xml.escape(invite_message),
+                       </MessengerMemberInfo>""") % { 'invite_message' : xml.escape(invite_message),
                                                      'display_name' : xml.escape(display_name) }
 
-    return """
+    return xml_template("""
        <ABContactAdd xmlns="http://www.msn.com/webservices/AddressBook">
             <abId>00000000-0000-0000-0000-000000000000</abId>
             <contacts>
@@ -178,7 +179,7 @@ def soap_body(passport_name, is_messenger_user, contact_type, first_name,
                     %(allow_list_management)s
                 </EnableAllowListManagement>
             </options>
-        </ABContactAdd>""" % { 'contact_info' : contact_info,
+        </ABContactAdd>""") % { 'contact_info' : contact_info,
                                'invite_info' : invite_info,
                                'allow_list_management' : str(enable_allow_list_management).lower()}
 
@@ -18,6 +18,7 @@
 #
 
 from common import *
+from papyon.service.SOAPUtils import xml_template
 
 def transport_headers():
     """Returns a dictionary, containing transport (http) headers
@@ -31,22 +32,28 @@ def soap_action():
 
     return "http://www.msn.com/webservices/AddressBook/ABContactDelete"
 
-def soap_body(contact_id):
-    """Returns the SOAP xml body"""
+def soap_body(contact_ids):
+    """Returns the SOAP xml body
 
-    return """        
+            @param contact_ids: list of contact ids (GUIDs)"""
+    contacts = ""
+    for contact_id in contact_ids:
+        contacts += xml_template("""
+                <Contact>
+                    <contactId>
+                        %s
+                    </contactId>
+                </Contact>""") % contact_id
+
+    return xml_template("""        
         <ABContactDelete xmlns="http://www.msn.com/webservices/AddressBook">
             <abId>
                 00000000-0000-0000-0000-000000000000
             </abId>
             <contacts>
-                <Contact>
-                    <contactId>
-                        %(contact_id)s
-                    </contactId>
-                </Contact>
+                %(contacts)s
             </contacts>
-        </ABContactDelete>""" % { 'contact_id' : contact_id }
+        </ABContactDelete>""") % { 'contacts' : contacts }
 
 def process_response(soap_response):
     return True
@@ -21,6 +21,7 @@ from common import *
 from constants import *
 
 import xml.sax.saxutils as xml
+from papyon.service.SOAPUtils import xml_template
 
 def transport_headers():
     """Returns a dictionary, containing transport (http) headers
@@ -90,22 +91,22 @@ def soap_body(contact_id, display_name, is_messenger_user, contact_type,
     if email is not None:
         emails = ""
         for type, email in email.iteritems():
-            emails += """<ContactEmail>
+            emails += xml_template("""<ContactEmail>
                             <contactEmailType>%s</contactEmailType>
                             <email>%s</email>
                             <propertiesChanged>Email</propertiesChanged>
-                         </ContactEmail>""" % (type, email)
+                         </ContactEmail>""") % (type, email)
         contact_info += "<emails>%s</emails>" % emails
         properties_changed += " ContactEmail"
 
     if phone is not None:
         phones = ""
         for type, number in phone.iteritems():
-            phones += """<ContactPhone>
+            phones += xml_template("""<ContactPhone>
                             <contactPhoneType>%s</contactPhoneType>
                             <number>%s</number>
                             <propertiesChanged>Number</propertiesChanged>
-                         </ContactPhone>""" % (type, number)
+                         </ContactPhone>""") % (type, number)
         contact_info += "<phones>%s</phones>" % phones
         properties_changed += " ContactPhone"
 
@@ -116,21 +117,21 @@ def soap_body(contact_id, display_name, is_messenger_user, contact_type,
             for item, value in parts.iteritems():
                 items += "<%s>%s</%s>" % (item, value, item)
                 changes += " %s%s" % (item[0].upper(), item[1:len(item)]) 
-            locations += """<ContactLocation>
+            locations += xml_template("""<ContactLocation>
                                <contactLocationType>%s</contactLocationType>
                                %s
                                <Changes>%s</Changes>
-                            </ContactLocation>""" % (type, items, changes)
+                            </ContactLocation>""") % (type, items, changes.strip())
         contact_info += "<location>%s</locations>" % locations
         properties_changed += " ContactLocation"
 
     if web_site is not None:
         web_sites = ""
         for type, url in web_site.iteritems():
-            websites += """<ContactWebSite>
+            web_sites += xml_template("""<ContactWebSite>
                               <contactWebSiteType>%s</contactWebSiteType>
                               <webURL>%s</webURL>
-                           </ContactWebSite>""" % (type, xml.escape(url))
+                           </ContactWebSite>""") % (type, xml.escape(url))
         contact_info += "<webSites>%s</webSites>" % web_sites
         properties_changed += " ContactWebSite"
 
@@ -141,10 +142,10 @@ def soap_body(contact_id, display_name, is_messenger_user, contact_type,
                 value = "<Value/>"
             else:
                 value = "<Value>%s</Value>" % value
-            annotations += """<Annotation>
+            annotations += xml_template("""<Annotation>
                                  <Name>%s</Name>
                                  %s
-                              </Annotation>""" % (name, value)
+                              </Annotation>""") % (name, value)
         contact_info += "<annotations>%s</annotations>" % annotations
         properties_changed += " Annotation"
 
@@ -156,7 +157,7 @@ def soap_body(contact_id, display_name, is_messenger_user, contact_type,
         contact_info += "<Anniversary>%s</Anniversary>" % anniversary
         properties_changed += " Anniversary"
 
-    return """
+    return xml_template("""
        <ABContactUpdate xmlns="http://www.msn.com/webservices/AddressBook">
             <abId>00000000-0000-0000-0000-000000000000</abId>
             <contacts>
@@ -177,9 +178,9 @@ def soap_body(contact_id, display_name, is_messenger_user, contact_type,
                     %(allow_list_management)s
                 </EnableAllowListManagement>
             </options>
-        </ABContactUpdate>""" % { 'contact_id' : contact_id,
+        </ABContactUpdate>""") % { 'contact_id' : contact_id,
                                   'contact_info' : contact_info,
-                                  'properties_changed' : properties_changed,
+                                  'properties_changed' : properties_changed.strip(),
                                   'allow_list_management' : str(enable_allow_list_management).lower() }
 
 def process_response(soap_response):
@@ -20,6 +20,7 @@
 from common import *
 
 import xml.sax.saxutils as xml
+from papyon.service.SOAPUtils import xml_template
 
 def transport_headers():
     """Returns a dictionary, containing transport (http) headers
@@ -36,13 +37,13 @@ def soap_action():
 def soap_body(deltas_only, last_change):
     """Returns the SOAP xml body"""
 
-    return """
+    return xml_template("""
        <ABFindAll xmlns="http://www.msn.com/webservices/AddressBook">
           <abId>00000000-0000-0000-0000-000000000000</abId>
           <abView>Full</abView>
           <deltasOnly>%(deltas_only)s</deltasOnly>
           <lastChange>%(last_change)s</lastChange>
-       </ABFindAll>""" % {'deltas_only' : deltas_only,
+       </ABFindAll>""") % {'deltas_only' : deltas_only,
                           'last_change' : last_change}
 
 def process_response(soap_response):
@@ -52,11 +53,18 @@ def process_response(soap_response):
     if find_all_result is None:
         return (None, [], [])
 
-    path = "./ab:groups/ab:Group"
-    groups = find_all_result.findall(path)
+    if soap_response.streamed is not None:
+        # the groups and contacts were handled while being parsed
+        groups = [value for name, value in soap_response.streamed
+                if name == "ab:Group"]
+        contacts = [value for name, value in soap_response.streamed
+                if name == "ab:Contact"]
+    else:
+        path = "./ab:groups/ab:Group"
+        groups = find_all_result.findall(path)
 
-    path = "./ab:contacts/ab:Contact"
-    contacts = find_all_result.findall(path)
+        path = "./ab:contacts/ab:Contact"
+        contacts = find_all_result.findall(path)
 
     path = "./ab:ab"
     ab = find_all_result.find(path)
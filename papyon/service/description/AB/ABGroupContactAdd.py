@@ -19,6 +19,7 @@
 
 from common import *
 from constants import *
+from papyon.service.SOAPUtils import xml_template
 
 def transport_headers():
     """Returns a dictionary, containing transport (http) headers
@@ -38,7 +39,7 @@ def soap_action():
 def soap_body(group_id, contact_id):
     """Returns the SOAP xml body"""
 
-    return """
+    return xml_template("""
         <ABGroupContactAdd xmlns="http://www.msn.com/webservices/AddressBook">
             <abId>
                 00000000-0000-0000-0000-000000000000
@@ -57,7 +58,7 @@ def soap_body(group_id, contact_id):
                     </contactId>
                 </Contact>
             </contacts>
-        </ABGroupContactAdd>""" % { 'group_id' : group_id,
+        </ABGroupContactAdd>""") % { 'group_id' : group_id,
                                     'contact_id' : contact_id }
 
 def process_response(soap_response):
@@ -18,6 +18,7 @@
 #
 
 from common import *
+from papyon.service.SOAPUtils import xml_template
 
 def transport_headers():
     """Returns a dictionary, containing transport (http) headers
@@ -34,7 +35,7 @@ def soap_action():
 def soap_body(group_id, contact_id):
     """Returns the SOAP xml body"""
 
-    return """ 
+    return xml_template(""" 
         <ABGroupContactDelete xmlns="http://www.msn.com/webservices/AddressBook">
             <abId>
                 00000000-0000-0000-0000-000000000000
@@ -53,7 +54,7 @@ def soap_body(group_id, contact_id):
                     </guid>
                 </groupIds>
             </groupFilter>
-        </ABGroupContactDelete>""" % (contact_id, group_id)
+        </ABGroupContactDelete>""") % (contact_id, group_id)
 
 def process_response(soap_response):
     return True
@@ -18,6 +18,7 @@
 #
 
 from common import *
+from papyon.service.SOAPUtils import xml_template
 
 def transport_headers():
     """Returns a dictionary, containing transport (http) headers
@@ -34,7 +35,7 @@ def soap_action():
 def soap_body(group_id):
     """Returns the SOAP xml body"""
 
-    return """
+    return xml_template("""
         <ABGroupDelete xmlns="http://www.msn.com/webservices/AddressBook">
             <abId>
                 00000000-0000-0000-0000-000000000000
@@ -46,7 +47,7 @@ def soap_body(group_id):
                     </guid>
                 </groupIds>
             </groupFilter>
-        </ABGroupDelete>""" % { 'group_id' : group_id }
+        </ABGroupDelete>""") % { 'group_id' : group_id }
 
 def process_response(soap_response):
     return True
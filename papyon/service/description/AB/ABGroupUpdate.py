@@ -20,6 +20,7 @@
 from common import *
 
 import xml.sax.saxutils as xml
+from papyon.service.SOAPUtils import xml_template
 
 def transport_headers():
     """Returns a dictionary, containing transport (http) headers
@@ -36,7 +37,7 @@ def soap_action():
 def soap_body(group_id, group_name):
     """Returns the SOAP xml body"""
 
-    return """
+    return xml_template("""
         <ABGroupUpdate xmlns="http://www.msn.com/webservices/AddressBook">
             <abId>
                 00000000-0000-0000-0000-000000000000
@@ -56,7 +57,7 @@ def soap_body(group_id, group_name):
                     </propertiesChanged>
                 </Group>
             </groups>
-        </ABGroupUpdate>""" % { 'group_id' : group_id,
+        </ABGroupUpdate>""") % { 'group_id' : group_id,
                                 'group_name' : xml.escape(group_name) }
 
 def process_response(soap_response):
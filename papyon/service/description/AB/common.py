@@ -19,11 +19,12 @@
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 
 import xml.sax.saxutils as xml
+from papyon.service.SOAPUtils import xml_template
 
 def soap_header(scenario, security_token):
     """Returns the SOAP xml header"""
 
-    return """
+    return xml_template("""
         <ABApplicationHeader xmlns="http://www.msn.com/webservices/AddressBook">
            <ApplicationId xmlns="http://www.msn.com/webservices/AddressBook">CFE80F9D-180F-4399-82AB-413F33A1FA11</ApplicationId>
            <IsMigration xmlns="http://www.msn.com/webservices/AddressBook">false</IsMigration>
@@ -32,4 +33,4 @@ def soap_header(scenario, security_token):
        <ABAuthHeader xmlns="http://www.msn.com/webservices/AddressBook">
            <ManagedGroupRequest xmlns="http://www.msn.com/webservices/AddressBook">false</ManagedGroupRequest>
            <TicketToken xmlns="http://www.msn.com/webservices/AddressBook">%s</TicketToken>
-       </ABAuthHeader>""" % (xml.escape(scenario), xml.escape(security_token))
+       </ABAuthHeader>""") % (xml.escape(scenario), xml.escape(security_token))
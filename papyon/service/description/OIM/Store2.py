@@ -18,6 +18,7 @@
 #
 
 import xml.sax.saxutils as xml
+from papyon.service.SOAPUtils import xml_template
 def soap_header(from_member_name, friendly_name, proxy, msnp_ver, build_ver,
                 to_member_name, message_number, security_token, app_id, 
                 lock_key):
@@ -25,7 +26,7 @@ def soap_header(from_member_name, friendly_name, proxy, msnp_ver, build_ver,
 
     # FIXME : escape the parameters
 
-    return """<From memberName="%(from_member_name)s" friendlyName="%(friendly_name)s" xml:lang="en-US" proxy="%(proxy)s" xmlns="http://messenger.msn.com/ws/2004/09/oim/" msnpVer="%(msnp_ver)s" buildVer="%(build_ver)s"/>
+    return xml_template("""<From memberName="%(from_member_name)s" friendlyName="%(friendly_name)s" xml:lang="en-US" proxy="%(proxy)s" xmlns="http://messenger.msn.com/ws/2004/09/oim/" msnpVer="%(msnp_ver)s" buildVer="%(build_ver)s"/>
             <To memberName="%(to_member_name)s" xmlns="http://messenger.msn.com/ws/2004/09/oim/"/>
                 <Ticket passport="%(passport)s" appid="%(app_id)s" lockkey="%(lock_key)s" xmlns="http://messenger.msn.com/ws/2004/09/oim/"/>
                 <Sequence xmlns="http://schemas.xmlsoap.org/ws/2003/03/rm">
@@ -33,7 +34,7 @@ def soap_header(from_member_name, friendly_name, proxy, msnp_ver, build_ver,
                         http://messenger.msn.com
                     </Identifier>
                     <MessageNumber>%(message_number)s</MessageNumber>
-                </Sequence>""" % { 'from_member_name' : from_member_name,
+                </Sequence>""") % { 'from_member_name' : from_member_name,
                                  'friendly_name' : friendly_name,
                                  'proxy' : proxy,
                                  'msnp_ver' : msnp_ver,
@@ -59,12 +60,12 @@ def soap_action():
 def soap_body(message_type, message_content):
     """Returns the SOAP xml body"""
 
-    return """<MessageType xmlns="http://messenger.msn.com/ws/2004/09/oim/">
+    return xml_template("""<MessageType xmlns="http://messenger.msn.com/ws/2004/09/oim/">
             %s
             </MessageType>
             <Content xmlns="http://messenger.msn.com/ws/2004/09/oim/">
             %s
-            </Content>""" % (message_type, message_content)
+            </Content>""") % (message_type, message_content)
 
 def process_response(soap_response):
     return True
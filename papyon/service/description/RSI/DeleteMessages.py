@@ -18,6 +18,7 @@
 #
 
 from common import *
+from papyon.service.SOAPUtils import xml_template
 
 def transport_headers():
     """Returns a dictionary, containing transport (http) headers
@@ -38,12 +39,12 @@ def soap_body(message_ids):
     for message_id in message_ids:
         ids += "<messageId>%s</messageId>" %  message_id
 
-    return """
+    return xml_template("""
       <DeleteMessages xmlns="http://www.hotmail.msn.com/ws/2004/09/oim/rsi">
           <messageIds>
               %s
           </messageIds>
-      </DeleteMessages>""" % ids
+      </DeleteMessages>""") % ids
 
 def process_response(soap_response):
     return True
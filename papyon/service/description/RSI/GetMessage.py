@@ -18,6 +18,7 @@
 #
 
 from common import *
+from papyon.service.SOAPUtils import xml_template
 
 def transport_headers():
     """Returns a dictionary, containing transport (http) headers
@@ -38,11 +39,11 @@ def soap_body(message_id, also_mark_as_read):
         @param also_mark_as_read: "true if the message should be marked as read
                                   "false else
     """
-    return """    
+    return xml_template("""    
        <GetMessage xmlns="http://www.hotmail.msn.com/ws/2004/09/oim/rsi">
            <messageId>%s</messageId>
            <alsoMarkAsRead>%s</alsoMarkAsRead>
-       </GetMessage>""" % (message_id, also_mark_as_read)
+       </GetMessage>""") % (message_id, also_mark_as_read)
 
 def process_response(soap_response):
     return soap_response.body.\
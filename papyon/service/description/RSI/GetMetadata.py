@@ -18,6 +18,7 @@
 #
 
 from common import *
+from papyon.service.SOAPUtils import xml_template
 
 def transport_headers():
     """Returns a dictionary, containing transport (http) headers
@@ -34,8 +35,8 @@ def soap_action():
 def soap_body():
     """Returns the SOAP xml body"""
 
-    return """
-        <GetMetadata xmlns="http://www.hotmail.msn.com/ws/2004/09/oim/rsi" />""" 
+    return xml_template("""
+        <GetMetadata xmlns="http://www.hotmail.msn.com/ws/2004/09/oim/rsi" />""") 
 
 def process_response(soap_response):
     return soap_response.body.find("./rsi:GetMetadataResponse")
@@ -19,15 +19,16 @@
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 
 import xml.sax.saxutils as xml
+from papyon.service.SOAPUtils import xml_template
 
 def soap_header(security_token):
     """Returns the SOAP xml header"""
 
     t, p = security_token.split('&')
 
-    return """
+    return xml_template("""
       <PassportCookie xmlns="http://www.hotmail.msn.com/ws/2004/09/oim/rsi">
           <t>%s</t> 
           <p>%s</p>
-      </PassportCookie>""" % (xml.escape(t[2:]), 
+      </PassportCookie>""") % (xml.escape(t[2:]), 
                               xml.escape(p[2:]))
@@ -18,6 +18,7 @@
 #
 
 from common import *
+from papyon.service.SOAPUtils import xml_template
 
 def transport_headers():
     """Returns a dictionary, containing transport (http) headers
@@ -34,7 +35,7 @@ def soap_action():
 def soap_body(cid, photo_name, photo_mime_type, photo_data):
     """Returns the SOAP xml body
     """
-    return """<CreateDocument xmlns="http://www.msn.com/webservices/storage/w10">
+    return xml_template("""<CreateDocument xmlns="http://www.msn.com/webservices/storage/w10">
             <parentHandle>
                 <RelationshipName>
                     /UserTiles
@@ -72,7 +73,7 @@ def soap_body(cid, photo_name, photo_mime_type, photo_data):
             <relationshipName>
                 Messenger User Tile
             </relationshipName>
-        </CreateDocument>""" % (cid, photo_name, photo_mime_type, photo_data) 
+        </CreateDocument>""") % (cid, photo_name, photo_mime_type, photo_data) 
 
 def process_response(soap_response):
     return soap_response.body.\
@@ -18,6 +18,7 @@
 #
 
 from common import *
+from papyon.service.SOAPUtils import xml_template
 
 def transport_headers():
     """Returns a dictionary, containing transport (http) headers
@@ -34,7 +35,7 @@ def soap_action():
 def soap_body(source_rid, target_rid):
     """Returns the SOAP xml body
     """
-    return """<CreateRelationships xmlns="http://www.msn.com/webservices/storage/w10">
+    return xml_template("""<CreateRelationships xmlns="http://www.msn.com/webservices/storage/w10">
             <relationships>
                 <Relationship>
                     <SourceID>
@@ -54,7 +55,7 @@ def soap_body(source_rid, target_rid):
                     </RelationshipName>
                 </Relationship>
             </relationships>
-        </CreateRelationships>""" % (source_rid, target_rid)
+        </CreateRelationships>""") % (source_rid, target_rid)
 
 def process_response(soap_response):
     return True
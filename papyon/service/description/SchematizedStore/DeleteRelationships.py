@@ -18,6 +18,7 @@
 #
 
 from common import *
+from papyon.service.SOAPUtils import xml_template
 
 def transport_headers():
     """Returns a dictionary, containing transport (http) headers
@@ -35,7 +36,7 @@ def soap_body(cid, source_rid, target_rid):
     """Returns the SOAP xml body
     """
     if cid is not None:
-        source_handle = """<RelationshipName>
+        source_handle = xml_template("""<RelationshipName>
                                /UserTiles
                            </RelationshipName>
                            <Alias>
@@ -45,11 +46,11 @@ def soap_body(cid, source_rid, target_rid):
                                <NameSpace>
                                    MyCidStuff
                                </NameSpace>
-                           </Alias>""" % cid
+                           </Alias>""") % cid
     else:
         source_handle = "<ResourceID>%s</ResourceID>" % source_rid
 
-    return """<DeleteRelationships xmlns="http://www.msn.com/webservices/storage/w10">
+    return xml_template("""<DeleteRelationships xmlns="http://www.msn.com/webservices/storage/w10">
             <sourceHandle>            
                 %s
             </sourceHandle>
@@ -60,7 +61,7 @@ def soap_body(cid, source_rid, target_rid):
                     </ResourceID>
                 </ObjectHandle>
             </targetHandles>
-        </DeleteRelationships>""" % (source_handle, target_rid)
+        </DeleteRelationships>""") % (source_handle, target_rid)
 
 def process_response(soap_response):
     return True
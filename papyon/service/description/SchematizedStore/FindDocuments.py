@@ -18,6 +18,7 @@
 #
 
 from common import *
+from papyon.service.SOAPUtils import xml_template
 
 def transport_headers():
     """Returns a dictionary, containing transport (http) headers
@@ -34,7 +35,7 @@ def soap_action():
 def soap_body(cid):
     """Returns the SOAP xml body
     """
-    return """<FindDocuments xmlns="http://www.msn.com/webservices/storage/w10">
+    return xml_template("""<FindDocuments xmlns="http://www.msn.com/webservices/storage/w10">
             <objectHandle>
                 <RelationshipName>
                     /UserTiles
@@ -74,7 +75,7 @@ def soap_body(cid):
                     25
                 </ChunkSize>
             </findContext>
-        </FindDocuments>""" % cid
+        </FindDocuments>""") % cid
 
 def process_response(soap_response):
     return soap_response.body.\
@@ -18,6 +18,7 @@
 #
 
 from common import *
+from papyon.service.SOAPUtils import xml_template
 
 def transport_headers():
     """Returns a dictionary, containing transport (http) headers
@@ -37,7 +38,7 @@ def soap_body(cid, profile_rid, p_date_modified, expression_rid,
               photo, flags):
     """Returns the SOAP xml body
     """
-    return """<GetProfile xmlns="http://www.msn.com/webservices/storage/w10">
+    return xml_template("""<GetProfile xmlns="http://www.msn.com/webservices/storage/w10">
               <profileHandle>
                   <Alias>
                       <Name>%(cid)s</Name>
@@ -60,7 +61,7 @@ def soap_body(cid, profile_rid, p_date_modified, expression_rid,
                       <Flags>%(flags)s</Flags>
                   </ExpressionProfileAttributes>
               </profileAttributes>
-         </GetProfile>""" % { 'cid' : cid,
+         </GetProfile>""") % { 'cid' : cid,
                               'profile_rid' : profile_rid,
                               'p_date_modified' : p_date_modified,
                               'expression_rid' : expression_rid,
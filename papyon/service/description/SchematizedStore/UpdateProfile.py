@@ -18,6 +18,7 @@
 #
 
 from common import *
+from papyon.service.SOAPUtils import xml_template
 
 def transport_headers():
     """Returns a dictionary, containing transport (http) headers
@@ -34,7 +35,7 @@ def soap_action():
 def soap_body(profile_rid, display_name, personal_status, flags=0):
     """Returns the SOAP xml body
     """
-    return """
+    return xml_template("""
         <UpdateProfile xmlns="http://www.msn.com/webservices/storage/w10">
             <profile>
                 <ResourceID>
@@ -55,7 +56,7 @@ def soap_body(profile_rid, display_name, personal_status, flags=0):
                     </Flags>
                 </ExpressionProfile>
             </profile>
-        </UpdateProfile>""" % (profile_rid, display_name, personal_status, flags)
+        </UpdateProfile>""") % (profile_rid, display_name, personal_status, flags)
 
 def process_response(soap_response):
     return True
@@ -19,11 +19,12 @@
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 
 import xml.sax.saxutils as xml
+from papyon.service.SOAPUtils import xml_template
 
 def soap_header(scenario, security_token):
     """Returns the SOAP xml header"""
 
-    return """<StorageApplicationHeader xmlns="http://www.msn.com/webservices/storage/w10">
+    return xml_template("""<StorageApplicationHeader xmlns="http://www.msn.com/webservices/storage/w10">
             <ApplicationID>Messenger Client 8.0</ApplicationID>
             <Scenario>
                 %s
@@ -34,4 +35,4 @@ def soap_header(scenario, security_token):
             <TicketToken>
                 %s
             </TicketToken>
-        </StorageUserHeader>""" % (xml.escape(scenario), xml.escape(security_token))
+        </StorageUserHeader>""") % (xml.escape(scenario), xml.escape(security_token))
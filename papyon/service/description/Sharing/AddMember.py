@@ -18,6 +18,7 @@
 #
 
 from common import *
+from papyon.service.SOAPUtils import xml_template
 
 def transport_headers():
     """Returns a dictionary, containing transport (http) headers
@@ -31,20 +32,34 @@ def soap_action():
 
     return "http://www.msn.com/webservices/AddressBook/AddMember"
 
-def soap_body(member_role, type, state, account):
-    """Returns the SOAP xml body"""
-    stuff = ""
+def soap_body(member_role, members):
+    """Returns the SOAP xml body
 
-    if type == 'Passport':
-        stuff = "<PassportName>%s</PassportName>" % account
-    elif type == 'Email':
-        stuff = """<Email>%s</Email>
-        <Annotations><Annotation>
-            <Name>MSN.IM.BuddyType</Name>
-            <Value>32:</Value>
-        </Annotation></Annotations>""" % account
+            @param members: list of (type, state, account)"""
+    member_list = ""
+    for type, state, account in members:
+        stuff = ""
+        if type == 'Passport':
+            stuff = "<PassportName>%s</PassportName>" % account
+        elif type == 'Email':
+            stuff = xml_template("""<Email>%s</Email>
+            <Annotations><Annotation>
+                <Name>MSN.IM.BuddyType</Name>
+                <Value>32:</Value>
+            </Annotation></Annotations>""") % account
 
-    return """
+        member_list += xml_template("""
+            <Member xsi:type="%sMember" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
+                <Type>
+                    %s
+                </Type>
+                <State>
+                    %s
+                </State>
+                    %s
+            </Member>""") % (type, type, state, stuff)
+
+    return xml_template("""
         <AddMember xmlns="http://www.msn.com/webservices/AddressBook">
             <serviceHandle>
                 <Id>
@@ -62,19 +77,11 @@ def soap_body(member_role, type, state, account):
                         %s
                     </MemberRole>
                     <Members>
-                        <Member xsi:type="%sMember" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
-                            <Type>
-                                %s
-                            </Type>
-                            <State>
-                                %s
-                            </State>
-                                %s
-                        </Member>
+                        %s
                     </Members>
                 </Membership>
             </memberships>
-        </AddMember>""" % (member_role, type, type, state, stuff)
+        </AddMember>""") % (member_role, member_list)
 
 def process_response(soap_response):
     return True
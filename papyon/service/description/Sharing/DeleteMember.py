@@ -18,6 +18,7 @@
 #
 
 from common import *
+from papyon.service.SOAPUtils import xml_template
 
 def transport_headers():
     """Returns a dictionary, containing transport (http) headers
@@ -31,23 +32,26 @@ def soap_action():
 
     return "http://www.msn.com/webservices/AddressBook/DeleteMember"
 
-def soap_body(member_role, type, state, account):
-    """Returns the SOAP xml body"""
-    address = ""
-    
-    if account is not None:
-        if type == 'Passport':
-            address = "<PassportName>%s</PassportName>" % account
-        elif type == 'Email':
-            address = "<Email>%s</Email>" % account
-    
-    member =  """<Member xsi:type="%sMember" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
-                     <Type>%s</Type>
-                     <State>%s</State>
-                     %s
-                 </Member>""" % (type, type, state, address)
+def soap_body(member_role, members):
+    """Returns the SOAP xml body
 
-    return """
+            @param members: list of (type, state, account)"""
+    member = ""
+    for type, state, account in members:
+        address = ""
+        if account is not None:
+            if type == 'Passport':
+                address = "<PassportName>%s</PassportName>" % account
+            elif type == 'Email':
+                address = "<Email>%s</Email>" % account
+
+        member += xml_template("""<Member xsi:type="%sMember" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
+                         <Type>%s</Type>
+                         <State>%s</State>
+                         %s
+                     </Member>""") % (type, type, state, address)
+
+    return xml_template("""
         <DeleteMember xmlns="http://www.msn.com/webservices/AddressBook">
             <serviceHandle>
                 <Id>
@@ -69,7 +73,7 @@ def soap_body(member_role, type, state, account):
                     </Members>
                 </Membership>
             </memberships>
-        </DeleteMember>""" % { 'member_role' : member_role,
+        </DeleteMember>""") % { 'member_role' : member_role,
                                'member' : member }
 
 def process_response(soap_response):
@@ -20,6 +20,7 @@
 from common import *
 
 import xml.sax.saxutils as xml
+from papyon.service.SOAPUtils import xml_template
 
 def transport_headers():
     """Returns a dictionary, containing transport (http) headers
@@ -38,11 +39,11 @@ def soap_body(services_types, deltas_only, last_change):
 
     services = ''
     for service in services_types:
-        services += """<ServiceType xmlns="http://www.msn.com/webservices/AddressBook">
+        services += xml_template("""<ServiceType xmlns="http://www.msn.com/webservices/AddressBook">
                      %s
-                </ServiceType>""" % xml.escape(service)
+                </ServiceType>""") % xml.escape(service)
 
-    return """
+    return xml_template("""
         <FindMembership xmlns="http://www.msn.com/webservices/AddressBook">
             <serviceFilter xmlns="http://www.msn.com/webservices/AddressBook">
                 <Types xmlns="http://www.msn.com/webservices/AddressBook">
@@ -58,11 +59,23 @@ def soap_body(services_types, deltas_only, last_change):
             <lastChange xmlns="http://www.msn.com/webservices/AddressBook">
                 %(last_change)s
             </lastChange>
-        </FindMembership>""" % {'services' : services, 'delta_only' : deltas_only, 'last_change': last_change}
+        </FindMembership>""") % {'services' : services, 'delta_only' : deltas_only, 'last_change': last_change}
 
 def process_response(soap_response):
     # FIXME: don't pick the 1st service only, we need to extract them all
     result = {'Allow':{}, 'Block':{}, 'Reverse':{}, 'Pending':{}}
+    if soap_response.streamed is not None:
+        # the memberships were handled while being parsed, they come
+        # before the service they belong to
+        last_change = None
+        for name, value in soap_response.streamed:
+            if name == "ab:Service":
+                last_change = value.findtext("./ab:LastChange")
+                break
+            role, members = value
+            result[role] = members
+        return (result, last_change)
+
     service = soap_response.body.find("./ab:FindMembershipResponse/"
                                       "ab:FindMembershipResult/ab:Services/"
                                       "ab:Service")
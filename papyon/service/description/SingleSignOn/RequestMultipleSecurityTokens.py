@@ -19,6 +19,7 @@
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 
 import xml.sax.saxutils as xml
+from papyon.service.SOAPUtils import xml_template
 
 class LiveService(object):
     CONTACTS = ("contacts.msn.com", "MBI")
@@ -55,7 +56,7 @@ def soap_action():
 def soap_header(account, password):
     """Returns the SOAP xml header"""
 
-    return """
+    return xml_template("""
         <ps:AuthInfo xmlns:ps="http://schemas.microsoft.com/Passport/SoapServices/PPCRL" Id="PPAuthInfo">
         <ps:HostingApp>{7108E71A-9926-4FCB-BCC9-9A9D3F32E423}</ps:HostingApp>
         <ps:BinaryVersion>4</ps:BinaryVersion>
@@ -68,13 +69,13 @@ def soap_header(account, password):
             <wsse:Username>%(account)s</wsse:Username>
             <wsse:Password>%(password)s</wsse:Password>
         </wsse:UsernameToken>
-        </wsse:Security>""" % {'account': xml.escape(account),
+        </wsse:Security>""") % {'account': xml.escape(account),
                 'password': xml.escape(password)}
 
 def soap_body(*tokens):
     """Returns the SOAP xml body"""
 
-    token_template = """
+    token_template = xml_template("""
         <wst:RequestSecurityToken xmlns:wst="http://schemas.xmlsoap.org/ws/2004/04/trust" Id="RST%(id)d">
             <wst:RequestType>http://schemas.xmlsoap.org/ws/2004/04/security/trust/Issue</wst:RequestType>
             <wsp:AppliesTo xmlns:wsp="http://schemas.xmlsoap.org/ws/2002/12/policy">
@@ -83,9 +84,9 @@ def soap_body(*tokens):
                 </wsa:EndpointReference>
             </wsp:AppliesTo>
             %(policy_reference)s
-        </wst:RequestSecurityToken>"""
-    policy_reference_template = """
-        <wsse:PolicyReference xmlns:wsse="http://schemas.xmlsoap.org/ws/2003/06/secext" URI=%(uri)s/>"""
+        </wst:RequestSecurityToken>""")
+    policy_reference_template = xml_template("""
+        <wsse:PolicyReference xmlns:wsse="http://schemas.xmlsoap.org/ws/2003/06/secext" URI=%(uri)s/>""")
 
     tokens = list(tokens)
     if LiveService.TB in tokens:
@@ -18,17 +18,18 @@
 #
 
 import xml.sax.saxutils as xml
+from papyon.service.SOAPUtils import xml_template
 
 #from papyon.util.element_tree import XMLTYPE
 
 def soap_header(security_token):
     """Returns the SOAP xml header"""
 
-    return """
+    return xml_template("""
          <AuthTokenHeader xmlns="http://www.msn.com/webservices/spaces/v1/">
             <Token>%s
             </Token>
-         </AuthTokenHeader>""" % (xml.escape(security_token))
+         </AuthTokenHeader>""") % (xml.escape(security_token))
 
 def transport_headers():
     """Returns a dictionary, containing transport (http) headers
@@ -45,7 +46,7 @@ def soap_action():
 def soap_body(cid, market = "en-US", max_elements = 2, max_chars = 200, max_images = 6):
     """Returns the SOAP xml body"""
     # , last_viewed, app_id = "Messenger Client 8.0", update_access_time = True, is_active_contact = False
-    return """
+    return xml_template("""
        <GetXmlFeed xmlns="http://www.msn.com/webservices/spaces/v1/">
           <refreshInformation>
              <cid xmlns="http://www.msn.com/webservices/spaces/v1/">%(cid)s</cid>
@@ -57,7 +58,7 @@ def soap_body(cid, market = "en-US", max_elements = 2, max_chars = 200, max_imag
              <maxImageCount xmlns="http://www.msn.com/webservices/spaces/v1/">%(max_image_count)d</maxImageCount>
           </refreshInformation>
        </GetXmlFeed>
-       """ % {'cid' : cid,
+       """) % {'cid' : cid,
               'market' : market,
               'max_element_count' : max_elements,
               'max_character_count' : max_chars,
@@ -18,9 +18,31 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 
-from papyon.errors import ParseError
+from papyon.errors import ClientError, ClientErrorType, ParseError
 
 class SOAPParseError(ParseError):
     """SOAP Parsing Error"""
     def __init__(self, details="", infos=""):
         ParseError.__init__(self, "SOAP", details, infos)
+
+class SOAPCircuitOpenError(ClientError):
+    """The requests to an endpoint are failed right away after it failed
+    repeatedly, see L{RetryPolicy}"""
+    def __init__(self, host, retry_in):
+        ClientError.__init__(self, ClientErrorType.NETWORK, 0)
+        self.host = host
+        self.retry_in = retry_in
+
+    def __str__(self):
+        return "Requests to %s suspended for %d seconds" % (self.host,
+                self.retry_in)
+
+class SOAPServiceClosedError(ClientError):
+    """The request was still waiting to be sent when its service was
+    closed"""
+    def __init__(self, service):
+        ClientError.__init__(self, ClientErrorType.NETWORK, 0)
+        self.service = service
+
+    def __str__(self):
+        return "The %s service was closed" % self.service
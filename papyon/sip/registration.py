@@ -18,6 +18,7 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 
+from papyon.gnet import reactor
 from papyon.util import Timer
 
 import gobject
@@ -74,7 +75,7 @@ class SIPRegistration(gobject.GObject):
         self._state = "UNREGISTERING"
         self._pending_unregister = False
         if self._src is not None:
-            gobject.source_remove(self._src)
+            reactor.source_remove(self._src)
         self._src = None
         self._do_unregister(None, None)
 
@@ -114,7 +115,7 @@ class SIPRegistration(gobject.GObject):
             self._state = "REGISTERED"
             self.emit("registered")
             timeout = int(response.get_header("Expires", 30))
-            self._src = gobject.timeout_add_seconds(timeout, self._on_expire)
+            self._src = reactor.timeout_add_seconds(timeout, self._on_expire)
             if self._pending_unregister:
                 self.unregister()
         else:
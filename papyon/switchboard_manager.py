@@ -30,6 +30,7 @@ import weakref
 import papyon.msnp as msnp
 from papyon.profile import Presence
 from papyon.transport import ServerType
+from papyon.gnet import reactor
 from papyon.util.async import run
 try:
     from weakref import WeakSet
@@ -100,7 +101,7 @@ class SwitchboardHandler(object):
         def process_pending_queues():
             self._process_pending_queues()
             return False
-        gobject.idle_add(process_pending_queues)
+        reactor.idle_add(process_pending_queues)
 
     _switchboard = property(__get_switchboard, __set_switchboard)
     switchboard = property(__get_switchboard)
@@ -36,6 +36,7 @@ from papyon.util.async import run
 
 import gnet
 import gnet.protocol
+import gnet.reactor as reactor
 import msnp
 
 import logging
@@ -213,6 +214,11 @@ class BaseTransport(gobject.GObject):
         self.send_command(cmd, increment, callback, errback)
         return cmd
 
+    def flush(self):
+        """Sends the commands queued so far without waiting for the end of
+        the current main loop iteration."""
+        pass
+
     def enable_ping(self):
         pass
 
@@ -239,6 +245,10 @@ class DirectConnection(BaseTransport):
         self._receiver.delimiter = "\r\n"
         self._transport = transport
         self.__pending_command = None
+        self.__outgoing_commands = []
+        self.__batch = []
+        self.__batch_size = 0
+        self.__flush_source = None
         self.__resetting = False
         self.__error = None
 
@@ -246,10 +256,13 @@ class DirectConnection(BaseTransport):
 
     def _setup_transport(self, host, port, proxies):
         transport = gnet.io.TCPClient(host, port)
+        transport.stats.label = self.server_type
+        transport.nodelay = True
         if proxies:
             transport = ProxyFactory(transport, proxies, 'direct')
         transport.connect("notify::status", self.__on_status_change)
         transport.connect("error", self.__on_error)
+        transport.connect("drained", self.__on_drained)
         return transport
 
     ### public commands
@@ -283,25 +296,68 @@ class DirectConnection(BaseTransport):
     def send_command(self, command, increment=True, callback=None,
             errback=None):
         if self.__error:
-            logger.warning("Transport is errored, not sending %s" % command.name)
+            logger.warning("Transport is errored, not sending %s", command.name)
             run(errback, self.__error)
             return
-        logger.debug('>>> ' + unicode(command))
-        self._transport.send(str(command),
-                (self.__on_command_sent, command, callback), errback)
         if increment:
             self._increment_transaction_id()
+        if self.__outgoing_commands or self.__congested():
+            # hold the commands back until the transport drains
+            self.__outgoing_commands.append((command, callback, errback))
+            return
+        self.__send_command(command, callback, errback)
+
+    def __send_command(self, command, callback, errback):
+        # the commands sent during a main loop iteration are written at once
+        logger.debug(u'>>> %s', command)
+        self.__batch.append((command, callback, errback))
+        self.__batch_size += len(str(command))
+        if self.__flush_source is None:
+            self.__flush_source = reactor.idle_add(self.__on_flush)
+
+    def flush(self):
+        if self.__flush_source is not None:
+            reactor.source_remove(self.__flush_source)
+            self.__flush_source = None
+        if not self.__batch:
+            return
+        batch, self.__batch = self.__batch, []
+        self.__batch_size = 0
+        data = "".join([str(command) for command, callback, errback in batch])
+        self._transport.send(data, (self.__on_batch_sent, batch),
+                (self.__on_batch_failed, batch))
 
     def enable_ping(self):
         cmd = msnp.Command()
         cmd.build("PNG", None)
         self.send_command(cmd, False)
+        self.flush()
+
+    def __on_flush(self):
+        self.__flush_source = None
+        self.flush()
+        return False
 
-    def __on_command_sent(self, command, user_callback):
-        self.emit("command-sent", command)
-        run(user_callback)
+    def __congested(self):
+        # the batch isn't written yet but counts against the watermark
+        transport = self._transport
+        return not transport.writable or transport.buffered_bytes + \
+                self.__batch_size >= transport.high_watermark
+
+    def __on_batch_sent(self, batch):
+        for command, callback, errback in batch:
+            self.emit("command-sent", command)
+            run(callback)
+
+    def __on_batch_failed(self, error, batch):
+        for command, callback, errback in batch:
+            run(errback, error)
 
     ### callbacks
+    def __on_drained(self, transport):
+        while self.__outgoing_commands and not self.__congested():
+            self.__send_command(*self.__outgoing_commands.pop(0))
+
     def __on_status_change(self, transport, param):
         status = transport.get_property("status")
         if status == gnet.IoStatus.OPEN:
@@ -310,6 +366,15 @@ class DirectConnection(BaseTransport):
                 self.__resetting = False
             self.emit("connection-success")
         elif status == gnet.IoStatus.CLOSED:
+            if self.__flush_source is not None:
+                reactor.source_remove(self.__flush_source)
+                self.__flush_source = None
+            commands = self.__batch + self.__outgoing_commands
+            self.__batch = []
+            self.__batch_size = 0
+            self.__outgoing_commands = []
+            for command, callback, errback in commands:
+                run(errback, gnet.errors.IoConnectionClosed(transport, status))
             if not self.__resetting and not self.__error:
                 self.emit("connection-lost", None)
             self.__error = None
@@ -340,7 +405,7 @@ class DirectConnection(BaseTransport):
             cmd.payload = chunk
             self.__pending_command = None
             self._receiver.delimiter = "\r\n"
-        logger.debug('<<< ' + unicode(cmd))
+        logger.debug(u'<<< %s', cmd)
         self.emit("command-received", cmd)
 gobject.type_register(DirectConnection)
 
@@ -348,7 +413,16 @@ gobject.type_register(DirectConnection)
 class HTTPPollConnection(BaseTransport):
     """Implements an HTTP polling transport, basically it encapsulates the MSNP
     commands into an HTTP request, and receive responses by polling a specific
-    url"""
+    url.
+
+    The commands queued while a request is in flight are all sent in the
+    next one. The gateway is polled every POLL_MIN_INTERVAL seconds while
+    commands are exchanged, the interval then doubles with each empty poll
+    up to POLL_MAX_INTERVAL."""
+
+    POLL_MIN_INTERVAL = 0.5
+    POLL_MAX_INTERVAL = 5
+
     def __init__(self, server, server_type=ServerType.NOTIFICATION, proxies={}):
         self._target_server = server
         if server_type == ServerType.SWITCHBOARD:
@@ -358,11 +432,18 @@ class HTTPPollConnection(BaseTransport):
         BaseTransport.__init__(self, server, server_type, proxies)
         self._setup_transport(server[0], server[1], proxies)
         
-        self._command_queue = []
+        self._command_queue = [] # [(command, callback, errback), ...]
+        self._sending = [] # the commands of the request in flight
         self._waiting_for_response = False # are we waiting for a response
         self._polling_source_id = None
+        self._send_source_id = None
+        self._poll_interval = self.POLL_MIN_INTERVAL
         self._session_id = None
+        self.__closed = False
         self.__error = None
+        self.__buffer = ""
+        self.__received = 0 # bytes received for the request in flight
+        self.__pending_command = None
 
     def _setup_transport(self, host, port, proxies):
         handles = []
@@ -375,13 +456,21 @@ class HTTPPollConnection(BaseTransport):
 
     def establish_connection(self):
         logger.debug('<-> Connecting to %s:%d' % self.server)
-        self._polling_source_id = gobject.timeout_add_seconds(5, self._poll)
+        self.__closed = False
+        self.__buffer = ""
+        self.__pending_command = None
+        self._poll_interval = self.POLL_MIN_INTERVAL
+        self._schedule_poll()
         self.emit("connection-success")
 
     def lose_connection(self, error=None):
+        self.__closed = True
         if self._polling_source_id:
-            gobject.source_remove(self._polling_source_id)
+            reactor.source_remove(self._polling_source_id)
             self._polling_source_id = None
+        if self._send_source_id:
+            reactor.source_remove(self._send_source_id)
+            self._send_source_id = None
         if error is not None:
             self.emit("connection-failure", error)
         elif not self.__error:
@@ -405,13 +494,16 @@ class HTTPPollConnection(BaseTransport):
 
     def send_command(self, command, increment=True, callback=None,
             errback=None):
-        self._command_queue.append((command, increment, callback, errback))
-        self._send_command()
+        if increment:
+            self._increment_transaction_id()
+        self._command_queue.append((command, callback, errback))
+        # the commands sent during a main loop iteration go in one request
+        if self._send_source_id is None:
+            self._send_source_id = reactor.idle_add(self.__on_send_idle)
 
-    def _send_command(self):
-        if len(self._command_queue) == 0 or self._waiting_for_response:
+    def _send_commands(self):
+        if self._waiting_for_response:
             return
-        command, increment = self._command_queue[0][0:2]
         resource = "/gateway/gateway.dll"
         headers = {
             "Accept": "*/*",
@@ -422,33 +514,50 @@ class HTTPPollConnection(BaseTransport):
             "Content-Type": "application/x-msn-messenger",
             "Proxy-Connection": "Keep-Alive"
         }
-        
-        str_command = str(command)
-        if self._session_id is None:            
+
+        self._sending, self._command_queue = self._command_queue, []
+        if self._session_id is None:
             resource += "?Action=open&Server=%s&IP=%s" % (self.server_type,
                     self._target_server[0])
-        elif command == None:# Polling the server for queued messages
-            resource += "?Action=poll&SessionID=%s" % self._session_id 
-            str_command = ""
+        elif len(self._sending) == 0: # Polling the server for queued messages
+            resource += "?Action=poll&SessionID=%s" % self._session_id
         else:
             resource += "?SessionID=%s" % self._session_id
+        body = "".join([str(command) for command, callback, errback
+            in self._sending])
 
-        self._transport.request(resource, headers, str_command, "POST")
+        self.__received = 0
+        self._transport.request(resource, headers, body, "POST",
+                consumer=self.__on_body_received)
         self._waiting_for_response = True
-        
-        if command is not None:
-            logger.debug('>>> ' + unicode(command))
-        
-        if increment:
-            self._increment_transaction_id()
-        
+
+        if logger.isEnabledFor(logging.DEBUG):
+            for command, callback, errback in self._sending:
+                logger.debug(u'>>> %s', command)
+
+    def _schedule_poll(self):
+        if self._polling_source_id is not None:
+            reactor.source_remove(self._polling_source_id)
+        self._polling_source_id = reactor.timeout_add(
+                int(self._poll_interval * 1000), self._poll)
+
     def _poll(self):
-        if not self._waiting_for_response:
-            self.send_command(None)
-        return True
-    
+        self._polling_source_id = None
+        self._send_commands()
+        return False
+
+    def __on_send_idle(self):
+        self._send_source_id = None
+        self._send_commands()
+        return False
+
     def __on_error(self, transport, error):
         self.__error = error
+        commands = self._sending + self._command_queue
+        self._sending = []
+        self._command_queue = []
+        for command, callback, errback in commands:
+            run(errback, error)
         self.emit("connection-lost", error)
         self.lose_connection()
         
@@ -464,42 +573,60 @@ class HTTPPollConnection(BaseTransport):
                 elif key == 'Session'and value == 'close':
                     #self.lose_connection()
                     pass
-        
+
+        # poll sooner while commands are exchanged
+        if len(self._sending) > 0 or self.__received > 0:
+            self._poll_interval = self.POLL_MIN_INTERVAL
+        else:
+            self._poll_interval = min(self._poll_interval * 2,
+                    self.POLL_MAX_INTERVAL)
+        self._sending = []
         self._waiting_for_response = False
 
-        commands = http_response.body
-        while len(commands) != 0:
-            commands = self.__extract_command(commands)
-        
-        self._send_command()
+        if self.__closed:
+            return
+        if len(self._command_queue) > 0:
+            self._send_commands()
+        elif self._send_source_id is None:
+            # a poll pending with a backed off interval is brought forward
+            self._schedule_poll()
 
     def __on_sent(self, transport, http_request):
-        if len(self._command_queue) == 0:
-            return
-        command, increment, callback, errback = self._command_queue.pop(0)
-        if command is not None:
+        for command, callback, errback in self._sending:
             run(callback)
             self.emit("command-sent", command)
 
-    def __extract_command(self, data):
-        try:
-            first, rest = data.split('\r\n', 1)
-        except ValueError, err:
-            logger.warning('Unable to extract a command: %s' % data)
-            self.lose_connection(err)
-            return []
-
-        try:
-            cmd = msnp.Command()
-            cmd.parse(first.strip())
-            if cmd.payload_len > 0:
-                cmd.payload = rest[:cmd.payload_len].strip()
-                rest = rest[cmd.payload_len:]
-        except Exception, err:
-            logger.error("Received invalid command, closing connection")
-            self.lose_connection(err)
-            return []
-
-        logger.debug('<<< ' + unicode(cmd))
-        self.emit("command-received", cmd)
-        return rest
+    def __on_body_received(self, chunk):
+        if self.__closed:
+            return
+        # the commands are emitted as soon as they are complete
+        self.__received += len(chunk)
+        data = self.__buffer + chunk
+        offset = 0
+        while True:
+            if self.__pending_command is None:
+                end = data.find('\r\n', offset)
+                if end < 0:
+                    break
+                cmd = msnp.Command()
+                try:
+                    cmd.parse(data[offset:end])
+                except Exception, err:
+                    logger.error("Received invalid command, closing connection")
+                    self.__buffer = ""
+                    self.lose_connection(err)
+                    return
+                offset = end + 2
+                if cmd.payload_len > 0:
+                    self.__pending_command = cmd
+                    continue # wait for payload
+            else:
+                cmd = self.__pending_command
+                if len(data) - offset < cmd.payload_len:
+                    break
+                cmd.payload = data[offset:offset + cmd.payload_len]
+                offset += cmd.payload_len
+                self.__pending_command = None
+            logger.debug(u'<<< %s', cmd)
+            self.emit("command-received", cmd)
+        self.__buffer = data[offset:]
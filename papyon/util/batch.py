@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+from papyon.gnet import reactor
+
+__all__ = ['Batcher']
+
+class Batcher(object):
+    """Groups the items added under the same key within a short window.
+
+    The first item added under a key opens a window of the given number
+    of seconds, when it expires (or once max_size items are waiting) the
+    whole batch is passed to flush(key, items) in the order it was added.
+
+        @since: 0.5"""
+
+    def __init__(self, flush, window=0.1, max_size=100):
+        """Initializer
+
+            @param flush: called with the key and the list of items
+            @type flush: callable
+
+            @param window: seconds during which the items are collected
+            @type window: float
+
+            @param max_size: number of items flushed at most at once
+            @type max_size: integer"""
+        self._flush = flush
+        self._window = window
+        self._max_size = max_size
+        self._batches = {} # key => [item, ...]
+        self._sources = {} # key => timeout source
+        self._keys = [] # keys in the order their batch was opened
+
+    def __len__(self):
+        return sum(len(items) for items in self._batches.itervalues())
+
+    def add(self, key, item):
+        items = self._batches.get(key, None)
+        if items is None:
+            items = self._batches[key] = []
+            self._keys.append(key)
+            self._sources[key] = reactor.timeout_add(int(self._window * 1000),
+                    self._on_window_expired, key)
+        items.append(item)
+        if len(items) >= self._max_size:
+            self.flush(key)
+
+    def flush(self, key=None):
+        """Flushes the batch of key now, or every batch if key is None"""
+        if key is None:
+            for key in self._keys[:]:
+                self.flush(key)
+            return
+        items = self._batches.pop(key, None)
+        if items is None:
+            return
+        self._keys.remove(key)
+        source = self._sources.pop(key, None)
+        if source is not None:
+            reactor.source_remove(source)
+        self._flush(key, items)
+
+    def cancel(self):
+        """Drops the waiting items without flushing them
+
+            @return: the dropped items"""
+        for source in self._sources.itervalues():
+            reactor.source_remove(source)
+        items = []
+        for key in self._keys:
+            items.extend(self._batches[key])
+        self._batches.clear()
+        self._sources.clear()
+        self._keys = []
+        return items
+
+    def _on_window_expired(self, key):
+        self._sources.pop(key, None)
+        self.flush(key)
+        return False
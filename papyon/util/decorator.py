@@ -23,7 +23,7 @@ import sys
 import warnings
 import time
 
-import gobject
+from papyon.gnet import reactor
 
 
 def decorator(function):
@@ -83,7 +83,7 @@ def async(func):
         def async_function():
             func(*args, **kwargs)
             return False
-        gobject.idle_add(async_function)
+        reactor.idle_add(async_function)
     return new_function
 
 class throttled(object):
@@ -113,7 +113,7 @@ class throttled(object):
                 self._queue.append((func, args, kwargs))
                 last_call_delta = now - self._last_call_time
                 process_queue_timeout = int(self._min_delay * len(self._queue) - last_call_delta)
-                gobject.timeout_add_seconds(process_queue_timeout, process_queue)
+                reactor.timeout_add_seconds(process_queue_timeout, process_queue)
 
         new_function.__name__ = func.__name__
         new_function.__doc__ = func.__doc__
@@ -28,9 +28,24 @@ except ImportError:
     except ImportError:
         from elementtree.ElementTree import *
 
-__all__ = ["XMLTYPE", "XMLResponse"]
+try:
+    import lxml.etree as _lxml
+except ImportError:
+    _lxml = None
+
+__all__ = ["XMLTYPE", "XMLResponse", "FastXMLParser", "FastTreeBuilder"]
+
+if _lxml is not None:
+    # lxml builds the trees faster, its elements support the same find
+    # methods
+    FastXMLParser = _lxml.XMLParser
+    FastTreeBuilder = _lxml.TreeBuilder
+else:
+    FastXMLParser = XMLParser
+    FastTreeBuilder = TreeBuilder
 
 import iso8601
+import re
 
 class XMLTYPE(object):
 
@@ -92,10 +107,103 @@ class XMLTYPE(object):
             result = iso8601.parse_date(date_str.strip())
             return result.replace(tzinfo=None) - result.utcoffset()
 
+_STEP = r"(?:\{[^}]*\})?[^/{}*\[@]+"
+_children_path_regex = re.compile(r"^(?:\./)?%s(?:/%s)*$" % (_STEP, _STEP))
+_step_regex = re.compile(_STEP)
+
+def _compile_steps(path):
+    """Splits a path made of child tags only into the list of its tags,
+    returns None for any other kind of path.
+
+    Examples:
+        >>> _compile_steps('./{http://ns/a}b/{http://ns/a}c')
+        ('{http://ns/a}b', '{http://ns/a}c')
+        >>> _compile_steps('.//{http://ns/a}c')
+        >>> _compile_steps('./b[@c]')
+    """
+    if not _children_path_regex.match(path):
+        return None
+    if path.startswith("./"):
+        path = path[2:]
+    steps = tuple(_step_regex.findall(path))
+    for step in steps:
+        if step in (".", ".."):
+            return None
+    return steps
+
+def _find_steps(element, steps):
+    tag = steps[0]
+    for child in element:
+        if child.tag == tag:
+            if len(steps) == 1:
+                return child
+            node = _find_steps(child, steps[1:])
+            if node is not None:
+                return node
+    return None
+
+def _findall_steps(element, steps):
+    nodes = [element]
+    for tag in steps:
+        nodes = [node for parent in nodes for node in parent
+                if node.tag == tag]
+    return nodes
+
+class _PathExpander(object):
+    """Replaces the namespace shorthands of the paths by the namespaces
+    they stand for. The expanded paths are memoized along with their tags
+    when they only select children, those are then looked up directly
+    among the children, without going through the generic path
+    matching."""
+
+    CACHE_SIZE = 512
+
+    def __init__(self, ns_shorthands):
+        self.ns_shorthands = ns_shorthands.copy()
+        self._prefixes = [("%s:" % sh, "/%s:" % sh, "{%s}" % ns, "/{%s}" % ns)
+                for sh, ns in ns_shorthands.iteritems()]
+        self._cache = {}
+
+    def expand(self, path):
+        return self.compile(path)[0]
+
+    def compile(self, path):
+        """Returns the expanded path and its tags (None if it is not made
+        of child tags only)"""
+        try:
+            return self._cache[path]
+        except KeyError:
+            pass
+        expanded = path
+        for prefix, child_prefix, ns, child_ns in self._prefixes:
+            expanded = expanded.replace(child_prefix, child_ns)
+            if expanded.startswith(prefix):
+                expanded = expanded.replace(prefix, ns, 1)
+        if len(self._cache) >= self.CACHE_SIZE:
+            self._cache.clear()
+        compiled = self._cache[path] = (expanded, _compile_steps(expanded))
+        return compiled
+
+_expanders = {} # shorthands items => _PathExpander
+
+def _get_expander(ns_shorthands):
+    key = tuple(sorted(ns_shorthands.iteritems()))
+    expander = _expanders.get(key, None)
+    if expander is None:
+        expander = _expanders[key] = _PathExpander(ns_shorthands)
+    return expander
+
 class _Element(object):
     def __init__(self, element, ns_shorthands):
         self.element = element
-        self.ns_shorthands = ns_shorthands.copy()
+        if not isinstance(ns_shorthands, _PathExpander):
+            ns_shorthands = _get_expander(ns_shorthands)
+        self._expander = ns_shorthands
+        self._children = None # tag => first child with that tag
+
+    @property
+    def ns_shorthands(self):
+        return self._expander.ns_shorthands
 
     def __getattr__(self, name):
         return getattr(self.element, name)
@@ -105,7 +213,7 @@ class _Element(object):
 
     def __iter__(self):
         for node in self.element:
-            yield _Element(node, self.ns_shorthands)
+            yield _Element(node, self._expander)
 
     def __contains__(self, node):
         return node in self.element
@@ -114,30 +222,41 @@ class _Element(object):
         return "<Element name=\"%s\">" % (self.element.tag,)
 
     def _process_path(self, path):
-        for sh, ns in self.ns_shorthands.iteritems():
-            path = path.replace("/%s:" % sh, "/{%s}" % ns)
-            if path.startswith("%s:" % sh):
-                path = path.replace("%s:" % sh, "{%s}" % ns, 1)
-        return path
+        return self._expander.expand(path)
+
+    def _find(self, path):
+        path, steps = self._expander.compile(path)
+        if steps is None:
+            return self.element.find(path)
+        if len(steps) > 1:
+            return _find_steps(self.element, steps)
+        # the same element usually gets several of its children looked up
+        if self._children is None:
+            self._children = {}
+            for child in reversed(self.element):
+                self._children[child.tag] = child
+        return self._children.get(steps[0], None)
 
     def find(self, path):
-        path = self._process_path(path)
-        node = self.element.find(path)
+        node = self._find(path)
         if node is None:
             return None
-        return _Element(node, self.ns_shorthands)
+        return _Element(node, self._expander)
 
     def findall(self, path):
-        path = self._process_path(path)
+        path, steps = self._expander.compile(path)
 
         result = []
-        nodes = self.element.findall(path)
+        if steps is None:
+            nodes = self.element.findall(path)
+        else:
+            nodes = _findall_steps(self.element, steps)
         for node in nodes:
-            result.append(_Element(node, self.ns_shorthands))
+            result.append(_Element(node, self._expander))
         return result
 
     def findtext(self, path, type=None):
-        result = self.find(path)
+        result = self._find(path)
         if result is None:
             return ""
         result = result.text
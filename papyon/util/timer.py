@@ -18,7 +18,7 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 
-import gobject
+from papyon.gnet import reactor
 
 __all__ = ['Timer']
 
@@ -35,16 +35,16 @@ class Timer(object):
     def start_timeout(self, key, time, *cb_args):
         self.stop_timeout(key)
         if int(time) == time:
-            source = gobject.timeout_add_seconds(int(time), self.on_timeout, key)
+            source = reactor.timeout_add_seconds(int(time), self.on_timeout, key)
         else:
-            source = gobject.timeout_add(int(time * 1000), self.on_timeout, key)
+            source = reactor.timeout_add(int(time * 1000), self.on_timeout, key)
         self._timeout_sources[key] = source
         self._timeout_args[key] = cb_args
 
     def stop_timeout(self, key):
         source = self._timeout_sources.get(key, None)
         if source is not None:
-            gobject.source_remove(source)
+            reactor.source_remove(source)
             del self._timeout_sources[key]
         if key in self._timeout_args:
             return self._timeout_args.pop(key)
@@ -61,7 +61,7 @@ class Timer(object):
     def stop_all_timeout(self):
         for (key, source) in self._timeout_sources.items():
             if source is not None:
-                gobject.source_remove(source)
+                reactor.source_remove(source)
         self._timeout_sources.clear()
         self._timeout_args.clear()
 
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""Feeds 100k synthetic NLN and UBX commands, in socket sized blocks,
+through the receiver of a DirectConnection and dispatches them to a
+protocol, with the protocol logging disabled, then enabled on the logger
+but filtered out by the handler. Also times the serialization of the
+outgoing commands, which are written once and logged once."""
+
+import logging
+import sys
+import time
+
+sys.path.insert(0, "")
+
+from papyon import msnp
+from papyon.msnp.base import BaseProtocol
+from papyon.transport import DirectConnection, ServerType
+
+COMMANDS = 100000
+BLOCK_SIZE = 16384
+
+UBX_PAYLOAD = "<Data><PSM>Listening to something</PSM><CurrentMedia>" \
+        "</CurrentMedia><MachineGuid>{F26D1F07-95E2-403C-BC18-D4BFED493428}" \
+        "</MachineGuid></Data>"
+
+class Protocol(BaseProtocol):
+    def __init__(self, transport):
+        BaseProtocol.__init__(self, None, transport)
+        self.received = 0
+
+    def _handle_NLN(self, command):
+        self.received += 1
+
+    def _handle_UBX(self, command):
+        self.received += 1
+
+
+def stream():
+    lines = []
+    for i in xrange(COMMANDS / 2):
+        lines.append("NLN NLN 1:contact%d@hotmail.com Contact%%20%d " \
+                "2789003324:48 %%3Cmsnobj%%2F%%3E\r\n" % (i, i))
+        lines.append("UBX 1:contact%d@hotmail.com %d\r\n%s" % \
+                (i, len(UBX_PAYLOAD), UBX_PAYLOAD))
+    data = "".join(lines)
+    return [data[i:i + BLOCK_SIZE] for i in xrange(0, len(data), BLOCK_SIZE)]
+
+def receive(blocks):
+    connection = DirectConnection(("127.0.0.1", 1863),
+            ServerType.NOTIFICATION)
+    protocol = Protocol(connection)
+    receiver = connection._receiver
+    start = time.time()
+    for block in blocks:
+        receiver._on_received(None, block, len(block))
+    elapsed = time.time() - start
+    assert protocol.received == COMMANDS, protocol.received
+    return elapsed
+
+def serialize():
+    commands = []
+    for i in xrange(COMMANDS):
+        command = msnp.Command()
+        command.build("UUX", i, UBX_PAYLOAD)
+        commands.append(command)
+    start = time.time()
+    for command in commands:
+        str(command) # written
+        str(command) # logged or sent again
+    return time.time() - start
+
+def main():
+    blocks = stream()
+    logger = logging.getLogger('papyon')
+    handler = logging.StreamHandler()
+    handler.setLevel(logging.INFO)
+    logger.addHandler(handler)
+
+    for name, level in (("logging off", logging.WARNING),
+            ("logger on, handler off", logging.DEBUG)):
+        logger.setLevel(level)
+        elapsed = receive(blocks)
+        print "%-24s: %7.3f s, %5.2f us per command" % (name, elapsed,
+                elapsed * 1e6 / COMMANDS)
+    logger.setLevel(logging.WARNING)
+
+    elapsed = serialize()
+    print "%-24s: %7.3f s, %5.2f us per command" % ("serialization", elapsed,
+            elapsed * 1e6 / COMMANDS)
+
+if __name__ == "__main__":
+    main()
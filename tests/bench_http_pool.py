@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""Counts the connections opened by the SOAP calls of a login sync (SSO,
+then FindMembership and ABFindAll, then GetProfile, then GetMetadata)
+against a local keep-alive HTTP stand-in, with a new connection per
+request as before, and with a shared HTTPConnectionPool."""
+
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, "")
+
+from papyon.gnet import reactor
+try:
+    reactor.install(reactor.EpollReactor())
+except AttributeError:
+    pass
+
+from papyon.gnet.protocol import ProtocolFactory, HTTPConnectionPool
+
+LOGINS = 3
+RESPONSE = "<soap:Envelope>%s</soap:Envelope>" % ("x" * 4096)
+
+class StandIn(object):
+    def __init__(self):
+        self.accepted = 0
+        self.ports = {}
+        for service in ("sso", "contacts", "storage", "rsi"):
+            server = socket.socket()
+            server.bind(("127.0.0.1", 0))
+            server.listen(5)
+            self.ports[service] = server.getsockname()[1]
+            thread = threading.Thread(target=self.accept, args=(server,))
+            thread.setDaemon(True)
+            thread.start()
+
+    def accept(self, server):
+        while True:
+            conn, address = server.accept()
+            self.accepted += 1
+            thread = threading.Thread(target=self.serve, args=(conn,))
+            thread.setDaemon(True)
+            thread.start()
+
+    def serve(self, conn):
+        data = ""
+        while True:
+            buf = conn.recv(65536)
+            if not buf:
+                break
+            data += buf
+            while "\r\n\r\n" in data:
+                headers, rest = data.split("\r\n\r\n", 1)
+                length = 0
+                for line in headers.split("\r\n"):
+                    if line.lower().startswith("content-length:"):
+                        length = int(line.split(":", 1)[1])
+                if len(rest) < length:
+                    break
+                data = rest[length:]
+                conn.sendall("HTTP/1.1 200 OK\r\nContent-Type: text/xml\r\n"
+                        "Content-Length: %d\r\n\r\n%s" % (len(RESPONSE),
+                        RESPONSE))
+        conn.close()
+
+def login_sync(stand_in, get_connection, put_connection, done):
+    steps = [["sso"], ["contacts", "contacts"], ["storage"], ["rsi"]]
+
+    def run_step():
+        if len(steps) == 0:
+            done()
+            return
+        services = steps.pop(0)
+        state = {'pending': len(services)}
+        for service in services:
+            get_connection(stand_in.ports[service],
+                    lambda connection: send(connection, state))
+
+    def send(connection, state):
+        def on_response(connection, response):
+            for handle in handles:
+                connection.disconnect(handle)
+            put_connection(connection)
+            state['pending'] -= 1
+            if state['pending'] == 0:
+                run_step()
+        handles = [connection.connect("response-received", on_response)]
+        connection.request("/", {"SOAPAction": "bench",
+            "Connection": "Keep-Alive"}, "<soap:Envelope/>", "POST")
+
+    run_step()
+
+def bench(stand_in, pooled):
+    pool = HTTPConnectionPool()
+    if pooled:
+        get_connection = lambda port, callback: \
+                pool.acquire("http", "127.0.0.1", port, (callback,))
+        put_connection = pool.release
+    else:
+        get_connection = lambda port, callback: \
+                callback(ProtocolFactory("http", "127.0.0.1", port))
+        put_connection = lambda connection: connection.close()
+
+    accepted = stand_in.accepted
+    start = time.time()
+    state = {'logins': LOGINS}
+    def done():
+        state['logins'] -= 1
+        if state['logins'] == 0:
+            reactor.quit()
+        else:
+            login_sync(stand_in, get_connection, put_connection, done)
+    login_sync(stand_in, get_connection, put_connection, done)
+    reactor.run()
+    elapsed = time.time() - start
+    pool.close()
+    return stand_in.accepted - accepted, elapsed
+
+def main():
+    stand_in = StandIn()
+    for name, pooled in (("per request", False), ("pooled", True)):
+        connections, elapsed = bench(stand_in, pooled)
+        print "%-12s: %2d connections, %7.2f ms for %d login syncs" % \
+                (name, connections, elapsed * 1000, LOGINS)
+
+if __name__ == "__main__":
+    main()
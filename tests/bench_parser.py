@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""Measures the throughput of the receive framing used by DelimiterParser
+on 1 MB of mixed "\\r\\n" and length delimited NS traffic, fed in 2 KB,
+64 KB and 256 KB reads, compared to the former string splitting approach."""
+
+import random
+import sys
+import time
+
+sys.path.insert(0, "")
+
+from papyon.gnet.buffer import ReceiveBuffer
+
+def build_input(size=1024 * 1024):
+    commands = []
+    length = 0
+    while length < size:
+        if random.random() < 0.01:
+            payload = "x" * random.randint(100, 8 * 1024)
+            command = "MSG user@hotmail.com User %d\r\n%s" % \
+                    (len(payload), payload)
+        else:
+            command = "NLN NLN 1:user%d@hotmail.com User 2789003324:48\r\n" % \
+                    random.randint(0, 10000)
+        commands.append(command)
+        length += len(command)
+    return "".join(commands)
+
+def next_delimiter(chunk, delimiter):
+    if delimiter == "\r\n" and chunk.startswith("MSG"):
+        return int(chunk.rsplit(" ", 1)[1])
+    return "\r\n"
+
+def legacy_framing(reads):
+    cache = ""
+    delimiter = "\r\n"
+    count = 0
+    for buf in reads:
+        cache += buf
+        previous_length = len(cache)
+        while len(cache) != 0:
+            if isinstance(delimiter, int):
+                if delimiter <= len(cache):
+                    chunk, cache = cache[:delimiter], cache[delimiter:]
+                    delimiter = next_delimiter(chunk, delimiter)
+                    count += 1
+            else:
+                s = cache.split(delimiter, 1)
+                if len(s) > 1:
+                    chunk, cache = s
+                    delimiter = next_delimiter(chunk, delimiter)
+                    count += 1
+                else:
+                    cache = s[0]
+            if len(cache) == previous_length:
+                break
+            previous_length = len(cache)
+    return count
+
+def buffer_framing(reads):
+    buffer = ReceiveBuffer()
+    delimiter = "\r\n"
+    count = 0
+    for buf in reads:
+        buffer.append(buf)
+        while len(buffer) != 0:
+            if isinstance(delimiter, int):
+                if delimiter > len(buffer):
+                    break
+                chunk = buffer.read(delimiter)
+            else:
+                chunk = buffer.read_until(delimiter)
+                if chunk is None:
+                    break
+            delimiter = next_delimiter(chunk, delimiter)
+            count += 1
+    return count
+
+def run(name, function, reads, size):
+    start = time.time()
+    count = function(reads)
+    elapsed = time.time() - start
+    print "%-10s %6d chunks in %.3fs (%.1f MB/s)" % (name, count, elapsed,
+            size / elapsed / (1024 * 1024))
+
+if __name__ == "__main__":
+    random.seed(0)
+    data = build_input()
+    for read_size in (2048, 65536, 262144):
+        print "%d bytes reads:" % read_size
+        reads = [data[i:i + read_size] for i in range(0, len(data), read_size)]
+        run("legacy", legacy_framing, reads, len(data))
+        run("buffer", buffer_framing, reads, len(data))
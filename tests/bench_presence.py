@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""Replays the presence storm of a login with 20k contacts (an ILN and an
+UBX for each contact, then NLN status changes and FLN for some of them)
+from a local stand-in notification server to a NotificationProtocol over
+a DirectConnection. The contacts are connected to the events of a
+papyon.Client, as they are once logged in, and the time until the last
+command is handled and its events dispatched is reported along with the
+number of events received by a ContactEventInterface, with and without
+the per property events. The number of contacts can be given on the
+command line, the process peak memory and the number of distinct
+capabilities objects held by the contacts are reported last."""
+
+import resource
+import socket
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, "")
+
+from papyon.gnet import reactor
+try:
+    reactor.install(reactor.EpollReactor())
+except AttributeError:
+    pass
+
+import papyon
+from papyon.event import ContactEventInterface
+from papyon.msnp.notification import NotificationProtocol
+from papyon.profile import Contact, NetworkID, Profile
+from papyon.transport import DirectConnection, ServerType
+
+ROUNDS = 3
+CONTACTS = 20000
+CAPABILITIES = ("2789003324:48", "2788999228:48", "1342177280:132096")
+STATUSES = ("NLN", "BSY", "AWY", "IDL")
+
+UBX_PAYLOAD = "<Data><PSM>Status of %(account)s</PSM><CurrentMedia>" \
+        "</CurrentMedia><MachineGuid>{%(guid)s}</MachineGuid>" \
+        "<EndpointData id=\"{%(guid)s}\"><Capabilities>%(caps)s" \
+        "</Capabilities></EndpointData></Data>"
+
+def account(i):
+    return "contact%d@hotmail.com" % i
+
+def storm():
+    commands = []
+    for i in xrange(CONTACTS):
+        caps = CAPABILITIES[i % len(CAPABILITIES)]
+        commands.append("ILN %d %s 1:%s Contact%%20%d %s 0\r\n" % (i + 10,
+            STATUSES[i % len(STATUSES)], account(i), i, caps))
+        payload = UBX_PAYLOAD % {'account': account(i), 'caps': caps,
+                'guid': uuid.UUID(int=i)}
+        commands.append("UBX 1:%s %d\r\n%s" % (account(i), len(payload),
+            payload))
+    for i in xrange(0, CONTACTS, 2):
+        commands.append("NLN %s 1:%s Contact%%20%d %s 0\r\n" % (
+            STATUSES[(i + 1) % len(STATUSES)], account(i), i,
+            CAPABILITIES[i % len(CAPABILITIES)]))
+    for i in xrange(0, CONTACTS, 10):
+        commands.append("FLN 1:%s 0:0\r\n" % account(i))
+    return len(commands), "".join(commands)
+
+
+class AddressBook(object):
+    def __init__(self, profile):
+        self._profile = profile
+        self.contacts = {}
+        for i in xrange(CONTACTS):
+            self.contacts[account(i)] = Contact(str(uuid.UUID(int=i)),
+                    NetworkID.MSN, account(i), "Contact %d" % i)
+
+    def search_contact(self, account, network_id):
+        if account == self._profile.account:
+            return self._profile
+        return self.contacts.get(account, None)
+
+
+class Client(object):
+    def __init__(self):
+        self.profile = Profile(("user@hotmail.com", "password"), None)
+        self.address_book = AddressBook(self.profile)
+
+
+class ContactEvents(ContactEventInterface):
+    def __init__(self, client):
+        ContactEventInterface.__init__(self, client)
+        self.count = 0
+
+    def _dispatch_event(self, event_name, *params):
+        self.count += 1
+        return ContactEventInterface._dispatch_event(self, event_name, *params)
+
+
+def serve(server, data):
+    while True:
+        conn, address = server.accept()
+        conn.sendall(data)
+        while conn.recv(65536):
+            pass
+        conn.close()
+
+def capabilities_objects(client):
+    objects = set()
+    for contact in client.address_book.contacts.itervalues():
+        objects.add(id(contact.client_capabilities))
+        for end_point in contact.end_points.itervalues():
+            objects.add(id(end_point.capabilities))
+    return len(objects)
+
+def bench(port, expected, property_events):
+    client = Client()
+    connection = DirectConnection(("127.0.0.1", port), ServerType.NOTIFICATION)
+    protocol = NotificationProtocol(client, connection, version=18)
+    events_client = papyon.Client(("127.0.0.1", port))
+    events_client.contact_property_events = property_events
+    events = ContactEvents(events_client)
+    state = {'received': 0, 'start': 0, 'time': 0}
+
+    def on_success(connection):
+        state['start'] = time.time()
+
+    def on_received(connection, command):
+        state['received'] += 1
+        if state['received'] == expected:
+            reactor.call_soon(on_dispatched)
+
+    def on_dispatched():
+        state['time'] = time.time() - state['start']
+        reactor.quit()
+
+    for contact in client.address_book.contacts.itervalues():
+        events_client._Client__connect_contact_signals(contact)
+    connection.connect("connection-success", on_success)
+    connection.connect("command-received", on_received)
+    connection.establish_connection()
+    reactor.run()
+    connection.lose_connection()
+    return state['time'], events.count, capabilities_objects(client)
+
+def main():
+    global CONTACTS
+    if len(sys.argv) > 1:
+        CONTACTS = int(sys.argv[1])
+    expected, data = storm()
+    server = socket.socket()
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("127.0.0.1", 0))
+    server.listen(5)
+    thread = threading.Thread(target=serve, args=(server, data))
+    thread.setDaemon(True)
+    thread.start()
+    port = server.getsockname()[1]
+
+    print "%d commands, %d bytes" % (expected, len(data))
+    for name, property_events in (("batched", False),
+            ("property events", True)):
+        for i in range(ROUNDS):
+            elapsed, events, objects = bench(port, expected,
+                    property_events)
+            print "%-16s: %6.3f s, %5.1f us per command, %d events" % (name,
+                    elapsed, elapsed * 1e6 / expected, events)
+    print "peak memory %d KiB, %d capabilities objects" % \
+            (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, objects)
+
+if __name__ == "__main__":
+    main()
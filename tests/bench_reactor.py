@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""Compares the GLib and epoll reactors: for 10, 100 and 1000 idle
+connections (socket pairs), measures the cost of registering the read
+watches and the wakeup overhead of a message bounced between two sockets
+while the other connections stay watched."""
+
+import socket
+import sys
+import time
+
+sys.path.insert(0, "")
+
+from papyon.gnet import reactor
+
+ROUNDS = 2000
+
+def bench(impl, connections):
+    pairs = [socket.socketpair() for i in range(connections)]
+    for a, b in pairs:
+        a.setblocking(False)
+        b.setblocking(False)
+
+    def on_idle(sock, cond):
+        sock.recv(4096)
+        return True
+
+    start = time.time()
+    sources = [impl.io_add_watch(b, reactor.IO_IN, on_idle)
+            for a, b in pairs[1:]]
+    register_time = time.time() - start
+
+    ping, pong = pairs[0]
+    state = {'rounds': 0}
+
+    def on_pong(sock, cond):
+        sock.recv(4096)
+        sock.send("x")
+        return True
+
+    def on_ping(sock, cond):
+        sock.recv(4096)
+        state['rounds'] += 1
+        if state['rounds'] == ROUNDS:
+            impl.quit()
+            return False
+        sock.send("x")
+        return True
+
+    sources.append(impl.io_add_watch(pong, reactor.IO_IN, on_pong))
+    sources.append(impl.io_add_watch(ping, reactor.IO_IN, on_ping))
+    start = time.time()
+    ping.send("x")
+    impl.run()
+    wakeup_time = (time.time() - start) / (ROUNDS * 2)
+
+    for source in sources:
+        impl.source_remove(source)
+    for a, b in pairs:
+        a.close()
+        b.close()
+    return register_time, wakeup_time
+
+def main():
+    impls = []
+    try:
+        impls.append(("epoll", reactor.EpollReactor))
+    except AttributeError:
+        pass
+    impls.append(("glib", reactor.GLibReactor))
+
+    for connections in (10, 100, 1000):
+        for name, impl_class in impls:
+            try:
+                register_time, wakeup_time = bench(impl_class(), connections)
+            except (AttributeError, NotImplementedError), err:
+                print "%-6s %5d connections: unavailable (%s)" % \
+                        (name, connections, err)
+                continue
+            print "%-6s %5d connections: register %8.3f ms, " \
+                    "wakeup %6.2f us" % (name, connections,
+                    register_time * 1000, wakeup_time * 1000000)
+
+if __name__ == "__main__":
+    main()
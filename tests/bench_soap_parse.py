@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""Parses a synthetic ABFindAll response listing 10000 contacts, once as a
+whole document (the body being joined and then parsed) and once streamed
+in 16KB chunks with the contacts built as they are parsed. Each mode runs
+in its own process so that the peak memory can be compared."""
+
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, "")
+
+CONTACTS = 10000
+CHUNK_SIZE = 16 * 1024
+
+CONTACT = """<Contact><contactId>%(id)s</contactId><contactInfo>\
+<groupIds><guid>00000000-0000-0000-0000-000000000001</guid></groupIds>\
+<contactType>Regular</contactType><quickName>Contact %(index)d</quickName>\
+<passportName>contact%(index)d@example.com</passportName>\
+<IsPassportNameHidden>false</IsPassportNameHidden>\
+<displayName>Contact number %(index)d</displayName><puid>0</puid>\
+<CID>%(index)d</CID><isMobileIMEnabled>false</isMobileIMEnabled>\
+<isMessengerUser>true</isMessengerUser><isFavorite>false</isFavorite>\
+<isSmtp>false</isSmtp><hasSpace>false</hasSpace>\
+<spotWatchState>NoDevice</spotWatchState>\
+<birthdate>0001-01-01T00:00:00</birthdate>\
+<primaryEmailType>ContactEmailPersonal</primaryEmailType>\
+<PrimaryLocation>ContactLocationPersonal</PrimaryLocation>\
+<primaryPhone>ContactPhonePersonal</primaryPhone>\
+<IsPrivate>false</IsPrivate><Gender>Unspecified</Gender>\
+<TimeZone>None</TimeZone><annotations><Annotation>\
+<Name>MSN.IM.Display</Name><Value>1</Value></Annotation></annotations>\
+</contactInfo><propertiesChanged /><fDeleted>false</fDeleted>\
+<lastChange>2010-05-04T12:00:00.0000000-07:00</lastChange></Contact>"""
+
+def build_response():
+    contacts = [CONTACT % {'index': index,
+        'id': "00000000-0000-0000-0000-%012d" % index}
+        for index in range(CONTACTS)]
+    return """<?xml version="1.0" encoding="utf-8"?>\
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/" \
+xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" \
+xmlns:xsd="http://www.w3.org/2001/XMLSchema"><soap:Header>\
+<ServiceHeader xmlns="http://www.msn.com/webservices/AddressBook">\
+<Version>15.01.1408.0000</Version></ServiceHeader></soap:Header><soap:Body>\
+<ABFindAllResponse xmlns="http://www.msn.com/webservices/AddressBook">\
+<ABFindAllResult><groups /><contacts>%s</contacts><ab>\
+<abId>00000000-0000-0000-0000-000000000000</abId>\
+<lastChange>2010-05-04T12:00:00.0000000-07:00</lastChange></ab>\
+</ABFindAllResult></ABFindAllResponse></soap:Body></soap:Envelope>""" % \
+        "".join(contacts)
+
+def chunks(data):
+    return [data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE)]
+
+def run(mode):
+    from papyon.service.AddressBook.ab import AB, Contact
+    from papyon.service.SOAPService import SOAPResponse, SOAPResponseParser
+    import papyon.service.description.AB.ABFindAll as ABFindAll
+
+    received = chunks(build_response())
+    start = time.time()
+    if mode == "document":
+        response = SOAPResponse("".join(received))
+        result = ABFindAll.process_response(response)
+        contacts = [Contact(contact) for contact in result[2]]
+    else:
+        parser = SOAPResponseParser(AB.STREAMED_ELEMENTS["ABFindAll"])
+        for chunk in received:
+            parser.feed(chunk)
+        result = ABFindAll.process_response(parser.close())
+        contacts = result[2]
+    elapsed = time.time() - start
+    assert len(contacts) == CONTACTS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print "%-9s %d contacts: %7.1f ms, peak RSS %6.1f MB" % \
+            (mode, len(contacts), elapsed * 1000, peak / 1024.0)
+
+def main():
+    if len(sys.argv) > 1:
+        run(sys.argv[1])
+        return
+    for mode in ("document", "streamed"):
+        subprocess.call([sys.executable, __file__, mode])
+
+if __name__ == "__main__":
+    main()
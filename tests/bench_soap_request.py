@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""Builds the request of every method of papyon/service/description, once
+by filling the compressed templates and once the way it used to be done:
+the whole envelope being compressed with regular expressions after it is
+filled. Also checks that the requests built from the templates don't
+need any further compression."""
+
+import inspect
+import sys
+import time
+import types
+
+sys.path.insert(0, "")
+
+from papyon.service import description
+from papyon.service.SOAPService import soap_template
+from papyon.service.SOAPUtils import compress_xml
+from papyon.service.description.AB.constants import ContactEmailType
+from papyon.service.description.SingleSignOn.RequestMultipleSecurityTokens \
+        import LiveService
+
+ROUNDS = 2000
+
+SERVICES = ('SingleSignOn', 'AB', 'Sharing', 'SchematizedStore', 'RSI',
+        'OIM', 'Spaces')
+
+ARGUMENTS = {
+        'email': {ContactEmailType.EXTERNAL: 'contact@example.com'},
+        'phone': {'ContactPhonePersonal': '0123456789'},
+        'location': {'ContactLocationPersonal': {'city': 'Paris'}},
+        'web_site': {'ContactWebSitePersonal': 'http://example.com/'},
+        'annotation': {'MSN.IM.Display': '1'},
+        'message_ids': ['1', '2'],
+        'members': [('Passport', 'Accepted', 'contact@example.com'),
+                    ('Email', 'Accepted', 'contact@example.org')],
+        'contact_ids': ['1', '2'],
+        'services_types': ['Messenger', 'Invitation'],
+        'flags': 0,
+        'security_token': 't=value&p=value'}
+
+# the envelope as it was before being compressed once for all
+RAW_ENVELOPE = """<?xml version='1.0' encoding='utf-8'?>
+<soap:Envelope xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
+    <soap:Header>
+        %s
+    </soap:Header>
+    <soap:Body>
+        %s
+    </soap:Body>
+</soap:Envelope>"""
+
+def arguments(function):
+    if function.__name__ == 'soap_body' and \
+            function.__module__.endswith('RequestMultipleSecurityTokens'):
+        return (LiveService.CONTACTS, LiveService.MESSENGER_CLEAR)
+    spec = inspect.getargspec(function)
+    defaults = dict(zip(reversed(spec.args), reversed(spec.defaults or ())))
+    return tuple(ARGUMENTS.get(name, defaults.get(name, "value"))
+            for name in spec.args)
+
+def methods():
+    for service_name in SERVICES:
+        service = getattr(description, service_name)
+        for name in sorted(dir(service)):
+            method = getattr(service, name)
+            if isinstance(method, types.ModuleType) and \
+                    hasattr(method, 'soap_body'):
+                yield "%s.%s" % (service_name, name), method
+
+def main():
+    total_template = total_regex = 0
+    for name, method in methods():
+        header_args = arguments(method.soap_header)
+        body_args = arguments(method.soap_body)
+
+        request = soap_template % (method.soap_header(*header_args),
+                method.soap_body(*body_args))
+        if compress_xml(request) != request:
+            print "%-40s request isn't fully compressed" % name
+
+        start = time.time()
+        for i in xrange(ROUNDS):
+            soap_template % (method.soap_header(*header_args),
+                    method.soap_body(*body_args))
+        template_time = (time.time() - start) / ROUNDS
+
+        start = time.time()
+        for i in xrange(ROUNDS):
+            compress_xml(RAW_ENVELOPE % (method.soap_header(*header_args),
+                method.soap_body(*body_args)))
+        regex_time = (time.time() - start) / ROUNDS
+
+        total_template += template_time
+        total_regex += regex_time
+        print "%-40s templates %6.1f us, regex %6.1f us, %5d bytes" % \
+                (name, template_time * 1e6, regex_time * 1e6, len(request))
+    print "%-40s templates %6.1f us, regex %6.1f us" % \
+            ("total", total_template * 1e6, total_regex * 1e6)
+
+if __name__ == "__main__":
+    main()
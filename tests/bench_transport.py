@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+"""Replays a login-like command sequence (VER, CVR, USR, 20 ADL payloads
+then CHG, UUX and PRP) over a DirectConnection against a local stand-in
+notification server that answers each command, and reports the number of
+write calls and the time until the last answer, with the commands written
+per main loop iteration or flushed one by one."""
+
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, "")
+
+from papyon.gnet import reactor
+try:
+    reactor.install(reactor.EpollReactor())
+except AttributeError:
+    pass
+
+from papyon.transport import DirectConnection, ServerType
+
+ROUNDS = 50
+ADL_PAYLOAD = "<ml l=\"1\">" + "".join(["<d n=\"hotmail.com\">" +
+        "<c n=\"user%d\" l=\"3\" t=\"1\" /></d>" % i for i in range(20)]) + \
+        "</ml>"
+
+def serve(server):
+    while True:
+        conn, address = server.accept()
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        data = ""
+        while True:
+            buf = conn.recv(65536)
+            if not buf:
+                break
+            data += buf
+            replies = []
+            while "\r\n" in data:
+                line, rest = data.split("\r\n", 1)
+                args = line.split()
+                if args[0] in ("ADL", "UUX") and len(rest) >= int(args[-1]):
+                    rest = rest[int(args[-1]):]
+                elif args[0] in ("ADL", "UUX"):
+                    break
+                data = rest
+                replies.append("%s %s OK\r\n" % (args[0], args[1]))
+            conn.sendall("".join(replies))
+        conn.close()
+
+def login(connection, flush):
+    commands = [("VER", ("MSNP18", "CVR0"), None),
+            ("CVR", ("0x0409", "winnt", "6.1"), None),
+            ("USR", ("SSO", "I", "user@hotmail.com"), None)]
+    commands += [("ADL", (), ADL_PAYLOAD)] * 20
+    commands += [("CHG", ("NLN", "0"), None),
+            ("UUX", (), "<Data><PSM></PSM></Data>"),
+            ("PRP", ("MFN", "User"), None)]
+    for name, arguments, payload in commands:
+        connection.send_command_ex(name, arguments, payload)
+        if flush:
+            connection.flush()
+    return len(commands)
+
+def bench(port, flush):
+    connection = DirectConnection(("127.0.0.1", port), ServerType.NOTIFICATION)
+    state = {'expected': 0, 'received': 0, 'start': 0, 'times': []}
+
+    def on_success(connection):
+        state['start'] = time.time()
+        state['expected'] = login(connection, flush)
+
+    def on_received(connection, command):
+        state['received'] += 1
+        if state['received'] == state['expected']:
+            state['times'].append(time.time() - state['start'])
+            reactor.quit()
+
+    connection.connect("connection-success", on_success)
+    connection.connect("command-received", on_received)
+    connection.establish_connection()
+    reactor.run()
+    writes = connection._transport.stats.writes
+    connection.lose_connection()
+    return writes, state['times'][0]
+
+def main():
+    server = socket.socket()
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("127.0.0.1", 0))
+    server.listen(5)
+    thread = threading.Thread(target=serve, args=(server,))
+    thread.setDaemon(True)
+    thread.start()
+    port = server.getsockname()[1]
+
+    for name, flush in (("per iteration", False), ("per command", True)):
+        writes = 0
+        elapsed = 0
+        for i in range(ROUNDS):
+            w, t = bench(port, flush)
+            writes += w
+            elapsed += t
+        print "%-14s: %5.1f writes, %7.3f ms per login" % (name,
+                float(writes) / ROUNDS, elapsed * 1000 / ROUNDS)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+import sys
+import unittest
+
+sys.path.insert(0, "")
+
+from papyon.gnet.buffer import ReceiveBuffer
+
+class ReceiveBufferTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.buffer = ReceiveBuffer()
+
+    def testReadSize(self):
+        self.buffer.append("abcdef")
+        self.assertEqual(self.buffer.read(4), "abcd")
+        self.assertEqual(len(self.buffer), 2)
+        self.assertEqual(self.buffer.read(4), "ef")
+        self.assertEqual(len(self.buffer), 0)
+
+    def testReadAll(self):
+        self.buffer.append("abc")
+        self.buffer.append("def")
+        self.assertEqual(self.buffer.read(), "abcdef")
+        self.assertEqual(self.buffer.read(), "")
+
+    def testPeek(self):
+        self.buffer.append("abcdef")
+        self.assertEqual(self.buffer.peek(3), "abc")
+        self.assertEqual(len(self.buffer), 6)
+
+    def testReadUntil(self):
+        self.buffer.append("VER 1 MSNP18\r\nCVR 2")
+        self.assertEqual(self.buffer.read_until("\r\n"), "VER 1 MSNP18")
+        self.assertEqual(self.buffer.read_until("\r\n"), None)
+        self.buffer.append(" 0x0409\r\n")
+        self.assertEqual(self.buffer.read_until("\r\n"), "CVR 2 0x0409")
+        self.assertEqual(len(self.buffer), 0)
+
+    def testSplitDelimiter(self):
+        self.buffer.append("PNG\r")
+        self.assertEqual(self.buffer.read_until("\r\n"), None)
+        self.buffer.append("\nQNG 50\r\n")
+        self.assertEqual(self.buffer.read_until("\r\n"), "PNG")
+        self.assertEqual(self.buffer.read_until("\r\n"), "QNG 50")
+
+    def testDelimiterChange(self):
+        self.buffer.append("a\nb\r\n")
+        self.assertEqual(self.buffer.read_until("\r\n\r\n"), None)
+        self.assertEqual(self.buffer.read_until("\n"), "a")
+        self.assertEqual(self.buffer.read_until("\r\n"), "b")
+
+    def testCompaction(self):
+        data = "".join(["%04d\r\n" % i for i in range(1000)])
+        for i in range(0, len(data), 7):
+            self.buffer.append(data[i:i + 7])
+        for i in range(1000):
+            self.assertEqual(self.buffer.read_until("\r\n"), "%04d" % i)
+        self.assertEqual(len(self.buffer), 0)
+
+    def testSkip(self):
+        self.buffer.append("abcdef")
+        self.buffer.skip(2)
+        self.assertEqual(self.buffer.read(), "cdef")
+
+
+if __name__ == "__main__":
+    unittest.main()
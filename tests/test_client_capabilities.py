@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+import sys
+import unittest
+
+sys.path.insert(0, "")
+
+from papyon.profile import ClientCapabilities, Contact, NetworkID
+
+class ClientCapabilitiesTestCase(unittest.TestCase):
+
+    def testIntern(self):
+        caps = ClientCapabilities.intern("2789003324:48")
+        self.assertTrue(caps is ClientCapabilities.intern("2789003324:48"))
+        self.assertFalse(caps is ClientCapabilities.intern("2788999228:48"))
+        self.assertEqual(ClientCapabilities(client_id="2789003324:48"), caps)
+        self.assertEqual("2789003324:48", str(caps))
+        self.assertTrue(caps.supports_p2pv2)
+        self.assertTrue(caps.supports_sip_invite)
+        self.assertFalse(caps.is_bot)
+        self.assertRaises(AttributeError, setattr, caps, "is_bot", True)
+        self.assertFalse(caps.is_bot)
+        self.assertRaises(AttributeError, getattr, caps, "is_unknown")
+
+    def testMutable(self):
+        changes = []
+        caps = ClientCapabilities(10)
+        caps.connect("capability-changed",
+                lambda caps, name, value: changes.append((name, value)))
+        caps.supports_p2pv2 = True
+        self.assertTrue(caps.supports_p2pv2)
+        self.assertTrue(caps.supports_rtc_video) # same bits
+        caps.supports_p2pv2 = False
+        self.assertFalse(caps.supports_rtc_video)
+        caps.has_webcam = True
+        caps.has_webcam = True
+        self.assertTrue(caps.has_webcam)
+        self.assertEqual([("supports_p2pv2", True),
+            ("supports_p2pv2", False), ("has_webcam", True)], changes)
+        self.assertFalse(ClientCapabilities.intern(str(caps)) is caps)
+
+    def testContact(self):
+        notifications = []
+        contact = Contact("1", NetworkID.MSN, "alice@hotmail.com", "Alice")
+        contact.connect("notify::client-capabilities",
+                lambda contact, pspec: notifications.append(pspec.name))
+        contact._server_property_changed("client-capabilities", "1:48")
+        contact._server_property_changed("client-capabilities", "1:48")
+        self.assertEqual(["client-capabilities"], notifications)
+        self.assertTrue(contact.client_capabilities is
+                ClientCapabilities.intern("1:48"))
+
+
+if __name__ == "__main__":
+    unittest.main()
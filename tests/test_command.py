@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+import sys
+import unittest
+
+sys.path.insert(0, "")
+
+from papyon import msnp
+from papyon.msnp.base import BaseProtocol
+
+class Transport(object):
+    def connect(self, signal, callback):
+        pass
+
+
+class Protocol(BaseProtocol):
+    def __init__(self):
+        BaseProtocol.__init__(self, None, Transport())
+        self.handled = []
+
+    def _handle_NLN(self, command):
+        self.handled.append(("NLN", command.name))
+
+    def _handle_ACK(self, command):
+        raise ValueError("invalid ACK")
+
+    def _default_handler(self, command):
+        self.handled.append(("default", command.name))
+
+    def _error_handler(self, error):
+        self.handled.append(("error", error.name))
+
+
+class SubProtocol(Protocol):
+    def _handle_NLN(self, command):
+        self.handled.append(("sub NLN", command.name))
+
+
+def parse(buf):
+    command = msnp.Command()
+    command.parse(buf)
+    return command
+
+
+class CommandTestCase(unittest.TestCase):
+
+    def testNoTransactionId(self):
+        command = parse("NLN NLN 1:contact@hotmail.com Contact 2789003324:48 0")
+        self.assertEqual("NLN", command.name)
+        self.assertEqual(None, command.transaction_id)
+        self.assertEqual(["NLN", "1:contact@hotmail.com", "Contact",
+            "2789003324:48", "0"], command.arguments)
+        self.assertEqual(0, command.payload_len)
+
+    def testTransactionId(self):
+        command = parse("ILN 12 NLN 1:contact@hotmail.com Contact 0:0")
+        self.assertEqual(12, command.transaction_id)
+        self.assertEqual("NLN", command.arguments[0])
+        self.assertEqual(None, parse("ACK 7").arguments)
+        self.assertEqual(7, parse("ACK 7").transaction_id)
+        self.assertRaises(ValueError, parse, "ILN x NLN")
+        self.assertRaises(ValueError, parse, "NLNX 1")
+
+    def testPayload(self):
+        command = parse("UBX 1:contact@hotmail.com 12\r\n<Data></Data>")
+        self.assertEqual(["1:contact@hotmail.com"], command.arguments)
+        self.assertEqual(12, command.payload_len)
+        self.assertEqual("<Data></Data>", command.payload)
+        command = parse("GCF 512")
+        self.assertEqual([], command.arguments)
+        self.assertEqual(512, command.payload_len)
+        self.assertEqual(0, parse("UBX").payload_len)
+
+    def testError(self):
+        command = parse("911 4")
+        self.assertTrue(command.is_error())
+        self.assertEqual(4, command.transaction_id)
+        self.assertEqual(0, command.payload_len)
+        command = parse("241 5 60")
+        self.assertEqual(60, command.payload_len)
+        self.assertFalse(parse("NLN NLN").is_error())
+
+    def testSerializationCache(self):
+        command = msnp.Command()
+        command.build("UUX", 3, "<Data />")
+        self.assertEqual("UUX 3 8\r\n<Data />", str(command))
+        command.build("UUX", 4, "<Data></Data>")
+        self.assertEqual("UUX 4 13\r\n<Data></Data>", str(command))
+        command.payload = "<Data/>"
+        self.assertEqual("UUX 4 7\r\n<Data/>", str(command))
+        command.arguments = ("1",)
+        self.assertEqual("UUX 4 1 7\r\n<Data/>", str(command))
+
+    def testPayloadAfterParse(self):
+        command = msnp.Command()
+        command.parse("MSG Hotmail Hotmail 5")
+        self.assertEqual("MSG Hotmail Hotmail\r\n", str(command))
+        command.payload = "hello"
+        self.assertEqual("MSG Hotmail Hotmail 5\r\nhello", str(command))
+
+
+class DispatchTestCase(unittest.TestCase):
+
+    def testDispatch(self):
+        protocol = Protocol()
+        for line in ("NLN NLN 1:contact@hotmail.com", "XYZ 1", "911 2",
+                "ACK 3"):
+            protocol._dispatch_command(None, parse(line))
+        self.assertEqual([("NLN", "NLN"), ("default", "XYZ"),
+            ("error", "911")], protocol.handled)
+
+    def testSubclassTable(self):
+        protocol = SubProtocol()
+        protocol._dispatch_command(None, parse("NLN NLN"))
+        self.assertEqual([("sub NLN", "NLN")], protocol.handled)
+        self.assertTrue(Protocol._dispatch_table() is
+                Protocol._dispatch_table())
+        self.assertFalse(Protocol._dispatch_table() is
+                SubProtocol._dispatch_table())
+
+
+if __name__ == "__main__":
+    unittest.main()
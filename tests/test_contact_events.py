@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+import sys
+import unittest
+
+sys.path.insert(0, "")
+
+import papyon
+from papyon.event import ContactEventInterface
+from papyon.gnet import reactor
+from papyon.profile import Contact, NetworkID, Presence
+
+class ContactEvents(ContactEventInterface):
+    def __init__(self, client):
+        ContactEventInterface.__init__(self, client)
+        self.events = []
+
+    def on_contacts_changed(self, changes):
+        self.events.append(("contacts", changes))
+
+    def on_contact_presence_changed(self, contact):
+        self.events.append(("presence", contact))
+
+    def on_contact_display_name_changed(self, contact):
+        self.events.append(("display-name", contact))
+
+
+class ContactEventsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = papyon.Client(("127.0.0.1", 1863))
+        self.handler = ContactEvents(self.client)
+        self.alice = Contact("1", NetworkID.MSN, "alice@hotmail.com", "Alice")
+        self.bob = Contact("2", NetworkID.MSN, "bob@hotmail.com", "Bob")
+        for contact in (self.alice, self.bob):
+            self.client._Client__connect_contact_signals(contact)
+
+    def change(self):
+        self.alice._server_property_changed("presence", Presence.ONLINE)
+        self.alice._server_property_changed("display-name", "Alice 2")
+        self.alice._server_property_changed("presence", Presence.BUSY)
+        self.bob._server_property_changed("presence", Presence.AWAY)
+
+    def iterate(self):
+        reactor.timeout_add(50, reactor.quit)
+        reactor.run()
+
+    def testCoalesced(self):
+        self.change()
+        self.assertEqual([], self.handler.events)
+        self.iterate()
+        self.assertEqual([("contacts", {
+            self.alice: set(["presence", "display-name"]),
+            self.bob: set(["presence"])})], self.handler.events)
+        self.iterate()
+        self.assertEqual(1, len(self.handler.events))
+
+    def testPropertyEvents(self):
+        self.client.contact_property_events = True
+        self.change()
+        self.assertEqual([("presence", self.alice),
+            ("display-name", self.alice), ("presence", self.alice),
+            ("presence", self.bob)], self.handler.events)
+        self.iterate()
+        self.assertEqual("contacts", self.handler.events[-1][0])
+        self.assertEqual(5, len(self.handler.events))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+import socket
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, "")
+
+from papyon.gnet import reactor
+from papyon.transport import DirectConnection, ServerType
+
+PAYLOAD = "x" * 300
+
+def serve(server):
+    conn, address = server.accept()
+    while conn.recv(65536):
+        pass
+    conn.close()
+
+
+class DirectConnectionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = socket.socket()
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen(1)
+        thread = threading.Thread(target=serve, args=(self.server,))
+        thread.setDaemon(True)
+        thread.start()
+        self.connection = DirectConnection(self.server.getsockname(),
+                ServerType.NOTIFICATION)
+        self.writes = []
+        self.sent = 0
+
+    def tearDown(self):
+        self.connection.lose_connection()
+        self.server.close()
+
+    def on_sent(self):
+        self.sent += 1
+        if self.sent == 21:
+            reactor.quit()
+
+    def testBackpressure(self):
+        transport = self.connection._transport
+        transport.low_watermark = 500
+        transport.high_watermark = 2000
+        send = transport.send
+        def record(data, callback=None, errback=None):
+            self.writes.append(len(data))
+            send(data, callback, errback)
+        transport.send = record
+
+        def on_success(connection):
+            # congests the transport, the next commands are held back
+            connection.send_command_ex("UUX", (), "y" * 5000,
+                    callback=(self.on_sent,))
+            connection.flush()
+            self.assertFalse(transport.writable)
+            for i in range(20):
+                connection.send_command_ex("UUX", (), PAYLOAD,
+                        callback=(self.on_sent,))
+        self.connection.connect("connection-success", on_success)
+        self.connection.establish_connection()
+        timeout = reactor.timeout_add_seconds(5, reactor.quit)
+        reactor.run()
+        reactor.source_remove(timeout)
+
+        self.assertEqual(21, self.sent)
+        # the 6kB held back were released in several writes, none of them
+        # going far over the high watermark
+        self.assertTrue(len(self.writes) >= 4, self.writes)
+        for size in self.writes[1:]:
+            self.assertTrue(size < 2000 + len(PAYLOAD) + 20, self.writes)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+import BaseHTTPServer
+import SocketServer
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, "")
+
+from papyon.gnet import reactor
+from papyon.gnet.errors import HTTPTimeout
+from papyon.gnet.protocol.HTTP import HTTP
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Answers with the resource name as body, /slow after a while and
+    /moved with a redirection to itself the first time"""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        self.server.connections += 1
+
+    def do_GET(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        self.server.requests.append(self.path)
+        if self.path == "/slow":
+            time.sleep(0.5)
+        if self.path == "/moved" and not self.server.moved:
+            self.server.moved = True
+            self.send_response(302)
+            self.send_header("Location", "http://%s:%d/moved" %
+                    self.server.server_address)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = self.path[1:]
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_GET
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ("127.0.0.1", 0), Handler)
+        self.connections = 0
+        self.requests = []
+        self.moved = False
+
+    def handle_error(self, request, client_address):
+        # the client closes the connections it gave up on
+        pass
+
+
+class HTTPTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = Server()
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.setDaemon(True)
+        thread.start()
+        host, port = self.server.server_address
+        self.http = HTTP(host, port)
+        self.http.connect("request-sent", lambda http, request:
+                self.events.append(("sent", request.resource)))
+        self.http.connect("response-received", lambda http, response:
+                self.on_event(("response", response.body)))
+        self.http.connect("error", lambda http, error:
+                self.on_event(("error", error)))
+        self.events = []
+
+    def tearDown(self):
+        self.http.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def on_event(self, event):
+        self.events.append(event)
+        self.done -= 1
+        if self.done == 0:
+            reactor.quit()
+
+    def run_until(self, done):
+        self.done = done
+        timeout = reactor.timeout_add_seconds(5, reactor.quit)
+        reactor.run()
+        reactor.source_remove(timeout)
+
+    def testPipelined(self):
+        self.http.pipelining = True
+        for resource in ("/a", "/b", "/c"):
+            self.http.request(resource)
+        self.run_until(3)
+        # written at once, answered in order on a single connection
+        self.assertEqual([("sent", "/a"), ("sent", "/b"), ("sent", "/c"),
+            ("response", "a"), ("response", "b"), ("response", "c")],
+            self.events)
+        self.assertEqual(1, self.server.connections)
+
+    def testNotIdempotent(self):
+        self.http.pipelining = True
+        self.http.request("/a")
+        self.http.request("/b", method="POST")
+        self.http.request("/c")
+        self.run_until(3)
+        # the POST waits for the GET before it and holds back the next one
+        self.assertEqual([("sent", "/a"), ("response", "a"),
+            ("sent", "/b"), ("response", "b"),
+            ("sent", "/c"), ("response", "c")], self.events)
+        self.assertEqual(1, self.server.connections)
+
+    def testQueuedTimeout(self):
+        self.http.request("/slow", timeout=5)
+        self.http.request("/b", timeout=0.2)
+        self.run_until(2)
+        # the queued request fails alone, the connection is kept
+        self.assertEqual("error", self.events[1][0])
+        self.assertTrue(isinstance(self.events[1][1], HTTPTimeout))
+        self.assertEqual("/b", self.events[1][1].request.resource)
+        self.assertEqual(("response", "slow"), self.events[2])
+        self.assertEqual(["/slow"], self.server.requests)
+        self.assertEqual(1, self.server.connections)
+
+    def testInFlightTimeout(self):
+        self.http.pipelining = True
+        self.http.request("/slow", timeout=0.2)
+        self.http.request("/b", timeout=5)
+        self.run_until(2)
+        # its response would be taken for the next one, the next request
+        # is sent again on a new connection
+        events = [event for event in self.events if event[0] != "sent"]
+        self.assertEqual("error", events[0][0])
+        self.assertTrue(isinstance(events[0][1], HTTPTimeout))
+        self.assertEqual("/slow", events[0][1].request.resource)
+        self.assertEqual(("response", "b"), events[1])
+        self.assertEqual(2, self.server.connections)
+        self.assertEqual("/b", self.server.requests[-1])
+
+    def testRedirectWhilePipelined(self):
+        self.http.pipelining = True
+        self.http.request("/moved")
+        self.http.request("/b")
+        self.run_until(2)
+        # the requests written after the redirected one are sent again
+        self.assertEqual([("sent", "/moved"), ("sent", "/b")],
+                self.events[:2])
+        events = [event for event in self.events if event[0] != "sent"]
+        self.assertEqual([("response", "moved"), ("response", "b")], events)
+        self.assertEqual(2, self.server.connections)
+        self.assertEqual(["/moved", "/b"], self.server.requests[-2:])
+
+
+if __name__ == "__main__":
+    unittest.main()
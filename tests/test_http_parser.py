@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+import gzip
+import sys
+import unittest
+
+sys.path.insert(0, "")
+
+import gobject
+
+from papyon.gnet.constants import IoStatus
+from papyon.gnet.parser import HTTPParser
+import papyon.util.string_io as StringIO
+
+class FakeTransport(gobject.GObject):
+    __gsignals__ = {
+            "received": (gobject.SIGNAL_RUN_FIRST,
+                gobject.TYPE_NONE,
+                (object, gobject.TYPE_ULONG)),
+            }
+
+    def __init__(self):
+        gobject.GObject.__init__(self)
+        self.status = IoStatus.CLOSED
+
+    def get_property(self, name):
+        return self.status
+
+    def set_status(self, status):
+        self.status = status
+        self.notify("status")
+
+    def feed(self, data, size=7):
+        for i in range(0, len(data), size):
+            self.emit("received", data[i:i + size], size)
+
+def gzip_data(data):
+    stream = StringIO.StringIO()
+    zipper = gzip.GzipFile(fileobj=stream, mode="wb")
+    zipper.write(data)
+    zipper.close()
+    return stream.getvalue()
+
+def chunk_data(data, size=100):
+    chunks = ["%x\r\n%s\r\n" % (len(data[i:i + size]), data[i:i + size])
+            for i in range(0, len(data), size)]
+    return "".join(chunks) + "0\r\n\r\n"
+
+class HTTPParserTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = FakeTransport()
+        self.parser = HTTPParser(self.transport)
+        self.responses = []
+        self.parser.connect("received",
+                lambda parser, response: self.responses.append(response))
+        self.transport.set_status(IoStatus.OPEN)
+
+    def testContentLength(self):
+        self.transport.feed("HTTP/1.1 200 OK\r\nContent-Length: 5\r\n\r\n"
+                "helloHTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+        self.assertEqual([(r.status, r.body) for r in self.responses],
+                [(200, "hello"), (404, "")])
+
+    def testChunkedGzip(self):
+        body = "<Contact/>" * 500
+        self.transport.feed("HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n"
+                "Content-Encoding: gzip\r\n\r\n" + chunk_data(gzip_data(body)))
+        self.assertEqual(len(self.responses), 1)
+        self.assertEqual(self.responses[0].decode_body(), body)
+
+    def testContinue(self):
+        self.transport.feed("HTTP/1.1 100 Continue\r\n\r\n"
+                "HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+        self.assertEqual([r.status for r in self.responses], [100, 200])
+
+    def testConsumer(self):
+        chunks = []
+        self.parser.body_consumer = lambda response: chunks.append
+        self.transport.feed("HTTP/1.0 200 OK\r\n\r\nhello world", 5)
+        self.assertEqual(self.responses, [])
+        self.transport.set_status(IoStatus.CLOSING)
+        self.assertEqual("".join(chunks), "hello world")
+        self.assertEqual(self.responses[0].body, "")
+
+    def testNoBody(self):
+        methods = ["HEAD", "GET"]
+        self.parser.request_method = lambda response: methods.pop(0)
+        self.transport.feed("HTTP/1.1 200 OK\r\nContent-Length: 5\r\n\r\n"
+                "HTTP/1.1 304 Not Modified\r\nContent-Length: 5\r\n\r\n"
+                "HTTP/1.1 204 No Content\r\nTransfer-Encoding: chunked\r\n"
+                "\r\nHTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+        self.assertEqual([(r.status, r.body) for r in self.responses],
+                [(200, ""), (304, ""), (204, ""), (200, "ok")])
+
+if __name__ == "__main__":
+    unittest.main()
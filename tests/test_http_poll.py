@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+import BaseHTTPServer
+import SocketServer
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, "")
+
+from papyon import msnp
+from papyon.gnet import reactor
+from papyon.transport import HTTPPollConnection
+
+PAYLOAD = "MIME-Version: 1.0\r\nContent-Type: text/plain\r\n\r\nhello"
+REPLY = "CHL 0 12345\r\nMSG Hotmail Hotmail %d\r\n%s" % \
+        (len(PAYLOAD), PAYLOAD)
+
+class GatewayHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Answers the first request with the reply of the server, a challenge
+    and a message by default, and the polls with nothing"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests.append((time.time(), self.path, body))
+        if len(self.server.requests) == 1:
+            response = self.server.reply
+        else:
+            response = ""
+        self.send_response(200)
+        self.send_header("X-MSN-Messenger", "SessionID=42")
+        self.send_header("Content-Type", "application/x-msn-messenger")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *args):
+        pass
+
+
+class GatewayServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ("127.0.0.1", 0),
+                GatewayHandler)
+        self.requests = []
+        self.reply = REPLY
+
+
+class HTTPPollConnectionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = GatewayServer()
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.setDaemon(True)
+        thread.start()
+        self.transport = HTTPPollConnection(("127.0.0.1", 1863))
+        self.transport.POLL_MIN_INTERVAL = 0.05
+        self.transport.POLL_MAX_INTERVAL = 0.4
+        self.transport.change_gateway(self.server.server_address)
+        self.transport.connect("command-received", self.on_command)
+        self.received = []
+
+    def tearDown(self):
+        self.transport.lose_connection()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def on_command(self, transport, command):
+        self.received.append(command)
+
+    def command(self, name, *arguments):
+        command = msnp.Command()
+        command.build(name, self.transport.transaction_id, None, *arguments)
+        return command
+
+    def testBatchedCommands(self):
+        self.transport.establish_connection()
+        self.transport.send_command(self.command("VER", "MSNP18", "CVR0"))
+        self.transport.send_command(self.command("CVR", "0x0409"))
+        self.transport.send_command(self.command("USR", "SSO", "I", "a@b.c"))
+        reactor.timeout_add(1500, reactor.quit)
+        reactor.run()
+
+        requests = self.server.requests
+        start, path, body = requests[0]
+        self.assertTrue("Action=open" in path)
+        self.assertEqual(3, body.count("\r\n"))
+        self.assertEqual(["CHL", "MSG"], [cmd.name for cmd in self.received])
+        self.assertEqual(PAYLOAD, self.received[1].payload)
+        # the polls back off once the gateway has nothing to send
+        self.assertTrue("Action=poll&SessionID=42" in requests[1][1])
+        intervals = [requests[i + 1][0] - requests[i][0]
+                for i in range(1, len(requests) - 1)]
+        self.assertTrue(intervals[0] < 0.2)
+        self.assertTrue(intervals[-1] > intervals[0] * 2)
+
+    def testIncrementalParsing(self):
+        receive = self.transport._HTTPPollConnection__on_body_received
+        for i in range(0, len(REPLY), 3):
+            receive(REPLY[i:i + 3])
+        self.assertEqual(["CHL", "MSG"], [cmd.name for cmd in self.received])
+        self.assertEqual(PAYLOAD, self.received[1].payload)
+
+    def testPollBroughtForward(self):
+        self.transport.establish_connection()
+        # a poll is pending with the backed off interval
+        self.transport._poll_interval = self.transport.POLL_MAX_INTERVAL
+        self.transport._schedule_poll()
+        self.transport.send_command(self.command("VER", "MSNP18", "CVR0"))
+        reactor.timeout_add(300, reactor.quit)
+        reactor.run()
+
+        requests = self.server.requests
+        self.assertTrue(len(requests) >= 2, requests)
+        self.assertTrue(requests[1][0] - requests[0][0] < 0.2)
+
+    def testInvalidCommand(self):
+        failures = []
+        self.transport.connect("connection-failure",
+                lambda transport, error: failures.append(error))
+        self.server.reply = "X\r\nY\r\n"
+        self.transport.establish_connection()
+        reactor.timeout_add(500, reactor.quit)
+        reactor.run()
+        self.assertEqual(1, len(failures))
+        # the dead session isn't polled anymore
+        self.assertEqual(1, len(self.server.requests))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+import sys
+import unittest
+
+sys.path.insert(0, "")
+
+from papyon.gnet import reactor
+from papyon.gnet.errors import IoError
+from papyon.gnet.protocol import HTTPConnectionPool
+from papyon.service import description
+from papyon.service.AddressBook.sharing import Sharing
+from papyon.service.SOAPScheduler import SOAPScheduler
+from papyon.service.errors import SOAPServiceClosedError
+from papyon.util.async import run
+
+class FakeSingleSignOn(object):
+    account = "test@example.com"
+
+    def __init__(self, pool, scheduler):
+        self.http_pool = pool
+        self.scheduler = scheduler
+
+    def RequestMultipleSecurityTokens(self, callback, errback, *services):
+        run(callback, dict((service, "t=token&p=") for service in services))
+
+
+class HTTPConnectionPoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = HTTPConnectionPool(max_connections=1)
+        self.acquired = []
+        self.errors = []
+
+    def tearDown(self):
+        self.pool.close()
+
+    def acquire(self, host="example.com"):
+        self.pool.acquire("http", host, 80, (self.acquired.append,),
+                (self.errors.append,))
+
+    def testReuse(self):
+        self.acquire()
+        self.pool.release(self.acquired[0])
+        self.acquire()
+        self.assertTrue(self.acquired[0] is self.acquired[1])
+        self.assertEqual(1, self.pool.opened)
+        self.assertEqual(1, self.pool.reused)
+
+    def testMaxConnections(self):
+        self.acquire()
+        self.acquire()
+        self.acquire("other.example.com")
+        # the second user waits, the other host has its own connections
+        self.assertEqual(2, len(self.acquired))
+        self.assertEqual("other.example.com", self.acquired[1].host)
+        self.pool.release(self.acquired[0])
+        self.assertEqual(3, len(self.acquired))
+        self.assertTrue(self.acquired[0] is self.acquired[2])
+        self.assertEqual(1, self.pool.reused)
+
+    def testUnhealthy(self):
+        self.acquire()
+        self.acquire()
+        self.acquired[0]._errored = True
+        self.pool.release(self.acquired[0])
+        # the waiter got a new connection, which isn't counted as reused
+        self.assertEqual(2, len(self.acquired))
+        self.assertFalse(self.acquired[0] is self.acquired[1])
+        self.assertEqual(2, self.pool.opened)
+        self.assertEqual(0, self.pool.reused)
+
+    def testIdleTimeout(self):
+        self.pool = HTTPConnectionPool(idle_timeout=1)
+        self.acquire()
+        self.pool.release(self.acquired[0])
+        reactor.timeout_add(1200, reactor.quit)
+        reactor.run()
+        self.acquire()
+        self.assertFalse(self.acquired[0] is self.acquired[1])
+        self.assertEqual(2, self.pool.opened)
+
+    def testClose(self):
+        self.acquire()
+        self.pool.release(self.acquired[0])
+        self.pool.close()
+        self.assertEqual({}, self.pool._idle_sources)
+        # the pool is still usable afterwards
+        self.acquire()
+        self.assertFalse(self.acquired[0] is self.acquired[1])
+
+    def testCloseFailsWaiters(self):
+        self.acquire()
+        self.acquire()
+        self.assertEqual(1, len(self.acquired))
+        self.pool.close()
+        self.assertEqual(1, len(self.errors))
+        self.assertEqual(IoError.CONNECTION_CLOSED, int(self.errors[0]))
+
+
+class SOAPServiceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.url = description.Sharing.url
+        description.Sharing.url = "http://127.0.0.1:1/abservice/" \
+                "SharingService.asmx"
+        self.pool = HTTPConnectionPool(max_connections=1)
+        self.scheduler = SOAPScheduler()
+        self.sharing = Sharing(FakeSingleSignOn(self.pool, self.scheduler))
+        self.results = []
+
+    def tearDown(self):
+        description.Sharing.url = self.url
+        self.pool.close()
+
+    def on_result(self, result):
+        self.results.append(result)
+
+    def testCloseReleasesSlot(self):
+        # the only connection is taken, the request waits for it
+        self.pool.acquire("http", "127.0.0.1", 1,
+                (lambda connection: None,))
+        self.sharing.AddMember((self.on_result, True), (self.on_result,),
+                "Timer", "Allow", "Passport", "Accepted", "a@example.com")
+        self.sharing._member_batcher.flush()
+        self.assertEqual(1, self.scheduler.active)
+        self.pool.close()
+        self.assertEqual(1, len(self.results))
+        self.assertTrue(isinstance(self.results[0], SOAPServiceClosedError))
+        self.assertEqual(0, self.scheduler.active)
+
+    def testCloseCancelsRequest(self):
+        self.sharing.AddMember((self.on_result, True), (self.on_result,),
+                "Timer", "Allow", "Passport", "Accepted", "a@example.com")
+        self.sharing._member_batcher.flush()
+        connection, = self.pool._connections.values()[0]
+        self.assertEqual(1, connection.pending)
+        self.pool.close()
+        # the request failed right away, not when its timeout expires
+        self.assertEqual(0, connection.pending)
+        self.assertEqual(1, len(self.results))
+        self.assertTrue(isinstance(self.results[0], SOAPServiceClosedError))
+        self.assertEqual(0, self.scheduler.active)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -81,6 +81,11 @@ class MSNObjectClientEvents(TestClientEvents):
     def on_profile_msn_object_changed(self):
         self.on_contact_msn_object_changed(self._client.profile)
 
+    def on_contacts_changed(self, changes):
+        for contact, names in changes.iteritems():
+            if "msn-object" in names:
+                self.on_contact_msn_object_changed(contact)
+
     def on_contact_msn_object_changed(self, contact):
         if self._client.options.auto:
             self._client.msn_object_store.request(contact.msn_object, None,
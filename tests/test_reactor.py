@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, "")
+
+from papyon.gnet.reactor import EpollReactor
+
+THREADS = 8
+IDLES = 500
+
+class EpollReactorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.reactor = EpollReactor()
+        self.calls = []
+
+    def call(self, name, again=False):
+        self.calls.append(name)
+        return again
+
+    def testTimeoutRemoved(self):
+        sources = [self.reactor.timeout_add(1000, self.call, i)
+                for i in range(10)]
+        for source in sources[:-1]:
+            self.assertTrue(self.reactor.source_remove(source))
+        self.assertEqual(1, len(self.reactor._timeout_heap))
+        self.assertFalse(self.reactor.source_remove(sources[0]))
+
+    def testTimeoutRemovedByItself(self):
+        sources = []
+        def remove():
+            self.calls.append("removed")
+            self.reactor.source_remove(sources[0])
+            return True
+        sources.append(self.reactor.timeout_add(0, remove))
+        self.reactor.timeout_add(0, self.call, "quit")
+        self.reactor.iteration()
+        self.reactor.iteration(False)
+        self.assertEqual(["removed", "quit"], self.calls)
+        self.assertEqual([], self.reactor._timeout_heap)
+
+    def testRepeatedTimeout(self):
+        count = [0]
+        def repeat():
+            count[0] += 1
+            return count[0] < 3
+        self.reactor.timeout_add(0, repeat)
+        for i in range(5):
+            self.reactor.iteration(False)
+        self.assertEqual(3, count[0])
+        self.assertEqual([], self.reactor._timeout_heap)
+
+    def testIdleFromThreads(self):
+        ids = []
+        def post():
+            for i in range(IDLES):
+                ids.append(self.reactor.idle_add(self.call, i))
+        def start():
+            for thread in threads:
+                thread.start()
+            return False
+        def check():
+            if len(self.calls) < THREADS * IDLES:
+                return True
+            self.reactor.quit()
+            return False
+        threads = [threading.Thread(target=post) for i in range(THREADS)]
+        self.reactor.idle_add(start)
+        self.reactor.timeout_add(10, check)
+        self.reactor.timeout_add(5000, self.reactor.quit)
+        self.reactor.run()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(THREADS * IDLES, len(set(ids)))
+        self.assertEqual(THREADS * IDLES, len(self.calls))
+
+
+if __name__ == "__main__":
+    unittest.main()
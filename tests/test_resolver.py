@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+import gobject
+import socket
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, "")
+
+from papyon.gnet.resolver import *
+from papyon.gnet.resolver import HostnameError
+
+class StubLookup(object):
+    """Answers lookups from a static table, blocking until released"""
+
+    def __init__(self, hosts):
+        self.hosts = hosts
+        self.queries = []
+        self.released = threading.Event()
+        self.released.set()
+
+    def __call__(self, host, port, family, type):
+        self.queries.append(host)
+        self.released.wait()
+        if host not in self.hosts:
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        return [(family, type, 6, host, (self.hosts[host], 0))]
+
+
+class HostnameResolverTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.lookup = StubLookup({"messenger.hotmail.com": "65.54.239.80",
+                                  "contacts.msn.com": "65.55.46.22"})
+        self.cache = HostnameCache(size=2, ttl=60, negative_ttl=60)
+        self.pool = HostnameResolverPool(2, self.cache, self.lookup)
+        self.resolver = HostnameResolver(self.pool)
+        self.mainloop = gobject.MainLoop()
+        self.results = []
+
+    def query(self, host, count=1):
+        for i in range(count):
+            self.resolver.query(host, (self.on_resolved,), (self.on_failed,))
+
+    def run_until(self, count):
+        self.expected = count
+        self.timeout = gobject.timeout_add_seconds(5, self.mainloop.quit)
+        self.mainloop.run()
+        gobject.source_remove(self.timeout)
+
+    def on_resolved(self, response):
+        self.results.append(response.answer[0][1])
+        if len(self.results) == self.expected:
+            self.mainloop.quit()
+
+    def on_failed(self, error):
+        self.results.append(error)
+        if len(self.results) == self.expected:
+            self.mainloop.quit()
+
+    def testResolve(self):
+        self.query("messenger.hotmail.com")
+        self.run_until(1)
+        self.assertEqual(self.results, ["65.54.239.80"])
+
+    def testCached(self):
+        self.query("messenger.hotmail.com")
+        self.run_until(1)
+        self.query("messenger.hotmail.com")
+        self.run_until(2)
+        self.assertEqual(self.results, ["65.54.239.80"] * 2)
+        self.assertEqual(self.lookup.queries, ["messenger.hotmail.com"])
+
+    def testCoalesced(self):
+        self.lookup.released.clear()
+        self.query("contacts.msn.com", 3)
+        self.lookup.released.set()
+        self.run_until(3)
+        self.assertEqual(self.results, ["65.55.46.22"] * 3)
+        self.assertEqual(self.lookup.queries, ["contacts.msn.com"])
+
+    def testNegativeCache(self):
+        self.query("www.abcdeg.hij")
+        self.run_until(1)
+        self.query("www.abcdeg.hij")
+        self.run_until(2)
+        self.assertTrue(isinstance(self.results[0], HostnameError))
+        self.assertTrue(isinstance(self.results[1], HostnameError))
+        self.assertEqual(self.lookup.queries, ["www.abcdeg.hij"])
+
+    def testEviction(self):
+        for host in ("messenger.hotmail.com", "contacts.msn.com",
+                "www.abcdeg.hij"):
+            self.query(host)
+            self.run_until(len(self.results) + 1)
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.get("messenger.hotmail.com"), None)
+
+
+if __name__ == "__main__":
+    unittest.main()
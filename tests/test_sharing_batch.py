@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+import BaseHTTPServer
+import re
+import SocketServer
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, "")
+
+from papyon.gnet import reactor
+from papyon.gnet.protocol import HTTPConnectionPool
+from papyon.service import description
+from papyon.service.AddressBook.constants import AddressBookError
+from papyon.service.AddressBook.sharing import Sharing
+from papyon.service.errors import SOAPServiceClosedError
+from papyon.util.async import run
+
+RESPONSE = """<?xml version="1.0" encoding="utf-8"?>\
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">\
+<soap:Body><AddMemberResponse \
+xmlns="http://www.msn.com/webservices/AddressBook" /></soap:Body>\
+</soap:Envelope>"""
+
+FAULT = """<?xml version="1.0" encoding="utf-8"?>\
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">\
+<soap:Body><soap:Fault><faultcode>soap:Client</faultcode>\
+<faultstring>%(code)s</faultstring><detail>\
+<errorcode xmlns="http://www.msn.com/webservices/AddressBook">%(code)s\
+</errorcode></detail></soap:Fault></soap:Body></soap:Envelope>"""
+
+class SharingHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Answers AddMember requests, with a fault if one of the members is
+    invalid or already exists"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        accounts = re.findall("<PassportName>(.*?)</PassportName>", body)
+        self.server.requests.append(accounts)
+        status, response = 200, RESPONSE
+        for account in accounts:
+            if account.startswith("invalid"):
+                status, response = 500, FAULT % {'code': 'InvalidPassportUser'}
+            elif account.startswith("existing"):
+                status, response = 500, FAULT % {'code': 'MemberAlreadyExists'}
+        self.send_response(status)
+        self.send_header("Content-Type", "text/xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *args):
+        pass
+
+
+class SharingServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ("127.0.0.1", 0),
+                SharingHandler)
+        self.requests = []
+
+
+class FakeSingleSignOn(object):
+    scheduler = None
+    account = "test@example.com"
+
+    def __init__(self):
+        self.http_pool = HTTPConnectionPool()
+
+    def RequestMultipleSecurityTokens(self, callback, errback, *services):
+        run(callback, dict((service, "t=token&p=") for service in services))
+
+
+class SharingBatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = SharingServer()
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.setDaemon(True)
+        thread.start()
+        self.url = description.Sharing.url
+        description.Sharing.url = "http://127.0.0.1:%d/abservice/" \
+                "SharingService.asmx" % self.server.server_address[1]
+        self.sharing = Sharing(FakeSingleSignOn())
+        self.results = {}
+
+    def tearDown(self):
+        description.Sharing.url = self.url
+        self.server.shutdown()
+        self.server.server_close()
+
+    def add_members(self, accounts):
+        for account in accounts:
+            self.sharing.AddMember((self.on_result, account, True),
+                    (self.on_error, account), "Timer", "Allow", "Passport",
+                    "Accepted", account)
+        timeout = reactor.timeout_add_seconds(5, reactor.quit)
+        reactor.run()
+        reactor.source_remove(timeout)
+
+    def on_result(self, account, result):
+        self.results[account] = result
+        if len(self.results) == 3:
+            reactor.quit()
+
+    def on_error(self, error, account):
+        self.on_result(account, error)
+
+    def testBatched(self):
+        accounts = ["a@example.com", "b@example.com", "c@example.com"]
+        self.add_members(accounts)
+        self.assertEqual([accounts], self.server.requests)
+        self.assertEqual(dict((account, True) for account in accounts),
+                self.results)
+
+    def testFaultSplitsBatch(self):
+        accounts = ["a@example.com", "invalid@example.com",
+                "existing@example.com"]
+        self.add_members(accounts)
+        # the batch failed and was then sent member by member
+        self.assertEqual(accounts, self.server.requests[0])
+        self.assertEqual(sorted([account] for account in accounts),
+                sorted(self.server.requests[1:]))
+        self.assertEqual(True, self.results["a@example.com"])
+        self.assertEqual(True, self.results["existing@example.com"])
+        self.assertEqual(AddressBookError.INVALID_CONTACT_ADDRESS,
+                int(self.results["invalid@example.com"]))
+
+    def testClose(self):
+        accounts = ["a@example.com", "b@example.com", "c@example.com"]
+        for account in accounts:
+            self.sharing.AddMember((self.on_result, account, True),
+                    (self.on_error, account), "Timer", "Allow", "Passport",
+                    "Accepted", account)
+        self.sharing.close()
+        # the batch waiting to be sent was failed instead
+        reactor.timeout_add(300, reactor.quit)
+        reactor.run()
+        self.assertEqual([], self.server.requests)
+        for account in accounts:
+            self.assertTrue(isinstance(self.results[account],
+                SOAPServiceClosedError))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+import sys
+import unittest
+
+sys.path.insert(0, "")
+
+from papyon.service.AddressBook.sharing import Sharing
+from papyon.service.SOAPService import SOAPResponse, SOAPResponseParser
+import papyon.service.description.Sharing.FindMembership as FindMembership
+
+MEMBERSHIP = """<Membership><MemberRole>%s</MemberRole><Members>\
+<Member xsi:type="PassportMember"><MembershipId>1</MembershipId>\
+<Type>Passport</Type><State>Accepted</State><Deleted>false</Deleted>\
+<PassportName>%s</PassportName></Member></Members></Membership>"""
+
+RESPONSE = """<?xml version="1.0" encoding="utf-8"?>\
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/" \
+xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"><soap:Body>\
+<FindMembershipResponse xmlns="http://www.msn.com/webservices/AddressBook">\
+<FindMembershipResult><Services>\
+<Service><Memberships>%s%s</Memberships>\
+<LastChange>2010-05-04T12:00:00-07:00</LastChange></Service>\
+<Service><Memberships>%s</Memberships>\
+<LastChange>2010-06-04T12:00:00-07:00</LastChange></Service>\
+</Services></FindMembershipResult></FindMembershipResponse>\
+</soap:Body></soap:Envelope>""" % (
+        MEMBERSHIP % ("Allow", "allowed@example.com"),
+        MEMBERSHIP % ("Reverse", "reverse@example.com"),
+        MEMBERSHIP % ("Block", "space@example.com"))
+
+class SOAPResponseParserTestCase(unittest.TestCase):
+
+    def parse(self, data, handlers, chunk_size=7):
+        parser = SOAPResponseParser(handlers)
+        for i in range(0, len(data), chunk_size):
+            parser.feed(data[i:i + chunk_size])
+        return parser.close()
+
+    def assertMemberships(self, result):
+        memberships, last_change = result
+        self.assertEqual("2010-05-04T12:00:00-07:00", last_change)
+        self.assertFalse(memberships['Block'])
+        for role, account in (("Allow", "allowed@example.com"),
+                              ("Reverse", "reverse@example.com")):
+            self.assertEqual(1, len(memberships[role]))
+            member = memberships[role][0]
+            if isinstance(member, tuple):
+                member, deleted = member
+                self.assertFalse(deleted)
+            else:
+                member = member.findtext("./ab:PassportName")
+            self.assertTrue(account in repr(member))
+
+    def test_document(self):
+        response = SOAPResponse(RESPONSE)
+        self.assertEqual(None, response.streamed)
+        self.assertMemberships(FindMembership.process_response(response))
+
+    def test_streamed(self):
+        response = self.parse(RESPONSE,
+                Sharing.STREAMED_ELEMENTS["FindMembership"])
+        self.assertMemberships(FindMembership.process_response(response))
+        # the streamed elements are not kept in the tree
+        self.assertEqual([], response.body.findall(".//ab:Member"))
+
+    def test_invalid(self):
+        parser = SOAPResponseParser()
+        parser.feed("<soap:Envelope><soap:Body>")
+        self.assertRaises(Exception, parser.close)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+import BaseHTTPServer
+import SocketServer
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, "")
+
+from papyon.gnet import reactor
+from papyon.gnet.errors import IoError
+from papyon.gnet.protocol import HTTPConnectionPool
+from papyon.service import description
+from papyon.service.AddressBook.sharing import Sharing
+from papyon.service.SOAPRetry import RetryPolicy
+from papyon.service.errors import SOAPCircuitOpenError
+from papyon.util.async import run
+
+RESPONSE = """<?xml version="1.0" encoding="utf-8"?>\
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">\
+<soap:Body><AddMemberResponse \
+xmlns="http://www.msn.com/webservices/AddressBook" /></soap:Body>\
+</soap:Envelope>"""
+
+FAULT = """<?xml version="1.0" encoding="utf-8"?>\
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">\
+<soap:Body><soap:Fault><faultcode>soap:Server</faultcode>\
+<faultstring>%(code)s</faultstring><detail>\
+<errorcode xmlns="http://www.msn.com/webservices/AddressBook">%(code)s\
+</errorcode></detail></soap:Fault></soap:Body></soap:Envelope>"""
+
+class FaultyHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """Answers with the queued failures first, then with a success"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests += 1
+        if self.server.failures:
+            status, response = self.server.failures.pop(0)
+        else:
+            status, response = 200, RESPONSE
+        self.send_response(status)
+        self.send_header("Content-Type", "text/xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *args):
+        pass
+
+
+class FaultyServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ("127.0.0.1", 0),
+                FaultyHandler)
+        self.requests = 0
+        self.failures = []
+
+
+class FakeSingleSignOn(object):
+    scheduler = None
+    account = "test@example.com"
+
+    def __init__(self):
+        self.http_pool = HTTPConnectionPool()
+
+    def RequestMultipleSecurityTokens(self, callback, errback, *services):
+        run(callback, dict((service, "t=token&p=") for service in services))
+
+
+class RetryPolicyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = RetryPolicy(base_delay=0.5, max_delay=1)
+
+    def testClassify(self):
+        self.assertEqual(True, self.policy.classify(status=503))
+        self.assertEqual(False, self.policy.classify(status=502))
+        self.assertEqual(None, self.policy.classify(status=200))
+        self.assertEqual(True, self.policy.classify(
+            IoError(IoError.CONNECTION_FAILED)))
+        self.assertEqual(False, self.policy.classify(
+            IoError(IoError.CONNECTION_TIMED_OUT)))
+
+    def testBackoff(self):
+        for attempts in range(1, 3):
+            delay = self.policy.next_delay(attempts)
+            self.assertTrue(0 <= delay <= 0.5 * 2 ** (attempts - 1))
+        self.assertEqual(None, self.policy.next_delay(3))
+
+    def testBudget(self):
+        while self.policy.budget > 0:
+            self.assertNotEqual(None, self.policy.next_delay(1))
+        self.assertEqual(None, self.policy.next_delay(1))
+        for i in range(5):
+            self.policy.sent("example.com")
+        self.assertNotEqual(None, self.policy.next_delay(1))
+
+    def testTrialExpires(self):
+        self.policy.BREAKER_THRESHOLD = 1
+        self.policy.BREAKER_COOLDOWN = 0.1
+        self.policy.failed("example.com")
+        self.assertTrue(isinstance(self.policy.check("example.com"),
+            SOAPCircuitOpenError))
+        time.sleep(0.1)
+        self.assertEqual(None, self.policy.check("example.com"))
+        # a single trial while it is pending
+        self.assertTrue(isinstance(self.policy.check("example.com"),
+            SOAPCircuitOpenError))
+        # it never came back, another one is let through
+        time.sleep(0.1)
+        self.assertEqual(None, self.policy.check("example.com"))
+        self.assertTrue(isinstance(self.policy.check("example.com"),
+            SOAPCircuitOpenError))
+        self.policy.succeeded("example.com")
+        self.assertEqual(None, self.policy.check("example.com"))
+
+
+class SOAPRetryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FaultyServer()
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.setDaemon(True)
+        thread.start()
+        self.url = description.Sharing.url
+        description.Sharing.url = "http://127.0.0.1:%d/abservice/" \
+                "SharingService.asmx" % self.server.server_address[1]
+        self.sharing = Sharing(FakeSingleSignOn())
+        self.sharing.retry_policy = RetryPolicy(base_delay=0.05)
+        self.results = []
+
+    def tearDown(self):
+        description.Sharing.url = self.url
+        self.server.shutdown()
+        self.server.server_close()
+
+    def add_member(self):
+        self.sharing.AddMember((self.on_result, True), (self.on_result,),
+                "Timer", "Allow", "Passport", "Accepted", "a@example.com")
+        timeout = reactor.timeout_add_seconds(5, reactor.quit)
+        reactor.run()
+        reactor.source_remove(timeout)
+        return self.results.pop()
+
+    def on_result(self, result):
+        self.results.append(result)
+        reactor.quit()
+
+    def testServiceUnavailable(self):
+        self.server.failures = [(503, "Service Unavailable"),
+                (500, FAULT % {'code': 'ServiceUnavailable'})]
+        self.assertEqual(True, self.add_member())
+        self.assertEqual(3, self.server.requests)
+
+    def testAttemptsExhausted(self):
+        self.server.failures = [(503, "Service Unavailable")] * 3
+        error = self.add_member()
+        self.assertEqual(3, error.attempts)
+        self.assertEqual(3, self.server.requests)
+
+    def testAmbiguousFailure(self):
+        # AddMember is not idempotent, it may have been processed
+        self.server.failures = [(502, "Bad Gateway")]
+        error = self.add_member()
+        self.assertEqual(1, error.attempts)
+        self.assertEqual(1, self.server.requests)
+
+    def testCircuitBreaker(self):
+        self.sharing.retry_policy = RetryPolicy(max_attempts=1)
+        self.sharing.retry_policy.BREAKER_THRESHOLD = 2
+        self.server.failures = [(503, "Service Unavailable")] * 2
+        self.add_member()
+        self.add_member()
+        self.assertTrue(isinstance(self.add_member(), SOAPCircuitOpenError))
+        self.assertEqual(2, self.server.requests)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+import sys
+import unittest
+
+sys.path.insert(0, "")
+
+from papyon.service.SOAPScheduler import Priority, SOAPScheduler
+
+class SOAPSchedulerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = SOAPScheduler(max_requests=2,
+                max_requests_per_service=1)
+        self.sent = []
+
+    def acquire(self, name, service, account, priority=Priority.NORMAL):
+        self.scheduler.acquire(service, account, priority,
+                (self.sent.append, name))
+
+    def testLimits(self):
+        self.acquire("ab1", "AB", "a")
+        self.acquire("ab2", "AB", "a")
+        self.acquire("rsi1", "RSI", "a")
+        self.acquire("oim1", "OIM", "a")
+        # one AB request at a time, two requests at most
+        self.assertEqual(["ab1", "rsi1"], self.sent)
+        self.assertEqual(2, self.scheduler.queue_length)
+        self.scheduler.release("RSI")
+        self.assertEqual(["ab1", "rsi1", "oim1"], self.sent)
+        self.scheduler.release("AB")
+        self.assertEqual(["ab1", "rsi1", "oim1", "ab2"], self.sent)
+        self.assertEqual(0, self.scheduler.queue_length)
+        self.assertEqual(2, self.scheduler.active)
+
+    def testPriorities(self):
+        self.acquire("spaces1", "Spaces", "a")
+        self.acquire("rsi1", "RSI", "a")
+        self.acquire("spaces2", "Spaces", "a", Priority.LOW)
+        self.acquire("rsi2", "RSI", "a", Priority.NORMAL)
+        self.acquire("sso", "SingleSignOn", "a", Priority.HIGH)
+        self.scheduler.release("Spaces")
+        self.scheduler.release("RSI")
+        self.scheduler.release("SingleSignOn")
+        self.assertEqual(["spaces1", "rsi1", "sso", "rsi2", "spaces2"],
+                self.sent)
+
+    def testFairQueuing(self):
+        self.acquire("busy1", "OIM", "c")
+        self.acquire("busy2", "Spaces", "c")
+        for i in range(3):
+            self.acquire("a%d" % i, "RSI", "a")
+        self.acquire("b0", "RSI", "b")
+        self.acquire("b1", "RSI", "b")
+        snapshot = self.scheduler.snapshot()
+        self.assertEqual({"a": 3, "b": 2}, snapshot['queued_by_account'])
+        self.assertEqual({"RSI": 5}, snapshot['queued_by_service'])
+        self.assertEqual(5, snapshot['peak_queue_length'])
+        self.scheduler.release("OIM")
+        for i in range(4):
+            self.scheduler.release("RSI")
+        # the accounts take turns
+        self.assertEqual(["a0", "b0", "a1", "b1", "a2"], self.sent[2:])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+import socket
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, "")
+
+from papyon.gnet import reactor
+from papyon.gnet.constants import IoStatus
+from papyon.gnet.io.sock import SocketClient
+
+def serve(server, received):
+    conn, address = server.accept()
+    while True:
+        data = conn.recv(65536)
+        if not data:
+            break
+        received.append(data)
+    conn.close()
+
+
+class PartialSocket(object):
+    """Writes only a quarter of the data on the first send"""
+
+    def __init__(self, sock):
+        self._sock = sock
+        self.sends = []
+
+    def send(self, data):
+        size = len(data)
+        if not self.sends:
+            size = size // 4
+        self.sends.append(len(data))
+        return self._sock.send(data[:size])
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+
+class RacingClient(SocketClient):
+    """Connects to 127.0.0.1 then to 127.0.0.2 without resolving"""
+
+    def _open(self, host, port):
+        self._addresses = ["127.0.0.1", "127.0.0.2"]
+        self._connect_attempts = []
+        self._connect_source = None
+        self._GIOChannelClient__connect_next(port, True)
+
+
+class SocketClientTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = socket.socket()
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen(1)
+        self.received = []
+        self.thread = threading.Thread(target=serve,
+                args=(self.server, self.received))
+        self.thread.setDaemon(True)
+        self.thread.start()
+        host, port = self.server.getsockname()
+        self.client = SocketClient(host, port)
+        self.errors = []
+        self.client.connect("error",
+                lambda client, error: self.errors.append(error))
+
+    def tearDown(self):
+        self.client.close()
+        self.server.close()
+
+    def testPartialSend(self):
+        def on_status_changed(client, param):
+            if client.status != IoStatus.OPEN:
+                return
+            self.transport = client._transport = \
+                    PartialSocket(client._transport)
+            client.send("a" * 100)
+            client.send("b" * 100, (reactor.quit,))
+        self.client.connect("notify::status", on_status_changed)
+        self.client.open()
+        timeout = reactor.timeout_add_seconds(5, reactor.quit)
+        reactor.run()
+        reactor.source_remove(timeout)
+
+        # the rest of the first packet went along with the second one
+        self.assertEqual([200, 150], self.transport.sends)
+        self.assertEqual([], self.errors)
+        self.client.close()
+        self.thread.join(5)
+        self.assertEqual("a" * 100 + "b" * 100, "".join(self.received))
+
+
+class ConnectRaceTestCase(unittest.TestCase):
+
+    def testConnectTime(self):
+        # 127.0.0.1 never completes the handshake, its backlog being full,
+        # the attempt to 127.0.0.2 started CONNECT_DELAY later wins
+        stalled = socket.socket()
+        stalled.bind(("127.0.0.1", 0))
+        stalled.listen(0)
+        port = stalled.getsockname()[1]
+        backlog = []
+        for i in range(3):
+            sock = socket.socket()
+            sock.setblocking(False)
+            sock.connect_ex(("127.0.0.1", port))
+            backlog.append(sock)
+        server = socket.socket()
+        server.bind(("127.0.0.2", port))
+        server.listen(1)
+
+        client = RacingClient("127.0.0.1", port)
+        client.CONNECT_DELAY = 0.2
+        client.connect("notify::status", lambda client, param:
+                client.status == IoStatus.OPEN and reactor.quit())
+        client.open()
+        timeout = reactor.timeout_add_seconds(5, reactor.quit)
+        reactor.run()
+        reactor.source_remove(timeout)
+
+        self.assertEqual(IoStatus.OPEN, client.status)
+        self.assertEqual("127.0.0.2", client._transport.getpeername()[0])
+        self.assertTrue(client.stats.connect_time >= 0.2,
+                client.stats.connect_time)
+        client.close()
+        server.close()
+        stalled.close()
+        for sock in backlog:
+            sock.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+import BaseHTTPServer
+import select
+import socket
+import SocketServer
+import struct
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, "")
+
+from papyon.gnet import reactor
+from papyon.gnet.protocol import HTTPConnectionPool
+from papyon.gnet.proxy import ProxyInfos
+from papyon.gnet.proxy.SOCKS5 import SOCKS5Proxy
+
+class HelloHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "5")
+        self.end_headers()
+        self.wfile.write("hello")
+
+    def log_message(self, *args):
+        pass
+
+
+class SOCKS5Handler(SocketServer.BaseRequestHandler):
+    """Minimal SOCKS5 proxy with username/password authentication, records
+    for each handshake whether it was sent at once"""
+
+    def recv(self, size):
+        data = ""
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                raise IOError("closed")
+            data += chunk
+        return data
+
+    def handle(self):
+        version, count = struct.unpack("!BB", self.recv(2))
+        methods = self.recv(count)
+        readable = select.select([self.request], [], [], 0.2)[0]
+        self.server.handshakes.append(len(readable) > 0)
+        self.request.sendall(struct.pack("!BB", 5, 2))
+        version, length = struct.unpack("!BB", self.recv(2))
+        user = self.recv(length)
+        length, = struct.unpack("!B", self.recv(1))
+        password = self.recv(length)
+        self.request.sendall(struct.pack("!BB", 1, 0))
+
+        version, command, reserved, atyp = struct.unpack("!BBBB",
+                self.recv(4))
+        if atyp == 1:
+            host = socket.inet_ntoa(self.recv(4))
+        else:
+            host = self.recv(struct.unpack("!B", self.recv(1))[0])
+        port, = struct.unpack("!H", self.recv(2))
+        target = socket.create_connection((host, port))
+        self.request.sendall(struct.pack("!BBBB", 5, 0, 0, 1) +
+                socket.inet_aton("127.0.0.1") + struct.pack("!H", port))
+
+        sockets = [self.request, target]
+        while True:
+            for sock in select.select(sockets, [], [])[0]:
+                data = sock.recv(4096)
+                if not data:
+                    target.close()
+                    return
+                sockets[sock is self.request].sendall(data)
+
+
+class SOCKS5Server(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        SocketServer.TCPServer.__init__(self, ("127.0.0.1", 0), SOCKS5Handler)
+        self.handshakes = []
+
+
+def start(server):
+    thread = threading.Thread(target=server.serve_forever)
+    thread.setDaemon(True)
+    thread.start()
+
+
+class SOCKS5ProxyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.http_server = BaseHTTPServer.HTTPServer(("127.0.0.1", 0),
+                HelloHandler)
+        self.socks_server = SOCKS5Server()
+        start(self.http_server)
+        start(self.socks_server)
+        proxy = ProxyInfos("127.0.0.1", self.socks_server.server_address[1],
+                "socks5", "user", "password")
+        self.pool = HTTPConnectionPool({'http': proxy})
+        SOCKS5Proxy.clear_negotiations()
+        self.transports = []
+
+    def tearDown(self):
+        self.pool.close()
+        self.http_server.shutdown()
+        self.socks_server.shutdown()
+        self.http_server.server_close()
+        self.socks_server.server_close()
+
+    def get(self):
+        self.body = None
+        self.pool.acquire("http", "127.0.0.1",
+                self.http_server.server_address[1], (self.on_transport,))
+        timeout = reactor.timeout_add_seconds(5, reactor.quit)
+        reactor.run()
+        reactor.source_remove(timeout)
+        return self.body
+
+    def on_transport(self, transport):
+        self.transports.append(transport)
+        transport.connect("response-received", self.on_response)
+        transport.request("/", {})
+
+    def on_response(self, transport, response):
+        self.body = response.body
+        self.pool.release(transport)
+        reactor.quit()
+        return False
+
+    def testTunnelReused(self):
+        self.assertEqual("hello", self.get())
+        self.assertEqual("hello", self.get())
+        self.assertEqual(1, len(self.socks_server.handshakes))
+        self.assertEqual(1, self.pool.reused)
+        stats = self.transports[0]._transport.stats
+        self.assertTrue(stats.proxy_time is not None)
+
+    def testNegotiationCached(self):
+        self.assertEqual("hello", self.get())
+        self.pool.close()
+        self.assertEqual("hello", self.get())
+        # the second handshake was sent at once
+        self.assertEqual([False, True], self.socks_server.handshakes)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+
+import gobject
+import socket
+import sys
+import threading
+import unittest
+
+from OpenSSL import SSL, crypto
+
+sys.path.insert(0, "")
+
+from papyon.gnet.constants import IoStatus
+from papyon.gnet.io.ssl_socket import SSLContextCache
+from papyon.gnet.io.ssl_tcp import SSLTCPClient
+
+def make_certificate():
+    key = crypto.PKey()
+    key.generate_key(crypto.TYPE_RSA, 1024)
+    cert = crypto.X509()
+    cert.get_subject().CN = "localhost"
+    cert.set_serial_number(1)
+    cert.gmtime_adj_notBefore(0)
+    cert.gmtime_adj_notAfter(3600)
+    cert.set_issuer(cert.get_subject())
+    cert.set_pubkey(key)
+    cert.sign(key, "sha1")
+    return key, cert
+
+class SSLServer(threading.Thread):
+    """Accepts SSL connections and closes them after the handshake, with
+    a server side session cache so that sessions can be resumed"""
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.setDaemon(True)
+        key, cert = make_certificate()
+        self.context = SSL.Context(SSL.SSLv23_METHOD)
+        self.context.use_privatekey(key)
+        self.context.use_certificate(cert)
+        self.context.set_session_id("papyon-test")
+        self.socket = socket.socket()
+        self.socket.bind(("127.0.0.1", 0))
+        self.socket.listen(5)
+        self.port = self.socket.getsockname()[1]
+
+    def run(self):
+        while True:
+            sock, address = self.socket.accept()
+            connection = SSL.Connection(self.context, sock)
+            connection.set_accept_state()
+            try:
+                connection.do_handshake()
+                connection.recv(1024)
+            except SSL.Error:
+                pass
+            connection.close()
+
+
+class SSLSessionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = SSLServer()
+        self.server.start()
+        self.cache = SSLContextCache()
+        self.mainloop = gobject.MainLoop()
+
+    def connect(self):
+        client = SSLTCPClient("127.0.0.1", self.server.port, self.cache)
+        client.connect("notify::status", self.on_status_changed)
+        client.connect("error", lambda client, error: self.mainloop.quit())
+        client.open()
+        timeout = gobject.timeout_add_seconds(5, self.mainloop.quit)
+        self.mainloop.run()
+        gobject.source_remove(timeout)
+        client.close()
+
+    def on_status_changed(self, client, param):
+        if client.status == IoStatus.OPEN:
+            self.mainloop.quit()
+
+    def testSharedContext(self):
+        self.assertTrue(self.cache.get_context() is self.cache.get_context())
+
+    def testResumedHandshake(self):
+        self.connect()
+        self.assertEqual(self.cache.full_handshakes, 1)
+        self.assertEqual(self.cache.resumed_handshakes, 0)
+        self.connect()
+        self.assertEqual(self.cache.full_handshakes, 1)
+        self.assertEqual(self.cache.resumed_handshakes, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
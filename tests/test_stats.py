@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+# papyon - a python client library for Msn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+import gc
+import sys
+import unittest
+
+sys.path.insert(0, "")
+
+from papyon.gnet import reactor
+from papyon.gnet import stats
+
+class FakeClient(object):
+    host = "127.0.0.1"
+    port = 1863
+    status = 0
+
+    def __init__(self):
+        self.stats = stats.IoStats("NS")
+
+class IoStatsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.stats = stats.IoStats()
+
+    def testCounters(self):
+        self.stats.opening()
+        self.stats.opened()
+        self.stats.received(3, 100)
+        self.stats.sent(40)
+        self.stats.sent(0)
+        self.assertEqual(self.stats.reads, 3)
+        self.assertEqual(self.stats.bytes_received, 100)
+        self.assertEqual(self.stats.writes, 2)
+        self.assertEqual(self.stats.bytes_sent, 40)
+        self.assertTrue(self.stats.connect_time is not None)
+        self.assertTrue(self.stats.first_byte_time is not None)
+
+    def testWakeups(self):
+        self.stats.wakeup(reactor.IO_IN)
+        self.stats.wakeup(reactor.IO_IN | reactor.IO_OUT)
+        wakeups = self.stats.wakeups
+        self.assertEqual(wakeups['in'], 2)
+        self.assertEqual(wakeups['out'], 1)
+        self.assertEqual(wakeups['hup'], 0)
+
+    def testQueueDepth(self):
+        self.stats.queued(3)
+        self.stats.queued(1)
+        self.assertEqual(self.stats.queue_depth, 1)
+        self.assertEqual(self.stats.peak_queue_depth, 3)
+
+    def testReset(self):
+        self.stats.opening()
+        self.stats.opened()
+        self.stats.received(1, 10)
+        self.stats.queued(2)
+        self.stats.reset()
+        self.assertEqual(self.stats.bytes_received, 0)
+        self.assertEqual(self.stats.peak_queue_depth, 0)
+        self.assertTrue(self.stats.connect_time is not None)
+
+class RegistryTestCase(unittest.TestCase):
+
+    def testSnapshot(self):
+        client = FakeClient()
+        stats.register(client)
+        client.stats.sent(10)
+        entries = [entry for entry in stats.snapshot()
+                if entry['label'] == "NS"]
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]['bytes_sent'], 10)
+        self.assertEqual(entries[0]['class'], "FakeClient")
+
+        del client, entries
+        gc.collect()
+        self.assertEqual([entry for entry in stats.snapshot()
+                if entry['label'] == "NS"], [])
+
+if __name__ == "__main__":
+    unittest.main()